@@ -14,8 +14,15 @@ if config.config_file_name is not None:
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from src.models.domain import db, Domain, Report
-# the SQLAlchemy URLDATABASE_URL = os.environ.get("DATABASE_URL") or os.environ.get("SQLALCHEMY_DATABASE_URI") or f"postgresql://{os.environ.get("POSTGRES_USER")}:{os.environ.get("POSTGRES_PASSWORD")}@db:5432/{os.environ.get("POSTGRES_DB")}"POSTGRES_PASSWORD")}@db:5432/{os.environ.get("POSTGRES_DB")}"'
-config.set_main_option('sqlalchemy.url', DATABASE_URL)
+# the SQLAlchemy URL
+DATABASE_URL = (
+    os.environ.get("DATABASE_URL")
+    or os.environ.get("SQLALCHEMY_DATABASE_URI")
+    or "postgresql://{}:{}@db:5432/{}".format(os.environ.get("POSTGRES_USER"), os.environ.get("POSTGRES_PASSWORD"),
+                                            os.environ.get("POSTGRES_DB"))
+)
+# configparser интерполирует %, поэтому в пароле он экранируется
+config.set_main_option('sqlalchemy.url', DATABASE_URL.replace('%', '%%'))
 target_metadata = db.metadata
 def run_migrations_offline():
     context.configure(url=DATABASE_URL, target_metadata=target_metadata, literal_binds=True)
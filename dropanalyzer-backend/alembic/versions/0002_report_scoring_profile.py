@@ -0,0 +1,20 @@
+
+"""add scoring profile version to reports
+
+Revision ID: 0002_report_scoring_profile
+Revises: 0001_create_tables
+Create Date: 2026-10-19T09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+# revision identifiers, used by Alembic.
+revision = '0002_report_scoring_profile'
+down_revision = '0001_create_tables'
+branch_labels = None
+depends_on = None
+def upgrade():
+    op.add_column('reports', sa.Column('scoring_profile', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_reports_scoring_profile'), 'reports', ['scoring_profile'], unique=False)
+def downgrade():
+    op.drop_index(op.f('ix_reports_scoring_profile'), table_name='reports')
+    op.drop_column('reports', 'scoring_profile')
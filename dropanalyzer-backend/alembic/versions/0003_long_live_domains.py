@@ -0,0 +1,22 @@
+
+"""create long_live_domains registry table
+
+Revision ID: 0003_long_live_domains
+Revises: 0002_report_scoring_profile
+Create Date: 2026-10-19T10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+# revision identifiers, used by Alembic.
+revision = '0003_long_live_domains'
+down_revision = '0002_report_scoring_profile'
+branch_labels = None
+depends_on = None
+def upgrade():
+    op.create_table(
+        'long_live_domains',
+        sa.Column('name', sa.String(length=255), primary_key=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+def downgrade():
+    op.drop_table('long_live_domains')
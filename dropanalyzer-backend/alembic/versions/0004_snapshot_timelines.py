@@ -0,0 +1,27 @@
+
+"""create snapshot_timelines table for raw packed snapshot history
+
+Revision ID: 0004_snapshot_timelines
+Revises: 0003_long_live_domains
+Create Date: 2026-10-19T11:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+# revision identifiers, used by Alembic.
+revision = '0004_snapshot_timelines'
+down_revision = '0003_long_live_domains'
+branch_labels = None
+depends_on = None
+def upgrade():
+    op.create_table(
+        'snapshot_timelines',
+        sa.Column('domain_id', sa.Integer(), sa.ForeignKey('domains.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('timestamps', sa.LargeBinary(), nullable=False),
+        sa.Column('digests', sa.LargeBinary(), nullable=False),
+        sa.Column('snapshot_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    # префиксы SHA1 не сжимаются: отключаем бесполезную попытку сжатия TOAST для digests
+    op.execute("ALTER TABLE snapshot_timelines ALTER COLUMN digests SET STORAGE EXTERNAL")
+def downgrade():
+    op.drop_table('snapshot_timelines')
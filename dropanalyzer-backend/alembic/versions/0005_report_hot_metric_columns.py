@@ -0,0 +1,71 @@
+
+"""promote hot report metrics from JSONB to typed, indexed columns
+
+Revision ID: 0005_report_hot_metric_columns
+Revises: 0004_snapshot_timelines
+Create Date: 2026-10-19T12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+# revision identifiers, used by Alembic.
+revision = '0005_report_hot_metric_columns'
+down_revision = '0004_snapshot_timelines'
+branch_labels = None
+depends_on = None
+
+HOT_METRICS = ('total_snapshots', 'years_covered', 'first_snapshot', 'last_snapshot',
+               'avg_interval_days', 'has_snapshot')
+
+
+def upgrade():
+    op.add_column('reports', sa.Column('total_snapshots', sa.Integer(), nullable=True))
+    op.add_column('reports', sa.Column('years_covered', sa.Integer(), nullable=True))
+    op.add_column('reports', sa.Column('first_snapshot', sa.DateTime(), nullable=True))
+    op.add_column('reports', sa.Column('last_snapshot', sa.DateTime(), nullable=True))
+    op.add_column('reports', sa.Column('avg_interval_days', sa.Float(), nullable=True))
+    op.add_column('reports', sa.Column('has_snapshot', sa.Boolean(), nullable=True))
+    op.add_column('reports', sa.Column('is_latest', sa.Boolean(), nullable=False, server_default=sa.text('false')))
+
+    # переносим значения из JSONB и убираем их оттуда
+    op.execute("""
+        UPDATE reports SET
+            total_snapshots = (metrics->>'total_snapshots')::integer,
+            years_covered = (metrics->>'years_covered')::integer,
+            first_snapshot = (metrics->>'first_snapshot')::timestamp,
+            last_snapshot = (metrics->>'last_snapshot')::timestamp,
+            avg_interval_days = (metrics->>'avg_interval_days')::double precision,
+            has_snapshot = (metrics->>'has_snapshot')::boolean,
+            metrics = metrics - ARRAY['total_snapshots', 'years_covered', 'first_snapshot',
+                                      'last_snapshot', 'avg_interval_days', 'has_snapshot']
+        WHERE metrics IS NOT NULL
+    """)
+    op.execute("""
+        UPDATE reports SET is_latest = true
+        WHERE id IN (SELECT max(id) FROM reports GROUP BY domain_id)
+    """)
+    op.alter_column('reports', 'is_latest', server_default=sa.text('true'))
+
+    latest = sa.text('is_latest')
+    op.create_index('ix_reports_latest_score', 'reports', ['quality_score'], postgresql_where=latest)
+    op.create_index('ix_reports_latest_total_snapshots', 'reports', ['total_snapshots'], postgresql_where=latest)
+    op.create_index('ix_reports_latest_years_covered', 'reports', ['years_covered'], postgresql_where=latest)
+    op.create_index('ix_reports_latest_last_snapshot', 'reports', ['last_snapshot'], postgresql_where=latest)
+    op.create_index('ix_reports_domain_latest', 'reports', ['domain_id'], unique=True, postgresql_where=latest)
+
+
+def downgrade():
+    for name in ('ix_reports_domain_latest', 'ix_reports_latest_last_snapshot', 'ix_reports_latest_years_covered',
+                 'ix_reports_latest_total_snapshots', 'ix_reports_latest_score'):
+        op.drop_index(name, table_name='reports')
+    op.execute("""
+        UPDATE reports SET metrics = coalesce(metrics, '{}'::jsonb) || jsonb_strip_nulls(jsonb_build_object(
+            'total_snapshots', total_snapshots,
+            'years_covered', years_covered,
+            'first_snapshot', to_char(first_snapshot, 'YYYY-MM-DD"T"HH24:MI:SS'),
+            'last_snapshot', to_char(last_snapshot, 'YYYY-MM-DD"T"HH24:MI:SS'),
+            'avg_interval_days', avg_interval_days,
+            'has_snapshot', has_snapshot))
+    """)
+    op.drop_column('reports', 'is_latest')
+    for column in reversed(HOT_METRICS):
+        op.drop_column('reports', column)
@@ -0,0 +1,106 @@
+
+"""partition reports by month on created_at
+
+Revision ID: 0006_partition_reports
+Revises: 0005_report_hot_metric_columns
+Create Date: 2026-10-19T13:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+# revision identifiers, used by Alembic.
+revision = '0006_partition_reports'
+down_revision = '0005_report_hot_metric_columns'
+branch_labels = None
+depends_on = None
+
+# Функция создаёт месячные партиции reports с запасом вперёд; её же вызывает периодическая задача.
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION ensure_report_partitions(start_month date, months_ahead integer)
+RETURNS integer AS $$
+DECLARE
+    m date := date_trunc('month', start_month)::date;
+    stop date := (date_trunc('month', now()) + make_interval(months => months_ahead))::date;
+    created integer := 0;
+    part text;
+BEGIN
+    WHILE m <= stop LOOP
+        part := format('reports_y%sm%s', to_char(m, 'YYYY'), to_char(m, 'MM'));
+        IF to_regclass(part) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF reports FOR VALUES FROM (%L) TO (%L)',
+                           part, m, (m + interval '1 month')::date);
+            created := created + 1;
+        END IF;
+        m := (m + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+INDEXES = (
+    ("ix_reports_domain_id", ["domain_id"], None),
+    ("ix_reports_scoring_profile", ["scoring_profile"], None),
+    ("ix_reports_latest_score", ["quality_score"], "is_latest"),
+    ("ix_reports_latest_total_snapshots", ["total_snapshots"], "is_latest"),
+    ("ix_reports_latest_years_covered", ["years_covered"], "is_latest"),
+    ("ix_reports_latest_last_snapshot", ["last_snapshot"], "is_latest"),
+)
+
+
+def create_indexes(unique_latest):
+    for name, columns, where in INDEXES:
+        op.create_index(name, 'reports', columns, postgresql_where=sa.text(where) if where else None)
+    # уникальный индекс на партиционированной таблице обязан включать created_at,
+    # поэтому после миграции единственность is_latest обеспечивает блокировка строки домена
+    op.create_index('ix_reports_domain_latest', 'reports', ['domain_id'], unique=unique_latest,
+                    postgresql_where=sa.text('is_latest'))
+
+
+def drop_indexes():
+    for name, _columns, _where in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("DROP INDEX IF EXISTS ix_reports_domain_latest")
+
+
+def upgrade():
+    # Старая таблица: освобождаем имена индексов и последовательность
+    op.execute("ALTER SEQUENCE reports_id_seq OWNED BY NONE")
+    drop_indexes()
+    op.execute("ALTER TABLE reports RENAME TO reports_legacy")
+    op.execute("ALTER TABLE reports_legacy RENAME CONSTRAINT reports_pkey TO reports_legacy_pkey")
+
+    # Ключ партиционирования должен входить в первичный ключ
+    op.execute("""
+        CREATE TABLE reports (LIKE reports_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                              PRIMARY KEY (id, created_at),
+                              FOREIGN KEY (domain_id) REFERENCES domains (id) ON DELETE CASCADE)
+        PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE TABLE reports_default PARTITION OF reports DEFAULT")
+    op.execute(CREATE_PARTITION_FUNCTION)
+    op.execute("""
+        SELECT ensure_report_partitions(
+            coalesce((SELECT min(created_at) FROM reports_legacy), now())::date, 3)
+    """)
+
+    op.execute("INSERT INTO reports SELECT * FROM reports_legacy")
+    op.execute("DROP TABLE reports_legacy")
+    op.execute("ALTER SEQUENCE reports_id_seq OWNED BY reports.id")
+    create_indexes(unique_latest=False)
+
+
+def downgrade():
+    op.execute("ALTER SEQUENCE reports_id_seq OWNED BY NONE")
+    drop_indexes()
+    op.execute("ALTER TABLE reports RENAME TO reports_partitioned")
+    op.execute("ALTER TABLE reports_partitioned RENAME CONSTRAINT reports_pkey TO reports_partitioned_pkey")
+    op.execute("""
+        CREATE TABLE reports (LIKE reports_partitioned INCLUDING DEFAULTS,
+                              PRIMARY KEY (id),
+                              FOREIGN KEY (domain_id) REFERENCES domains (id) ON DELETE CASCADE)
+    """)
+    op.execute("INSERT INTO reports SELECT * FROM reports_partitioned")
+    op.execute("DROP TABLE reports_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS ensure_report_partitions(date, integer)")
+    op.execute("ALTER SEQUENCE reports_id_seq OWNED BY reports.id")
+    create_indexes(unique_latest=True)
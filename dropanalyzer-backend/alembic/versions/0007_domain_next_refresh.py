@@ -0,0 +1,20 @@
+
+"""add next_refresh_at to domains for the refresh planner
+
+Revision ID: 0007_domain_next_refresh
+Revises: 0006_partition_reports
+Create Date: 2026-10-19T14:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+# revision identifiers, used by Alembic.
+revision = '0007_domain_next_refresh'
+down_revision = '0006_partition_reports'
+branch_labels = None
+depends_on = None
+def upgrade():
+    op.add_column('domains', sa.Column('next_refresh_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_domains_next_refresh_at'), 'domains', ['next_refresh_at'], unique=False)
+def downgrade():
+    op.drop_index(op.f('ix_domains_next_refresh_at'), table_name='domains')
+    op.drop_column('domains', 'next_refresh_at')
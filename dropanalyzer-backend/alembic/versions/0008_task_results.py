@@ -0,0 +1,32 @@
+"""add task_results for large Celery results offloaded from Redis
+
+Revision ID: 0008_task_results
+Revises: 0007_domain_next_refresh
+Create Date: 2026-10-19T16:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+# revision identifiers, used by Alembic.
+revision = '0008_task_results'
+down_revision = '0007_domain_next_refresh'
+branch_labels = None
+depends_on = None
+def upgrade():
+    op.create_table(
+        'task_results',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('task_id', sa.String(length=155), nullable=False),
+        sa.Column('task_name', sa.String(length=255), nullable=True),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_task_results_task_id'), 'task_results', ['task_id'], unique=False)
+    op.create_index(op.f('ix_task_results_expires_at'), 'task_results', ['expires_at'], unique=False)
+def downgrade():
+    op.drop_index(op.f('ix_task_results_expires_at'), table_name='task_results')
+    op.drop_index(op.f('ix_task_results_task_id'), table_name='task_results')
+    op.drop_table('task_results')
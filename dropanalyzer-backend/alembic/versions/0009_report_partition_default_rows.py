@@ -0,0 +1,63 @@
+"""move rows out of reports_default when creating a report partition
+
+Revision ID: 0009_report_partition_default_rows
+Revises: 0008_task_results
+Create Date: 2026-10-19T18:00:00
+"""
+from alembic import op
+# revision identifiers, used by Alembic.
+revision = '0009_report_partition_default_rows'
+down_revision = '0008_task_results'
+branch_labels = None
+depends_on = None
+
+# Если периодическая задача не успела создать партицию заранее, строки месяца попадают
+# в reports_default, и CREATE TABLE ... PARTITION OF для этого месяца падает. Тогда партиция
+# создаётся отдельной таблицей, строки месяца переносятся в неё из DEFAULT и она подключается.
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION ensure_report_partitions(start_month date, months_ahead integer)
+RETURNS integer AS $$
+DECLARE
+    m date := date_trunc('month', start_month)::date;
+    stop date := (date_trunc('month', now()) + make_interval(months => months_ahead))::date;
+    next_m date;
+    created integer := 0;
+    part text;
+    stranded boolean;
+BEGIN
+    WHILE m <= stop LOOP
+        part := format('reports_y%sm%s', to_char(m, 'YYYY'), to_char(m, 'MM'));
+        next_m := (m + interval '1 month')::date;
+        IF to_regclass(part) IS NULL THEN
+            stranded := false;
+            IF to_regclass('reports_default') IS NOT NULL THEN
+                EXECUTE 'SELECT EXISTS (SELECT 1 FROM reports_default WHERE created_at >= $1 AND created_at < $2)'
+                    INTO stranded USING m, next_m;
+            END IF;
+            IF stranded THEN
+                EXECUTE format('CREATE TABLE %I (LIKE reports INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part);
+                EXECUTE format('WITH moved AS (DELETE FROM reports_default WHERE created_at >= %L AND created_at < %L '
+                               'RETURNING *) INSERT INTO %I SELECT * FROM moved', m, next_m, part);
+                EXECUTE format('ALTER TABLE reports ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                               part, m, next_m);
+            ELSE
+                EXECUTE format('CREATE TABLE %I PARTITION OF reports FOR VALUES FROM (%L) TO (%L)',
+                               part, m, next_m);
+            END IF;
+            created := created + 1;
+        END IF;
+        m := next_m;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    op.execute(CREATE_PARTITION_FUNCTION)
+
+
+def downgrade():
+    # новая версия функции совместима с прежней (та же сигнатура и результат), поэтому остаётся
+    pass
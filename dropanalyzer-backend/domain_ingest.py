@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+domain_ingest.py — Нормализация и потоковая загрузка списков доменов для DropAnalyzer.
+
+normalize_domain приводит ввод к единому виду (схема/путь/порт отбрасываются,
+регистр понижается, IDN кодируется в punycode) и используется везде, где
+домен попадает в систему: API, анализ, реестр long-live доменов, массовая загрузка.
+
+ingest_lines читает список построчно, нормализует и валидирует его и загружает
+в таблицу domains порциями через COPY во временную таблицу
+и INSERT ... ON CONFLICT DO NOTHING, так что файл никогда не держится в памяти целиком.
+"""
+
+import gzip
+import io
+import logging
+import re
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_SIZE = 50000
+
+_SCHEME_RE = re.compile(r"^[a-z][a-z0-9+.-]*://", re.IGNORECASE)
+_LABEL_RE = re.compile(r"^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$")
+_IPV4_RE = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}$")
+
+
+def normalize_domain(raw: str) -> Optional[str]:
+    """Нормализует домен: 'HTTPS://User@Пример.РФ:443/path?q' -> 'xn--e1afmkfd.xn--p1ai'.
+    Возвращает None, если строка не является корректным именем домена.
+    """
+    if not raw:
+        return None
+    value = raw.strip().lstrip("\ufeff")
+    if not value or value.startswith("#"):
+        return None
+    # схема, учётные данные, путь/запрос/фрагмент, порт
+    value = _SCHEME_RE.sub("", value)
+    value = re.split(r"[/?#\s]", value, maxsplit=1)[0]
+    value = value.rsplit("@", 1)[-1]
+    value = value.split(":", 1)[0]
+    value = value.strip(".").lower()
+    if value.startswith("*."):
+        value = value[2:]
+    if not value:
+        return None
+
+    try:
+        value = value.encode("idna").decode("ascii")
+    except UnicodeError:
+        return None
+    return value if is_valid_domain(value) else None
+
+
+def is_valid_domain(name: str) -> bool:
+    """Проверка нормализованного (ASCII) имени по правилам DNS."""
+    if not name or len(name) > 253 or _IPV4_RE.match(name):
+        return False
+    labels = name.split(".")
+    if len(labels) < 2 or labels[-1].isdigit():
+        return False
+    return all(_LABEL_RE.match(label) for label in labels)
+
+
+def iter_lines(stream) -> Iterator[str]:
+    """Построчно читает бинарный или текстовый поток; gzip распознаётся по сигнатуре."""
+    if isinstance(stream, io.TextIOBase):
+        yield from stream
+        return
+    buffered = stream if hasattr(stream, "peek") else io.BufferedReader(stream)
+    if buffered.peek(2)[:2] == b"\x1f\x8b":
+        buffered = gzip.GzipFile(fileobj=buffered)
+    yield from io.TextIOWrapper(buffered, encoding="utf-8", errors="replace")
+
+
+def iter_normalized_chunks(lines: Iterable[str], chunk_size: int = INGEST_CHUNK_SIZE,
+                           stats: Optional[Dict] = None) -> Iterator[List[str]]:
+    """Нормализует строки и отдаёт порции уникальных (в пределах порции) доменов.
+    Дубликаты между порциями отсекает ON CONFLICT при вставке.
+    """
+    stats = stats if stats is not None else {}
+    for key in ("read", "invalid", "duplicates"):
+        stats.setdefault(key, 0)
+    lines = iter(lines)
+    while True:
+        raw_chunk = list(islice(lines, chunk_size))
+        if not raw_chunk:
+            return
+        chunk: Dict[str, None] = {}
+        for line in raw_chunk:
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            stats["read"] += 1
+            name = normalize_domain(line)
+            if name is None:
+                stats["invalid"] += 1
+            elif name in chunk:
+                stats["duplicates"] += 1
+            else:
+                chunk[name] = None
+        if chunk:
+            yield list(chunk)
+
+
+def copy_domains_chunk(dbapi_conn, names: List[str], long_live=None) -> int:
+    """Загружает порцию доменов в таблицу domains через COPY (psycopg2) во временную таблицу.
+    Возвращает число реально вставленных (новых) строк.
+    """
+    buf = io.StringIO()
+    for name in names:
+        flag = "t" if long_live is not None and name in long_live else "f"
+        buf.write(f"{name}\t{flag}\n")
+    buf.seek(0)
+
+    with dbapi_conn.cursor() as cur:
+        cur.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS domains_ingest (name varchar(255), long_live boolean) "
+            "ON COMMIT DELETE ROWS"
+        )
+        cur.copy_expert("COPY domains_ingest (name, long_live) FROM STDIN", buf)
+        cur.execute(
+            "INSERT INTO domains (name, long_live, created_at) "
+            "SELECT name, long_live, now() FROM domains_ingest "
+            "ON CONFLICT (name) DO NOTHING"
+        )
+        inserted = cur.rowcount
+    dbapi_conn.commit()
+    return inserted
+
+
+def ingest_lines(engine, lines: Iterable[str], chunk_size: int = INGEST_CHUNK_SIZE,
+                 long_live=None, progress=None) -> Dict:
+    """Потоково нормализует список доменов и загружает его в таблицу domains.
+    engine — SQLAlchemy engine (PostgreSQL/psycopg2); long_live — контейнер с поддержкой `in`.
+    Возвращает статистику: read, invalid, duplicates, inserted, chunks.
+    """
+    stats: Dict = {"inserted": 0, "chunks": 0}
+    raw_conn = engine.raw_connection()
+    try:
+        for chunk in iter_normalized_chunks(lines, chunk_size=chunk_size, stats=stats):
+            stats["inserted"] += copy_domains_chunk(raw_conn, chunk, long_live=long_live)
+            stats["chunks"] += 1
+            if progress:
+                progress(stats)
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+    logger.info(f"Domain ingest finished: {stats}")
+    return stats
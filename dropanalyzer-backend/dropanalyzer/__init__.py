@@ -0,0 +1 @@
+"""DropAnalyzer — анализ дропнутых доменов по истории Wayback Machine."""
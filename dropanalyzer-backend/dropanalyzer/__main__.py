@@ -0,0 +1,6 @@
+"""python -m dropanalyzer — см. dropanalyzer.cli."""
+import sys
+
+from .cli import main
+
+sys.exit(main())
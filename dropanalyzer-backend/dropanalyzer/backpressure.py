@@ -0,0 +1,77 @@
+"""Ограничение объёма работы в полёте: сторож памяти процесса.
+
+MemoryGuard приостанавливает приём новой работы, пока RSS процесса выше верхней
+отметки, и отпускает её, когда RSS опустится ниже нижней (гистерезис, чтобы не
+дёргаться на границе). Отметки по умолчанию — BATCH_RSS_HIGH_MB / BATCH_RSS_LOW_MB;
+0 — сторож выключен. RSS читается из /proc/self/statm; где его нет, сторож не
+срабатывает. Аллокатор не всегда возвращает память ОС, поэтому пауза ограничена
+BATCH_RSS_MAX_PAUSE_SEC: дольше ждать бесполезно, приём продолжается.
+"""
+import asyncio
+import os
+import time
+from typing import Optional
+
+BATCH_RSS_HIGH_MB = int(os.environ.get("BATCH_RSS_HIGH_MB", 0))
+BATCH_RSS_LOW_MB = int(os.environ.get("BATCH_RSS_LOW_MB", 0))
+BATCH_RSS_MAX_PAUSE_SEC = float(os.environ.get("BATCH_RSS_MAX_PAUSE_SEC", 60))
+MEMORY_POLL_SEC = 0.5
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> Optional[int]:
+    """Текущий RSS процесса в байтах или None, если узнать его нельзя."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryGuard:
+    def __init__(self, high_mb: int = BATCH_RSS_HIGH_MB, low_mb: int = BATCH_RSS_LOW_MB,
+                 poll: float = MEMORY_POLL_SEC, max_pause: float = BATCH_RSS_MAX_PAUSE_SEC):
+        self.high = high_mb * 1024 * 1024
+        # без явной нижней отметки — 90% верхней
+        self.low = (low_mb or high_mb * 0.9) * 1024 * 1024
+        self.poll = poll
+        self.max_pause = max_pause
+        self.pauses = 0
+        self.paused_sec = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.high > 0
+
+    def over(self) -> bool:
+        if not self.enabled:
+            return False
+        rss = rss_bytes()
+        return rss is not None and rss > self.high
+
+    def _released(self, started: float) -> bool:
+        if time.monotonic() - started >= self.max_pause:
+            return True
+        rss = rss_bytes()
+        return rss is None or rss <= self.low
+
+    async def wait(self) -> None:
+        """Ждёт (в event loop), пока память процесса не вернётся ниже нижней отметки."""
+        if not self.over():
+            return
+        self.pauses += 1
+        started = time.monotonic()
+        while not self._released(started):
+            await asyncio.sleep(self.poll)
+        self.paused_sec += time.monotonic() - started
+
+    def wait_sync(self) -> None:
+        """То же для потоков (воркер с пулом потоков)."""
+        if not self.over():
+            return
+        self.pauses += 1
+        started = time.monotonic()
+        while not self._released(started):
+            time.sleep(self.poll)
+        self.paused_sec += time.monotonic() - started
@@ -0,0 +1,237 @@
+"""Пакетный прогон списка доменов вне web API.
+
+Прогон — конвейер из трёх стадий в одном event loop, связанных ограниченными очередями:
+приём (домены читаются из потока по одному, чтение — в отдельном потоке, чтобы медленный
+stdin не останавливал event loop) → анализ (concurrency обработчиков с общей
+HTTP-сессией; загрузка и разбор ответов уже потоковые внутри analyze_single_domain,
+Availability уходит пакетами через батчер сессии) → запись в чекпоинт. Когда следующая
+стадия не успевает, очередь перед ней заполняется и предыдущая ждёт; приём к тому же
+приостанавливается, пока RSS процесса выше отметки MemoryGuard. Запись копит результаты
+в буфере и сбрасывает его при BATCH_FLUSH_RECORDS записях или раз в BATCH_FLUSH_SEC.
+
+Так память прогона не зависит от длины списка: в ней только множество уже
+обработанных доменов и ограниченные очереди, а после падения прогон продолжается
+с того места, где остановился.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set
+
+import aiohttp
+
+from domain_ingest import normalize_domain
+
+from .backpressure import MemoryGuard
+from .engine import analyze_single_domain
+from .engine.analyzer import BATCH_CONCURRENCY
+from .engine.config import CDX_SCOPE
+
+logger = logging.getLogger(__name__)
+
+# окно, по которому считается текущая скорость (и ETA)
+RATE_WINDOW_SEC = 60
+# ёмкость очередей между стадиями — в единицах concurrency
+BATCH_QUEUE_FACTOR = int(os.environ.get("BATCH_QUEUE_FACTOR", 2))
+BATCH_FLUSH_RECORDS = int(os.environ.get("BATCH_FLUSH_RECORDS", 500))
+BATCH_FLUSH_SEC = float(os.environ.get("BATCH_FLUSH_SEC", 2))
+
+
+class Throughput:
+    """Скорость обработки за последние RATE_WINDOW_SEC секунд и оценка оставшегося времени."""
+
+    def __init__(self, total: Optional[int] = None, window: float = RATE_WINDOW_SEC):
+        self.total = total
+        self.window = window
+        self.done = 0
+        self.errors = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+        self._marks = deque([(self.started, 0)])
+
+    def add(self, error: bool = False) -> None:
+        self.done += 1
+        self.errors += int(error)
+        now = time.monotonic()
+        self._marks.append((now, self.done))
+        while len(self._marks) > 2 and now - self._marks[1][0] > self.window:
+            self._marks.popleft()
+
+    def rate(self) -> float:
+        (t0, n0), (t1, n1) = self._marks[0], self._marks[-1]
+        return (n1 - n0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        if self.total is None:
+            return None
+        rate = self.rate()
+        remaining = max(self.total - self.skipped - self.done, 0)
+        return remaining / rate if rate else None
+
+    def summary(self) -> Dict:
+        return {"done": self.done, "errors": self.errors, "skipped": self.skipped, "total": self.total,
+                "rate": round(self.rate(), 2), "eta_sec": self.eta(),
+                "elapsed_sec": round(time.monotonic() - self.started, 1)}
+
+
+def iter_pending(lines: Iterable[str], finished: Set[str], stats: Throughput) -> Iterator[str]:
+    """Нормализованные домены, которых ещё нет в чекпоинте; повторы в самом списке отбрасываются."""
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        domain = normalize_domain(line)
+        if domain is None:
+            continue
+        if domain in finished:
+            stats.skipped += 1
+            continue
+        finished.add(domain)
+        yield domain
+
+
+def error_result(domain: str, error: Exception) -> Dict:
+    # та же форма, что у ошибок analyze_domains_batch, но с нормализованным доменом — ключом чекпоинта
+    return {
+        "domain": domain,
+        "status": "error",
+        "error": str(error),
+        "quality": "Low Quality",
+        "is_good": False,
+        "recommended": False,
+        "quality_score": 0,
+        "category": "Error"
+    }
+
+
+async def run_batch(lines: Iterable[str], checkpoint, concurrency: int = BATCH_CONCURRENCY,
+                    session: Optional[aiohttp.ClientSession] = None, total: Optional[int] = None,
+                    retry_errors: bool = False, progress: Optional[Callable[[Throughput], None]] = None,
+                    progress_interval: float = 10, guard: Optional[MemoryGuard] = None,
+                    flush_records: int = BATCH_FLUSH_RECORDS, flush_sec: float = BATCH_FLUSH_SEC,
+                    scope: str = CDX_SCOPE) -> Dict:
+    """Анализирует домены из lines, дописывая результаты в checkpoint (см. dropanalyzer.checkpoint).
+    total — число строк во входе (для ETA); progress(stats) вызывается раз в progress_interval секунд.
+    guard — сторож памяти для стадии приёма (по умолчанию — с отметками из окружения).
+    scope — область запроса CDX (см. analyze_single_domain).
+    """
+    if session is None:
+        connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(connector=connector) as own_session:
+            return await run_batch(lines, checkpoint, concurrency=concurrency, session=own_session,
+                                   total=total, retry_errors=retry_errors, progress=progress,
+                                   progress_interval=progress_interval, guard=guard,
+                                   flush_records=flush_records, flush_sec=flush_sec, scope=scope)
+
+    stats = Throughput(total)
+    guard = guard or MemoryGuard()
+    finished = checkpoint.done(retry_errors=retry_errors)
+    pending = iter_pending(lines, finished, stats)
+    checkpoint.open()
+
+    domains: asyncio.Queue = asyncio.Queue(maxsize=concurrency * BATCH_QUEUE_FACTOR)
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency * BATCH_QUEUE_FACTOR)
+
+    loop = asyncio.get_running_loop()
+    reading = loop.create_future()
+
+    async def feed(domain):
+        await guard.wait()
+        await domains.put(domain)
+
+    def read_input():
+        # вход (файл, stdin) читается в потоке-демоне: медленный источник не останавливает
+        # event loop, а чтение, зависшее на stdin, не мешает завершить прогон по Ctrl+C
+        error = None
+        try:
+            for domain in pending:
+                asyncio.run_coroutine_threadsafe(feed(domain), loop).result()
+        except concurrent.futures.CancelledError:
+            return  # прогон прерван, intake уже отменён
+        except BaseException as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(finish_reading, error)
+        except RuntimeError:
+            pass  # event loop уже закрыт
+
+    def finish_reading(error):
+        if reading.done():
+            return
+        if error is not None:
+            reading.set_exception(error)
+        else:
+            reading.set_result(None)
+
+    async def intake():
+        threading.Thread(target=read_input, name="batch-intake", daemon=True).start()
+        await reading
+        for _ in range(concurrency):
+            await domains.put(None)
+
+    async def analyze():
+        while True:
+            domain = await domains.get()
+            if domain is None:
+                return
+            try:
+                result = await analyze_single_domain(domain, session=session, batch_availability=True,
+                                                     scope=scope)
+                result["status"] = "completed"
+            except Exception as e:
+                logger.error(f"Error analyzing {domain}: {e}")
+                result = error_result(domain, e)
+            await results.put(result)
+
+    buffer = []
+
+    def flush():
+        if buffer:
+            checkpoint.write_many(buffer)
+            buffer.clear()
+
+    async def persist():
+        flushed = time.monotonic()
+        while True:
+            try:
+                result = await asyncio.wait_for(results.get(), flush_sec)
+            except asyncio.TimeoutError:
+                result = False
+            if result:
+                buffer.append(result)
+                stats.add(error=result["status"] == "error")
+            if result is None or len(buffer) >= flush_records or time.monotonic() - flushed >= flush_sec:
+                flush()
+                flushed = time.monotonic()
+            if result is None:
+                return
+
+    async def report():
+        while True:
+            await asyncio.sleep(progress_interval)
+            progress(stats)
+
+    reporter = asyncio.ensure_future(report()) if progress else None
+    writer = asyncio.ensure_future(persist())
+    try:
+        await asyncio.gather(intake(), *(analyze() for _ in range(concurrency)))
+        await results.put(None)
+        await writer
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        if not writer.done():
+            # прерывание: дописываем то, что уже готово, и закрываем чекпоинт
+            writer.cancel()
+            while not results.empty():
+                result = results.get_nowait()
+                if result:
+                    buffer.append(result)
+            flush()
+        checkpoint.close()
+    summary = stats.summary()
+    summary.update(memory_pauses=guard.pauses, memory_paused_sec=round(guard.paused_sec, 1))
+    return summary
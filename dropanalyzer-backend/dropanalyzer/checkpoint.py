@@ -0,0 +1,135 @@
+"""Чекпоинты пакетного прогона: результаты дописываются по мере готовности.
+
+NdjsonCheckpoint — по одному JSON-объекту на строку; оборванная при падении
+последняя строка (без перевода строки) отрезается при следующем открытии,
+нечитаемые полные строки пропускаются. SqliteCheckpoint — таблица
+results(domain PRIMARY KEY) в режиме WAL, фиксация каждые commit_every записей.
+write_many записывает готовый буфер одной операцией (см. dropanalyzer.batch).
+
+done() возвращает домены, которые при повторном запуске пропускаются: успешно
+разобранные и (без retry_errors) завершившиеся ошибкой; results() — сохранённые
+результаты (при повторах домена — последний).
+"""
+import json
+import os
+import sqlite3
+from typing import Dict, Iterator, List, Set
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+class NdjsonCheckpoint:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def done(self, retry_errors: bool = False) -> Set[str]:
+        finished: Set[str] = set()
+        if not os.path.exists(self.path):
+            return finished
+        good_size = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # без перевода строки может быть только последняя, оборванная строка
+                    break
+                good_size += len(line)
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    # испорченная строка в середине файла пропускается, результаты после неё остаются
+                    continue
+                if not isinstance(row, dict) or not row.get("domain"):
+                    continue
+                if retry_errors and row.get("status") == "error":
+                    finished.discard(row["domain"])
+                else:
+                    finished.add(row["domain"])
+        if good_size != os.path.getsize(self.path):
+            # хвост от прерванной записи — иначе следующая строка приклеится к нему
+            with open(self.path, "r+b") as f:
+                f.truncate(good_size)
+        return finished
+
+    def results(self) -> Iterator[Dict]:
+        latest: Dict[str, Dict] = {}
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(row, dict) and row.get("domain"):
+                    latest[row["domain"]] = row
+        return iter(latest.values())
+
+    def open(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, result: Dict) -> None:
+        self.write_many([result])
+
+    def write_many(self, results: List[Dict]) -> None:
+        self._file.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in results))
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+
+class SqliteCheckpoint:
+    def __init__(self, path: str, commit_every: int = 100):
+        self.path = path
+        self.commit_every = commit_every
+        self._conn = None
+        self._pending = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                               "domain TEXT PRIMARY KEY, status TEXT, result TEXT)")
+        return self._conn
+
+    def done(self, retry_errors: bool = False) -> Set[str]:
+        query = "SELECT domain FROM results"
+        if retry_errors:
+            query += " WHERE status IS NOT 'error'"
+        return {row[0] for row in self._connect().execute(query)}
+
+    def results(self) -> Iterator[Dict]:
+        return (json.loads(row[0]) for row in self._connect().execute("SELECT result FROM results"))
+
+    def open(self) -> None:
+        self._connect()
+
+    def write(self, result: Dict) -> None:
+        self.write_many([result])
+
+    def write_many(self, results: List[Dict]) -> None:
+        self._conn.executemany("INSERT OR REPLACE INTO results (domain, status, result) VALUES (?, ?, ?)",
+                               [(r.get("domain"), r.get("status"), json.dumps(r, ensure_ascii=False, default=str))
+                                for r in results])
+        self._pending += len(results)
+        if self._pending >= self.commit_every:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+            self._pending = 0
+
+
+def open_checkpoint(path: str):
+    """Тип чекпоинта по расширению: .db/.sqlite/.sqlite3 — SQLite, иначе NDJSON."""
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        return SqliteCheckpoint(path)
+    return NdjsonCheckpoint(path)
@@ -0,0 +1,161 @@
+"""Командная строка DropAnalyzer.
+
+Пример:
+    python -m dropanalyzer batch drops.txt.gz -o results.ndjson --concurrency 50
+    python -m dropanalyzer batch drops.txt -o results.sqlite --retry-errors
+
+Повторный запуск с тем же -o пропускает уже обработанные домены.
+
+Воспроизводимые прогоны без сети (см. dropanalyzer.fixtures):
+    python -m dropanalyzer batch sample.txt -o live.ndjson --record sample.jsonl.gz
+    python -m dropanalyzer batch sample.txt -o new.ndjson --replay sample.jsonl.gz [--replay-latency 1]
+    python -m dropanalyzer compare live.ndjson new.ndjson
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from domain_ingest import iter_lines
+
+from .backpressure import BATCH_RSS_HIGH_MB, MemoryGuard
+from .batch import run_batch
+from .checkpoint import open_checkpoint
+from .engine.analyzer import BATCH_CONCURRENCY
+from .engine.config import CDX_SCOPE, CDX_SCOPES
+from .fixtures import FixtureStore, RecordingSession, ReplaySession
+
+# поля, которые законно отличаются между прогонами
+COMPARE_IGNORE = ("analysis_time_sec", "unique_versions_sketch")
+
+
+def _duration(seconds) -> str:
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}ч{minutes:02d}м" if hours else f"{minutes}м{seconds:02d}с"
+
+
+def count_lines(path: str) -> int:
+    with open(path, "rb") as f:
+        return sum(1 for line in iter_lines(f) if line.strip() and not line.lstrip().startswith("#"))
+
+
+def print_progress(stats) -> None:
+    line = f"[batch] готово {stats.done}"
+    if stats.total is not None:
+        line += f" / {stats.total - stats.skipped}"
+    line += f", ошибок {stats.errors}, {stats.rate():.1f} домен/сек, ETA {_duration(stats.eta())}"
+    print(line, flush=True)
+
+
+@asynccontextmanager
+async def batch_session(args):
+    """HTTP-сессия прогона: обычная, записывающая (--record) или воспроизводящая (--replay)."""
+    if args.replay:
+        session = ReplaySession(FixtureStore(args.replay).load(), latency_scale=args.replay_latency)
+        yield session
+        if session.misses:
+            print(f"[batch] Нет в фикстурах: {len(session.misses)} запросов, например {session.misses[0]}")
+        return
+    connector = aiohttp.TCPConnector(limit=args.concurrency, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        if not args.record:
+            yield session
+            return
+        store = FixtureStore(args.record)
+        try:
+            yield RecordingSession(session, store)
+        finally:
+            store.close()
+
+
+def cmd_batch(args) -> int:
+    checkpoint = open_checkpoint(args.output)
+    total = None if args.file == "-" or args.no_count else count_lines(args.file)
+
+    async def run_with_session(stream):
+        async with batch_session(args) as session:
+            return await run_batch(iter_lines(stream), checkpoint, concurrency=args.concurrency,
+                                   session=session, total=total, retry_errors=args.retry_errors,
+                                   progress=print_progress, progress_interval=args.progress_interval,
+                                   guard=MemoryGuard(high_mb=args.max_rss_mb), scope=args.scope)
+
+    def run(stream):
+        return asyncio.run(run_with_session(stream))
+
+    try:
+        if args.file == "-":
+            stats = run(sys.stdin.buffer)
+        else:
+            with open(args.file, "rb") as f:
+                stats = run(f)
+    except KeyboardInterrupt:
+        print(f"[batch] Прервано; обработанные домены сохранены в {args.output}, "
+              f"повторный запуск продолжит с места остановки")
+        return 130
+    print(f"[batch] Готово за {_duration(stats['elapsed_sec'])}: обработано {stats['done']}, "
+          f"ошибок {stats['errors']}, пропущено (уже в чекпоинте) {stats['skipped']}")
+    if stats['memory_pauses']:
+        print(f"[batch] Приём приостанавливался по памяти {stats['memory_pauses']} раз, "
+              f"всего {stats['memory_paused_sec']} сек.")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    """Сравнивает результаты двух прогонов (например, живого и воспроизведённого)."""
+    base = {r["domain"]: r for r in open_checkpoint(args.base).results()}
+    new = {r["domain"]: r for r in open_checkpoint(args.new).results()}
+    fields = args.fields.split(",") if args.fields else None
+    changed = []
+    for domain in sorted(base.keys() & new.keys()):
+        a, b = base[domain], new[domain]
+        keys = fields or sorted((a.keys() | b.keys()) - set(COMPARE_IGNORE))
+        diff = {k: (a.get(k), b.get(k)) for k in keys if a.get(k) != b.get(k)}
+        if diff:
+            changed.append((domain, diff))
+    only_base, only_new = base.keys() - new.keys(), new.keys() - base.keys()
+    print(f"[compare] общих доменов {len(base.keys() & new.keys())}, отличаются {len(changed)}, "
+          f"только в {args.base}: {len(only_base)}, только в {args.new}: {len(only_new)}")
+    for domain, diff in changed[:args.show]:
+        print(f"    {domain}: " + ", ".join(f"{k} {a!r} -> {b!r}" for k, (a, b) in diff.items()))
+    return 1 if changed or only_base or only_new else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="dropanalyzer", description="DropAnalyzer CLI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="анализ списка доменов с чекпоинтом")
+    batch.add_argument("file", help="файл со списком доменов (.txt или .gz), '-' — stdin")
+    batch.add_argument("-o", "--output", required=True,
+                       help="чекпоинт с результатами: .ndjson или .db/.sqlite/.sqlite3")
+    batch.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="анализов одновременно")
+    batch.add_argument("--retry-errors", action="store_true", help="повторить домены, завершившиеся ошибкой")
+    batch.add_argument("--progress-interval", type=float, default=10, help="секунд между отчётами о прогрессе")
+    batch.add_argument("--max-rss-mb", type=int, default=BATCH_RSS_HIGH_MB,
+                       help="приостанавливать приём доменов, пока RSS выше порога (0 — без ограничения)")
+    batch.add_argument("--scope", choices=CDX_SCOPES, default=CDX_SCOPE,
+                       help="область CDX: exact — главная страница, domain — все хосты, prefix — все страницы хоста")
+    batch.add_argument("--no-count", action="store_true", help="не считать строки заранее (без ETA)")
+    fixtures = batch.add_mutually_exclusive_group()
+    fixtures.add_argument("--record", metavar="FIXTURES", help="записать HTTP-обмены в .jsonl.gz")
+    fixtures.add_argument("--replay", metavar="FIXTURES", help="отвечать из записанных HTTP-обменов, без сети")
+    batch.add_argument("--replay-latency", type=float, default=0.0,
+                       help="множитель записанных задержек при --replay (0 — без задержек, 1 — как при записи)")
+    batch.set_defaults(func=cmd_batch)
+
+    compare = commands.add_parser("compare", help="сравнить результаты двух прогонов")
+    compare.add_argument("base", help="чекпоинт эталонного прогона")
+    compare.add_argument("new", help="чекпоинт сравниваемого прогона")
+    compare.add_argument("--fields", help="сравнивать только эти поля (через запятую)")
+    compare.add_argument("--show", type=int, default=20, help="сколько отличий вывести")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    return args.func(args)
@@ -0,0 +1,23 @@
+"""Движок анализа доменов DropAnalyzer — единственная реализация для web, воркеров и скриптов.
+
+Стадии: fetch (HTTP к Wayback) → parse (разбор ответов) → metrics (метрики снимков)
+→ classify (оценка по профилю и long-live реестру). Стабильный API — асинхронный
+analyze_single_domain; analyze_domain_sync/analyze_domains_batch_sync — обёртки над ним.
+"""
+from .config import AVAIL_API, CDX_API, REQUEST_TIMEOUT, RETRY_COUNT, RETRY_DELAY, TIMEMAP_URL
+from .fetch import safe_request
+from .classify import (LONG_LIVE_DOMAINS, classify_batch, classify_by_wayback, classify_domain,
+                       load_long_live_domains, metrics_to_columns)
+from .availability import AvailabilityBatcher, fetch_availability_batch
+from .distinct import DistinctCounter, merge_sketches, sketch_count
+from .analyzer import analyze_domain_sync, analyze_domains_batch, analyze_domains_batch_sync, analyze_single_domain
+
+__all__ = [
+    "AVAIL_API", "CDX_API", "REQUEST_TIMEOUT", "RETRY_COUNT", "RETRY_DELAY", "TIMEMAP_URL",
+    "safe_request",
+    "LONG_LIVE_DOMAINS", "classify_batch", "classify_by_wayback", "classify_domain",
+    "load_long_live_domains", "metrics_to_columns",
+    "AvailabilityBatcher", "fetch_availability_batch",
+    "DistinctCounter", "merge_sketches", "sketch_count",
+    "analyze_domain_sync", "analyze_domains_batch", "analyze_domains_batch_sync", "analyze_single_domain",
+]
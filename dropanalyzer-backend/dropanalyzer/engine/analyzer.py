@@ -0,0 +1,168 @@
+"""Конвейер анализа домена: fetch → parse → metrics → classify.
+
+analyze_single_domain — основной (асинхронный) API; синхронные обёртки только
+запускают его в собственном event loop.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from domain_ingest import normalize_domain
+from scoring_profiles import ScoringProfile, get_profile
+
+from .availability import Availability, fetch_availability_batch, get_batcher
+from .classify import LONG_LIVE_DOMAINS, candidate_min_snapshots, classify_domain
+from .config import AVAIL_PREFILTER, CDX_SCOPE, CDX_SCOPES, TRIAGE_ENABLED
+from .fetch import fetch_cdx_records, fetch_cdx_scope, fetch_timemap, lookup_availability, probe_cdx
+from .metrics import scope_metrics, snapshot_metrics
+from .parse import TIMEMAP_KEYS
+
+logger = logging.getLogger(__name__)
+
+BATCH_CONCURRENCY = 10
+
+
+async def analyze_single_domain(domain: str, session: Optional[aiohttp.ClientSession] = None,
+                                keep_timeline: bool = False, profile: Optional[ScoringProfile] = None,
+                                availability: Optional[Availability] = None,
+                                batch_availability: bool = False, triage: bool = TRIAGE_ENABLED,
+                                scope: str = CDX_SCOPE) -> Dict:
+    """Асинхронный анализ одного домена: CDX, Availability, Timemap + классификация.
+    session — общая HTTP-сессия (например, из постоянного event loop воркера); без неё создаётся своя.
+    keep_timeline — вернуть сырой таймлайн снимков в info["_timeline"] (для snapshot_timelines).
+    profile — профиль оценки (по умолчанию — профиль по умолчанию).
+    availability — уже полученный ответ Availability (см. fetch_availability_batch);
+    batch_availability — запросить Availability через общий батчер сессии.
+    triage — сначала короткая проба CDX; полная история и Timemap только для доменов,
+    которые по порогам профиля могут получить Medium/Recommended (info["triage"]);
+    без запроса Timemap поля timemap_* равны None.
+    scope — область CDX: exact (главная страница) или domain/prefix — все хосты/страницы
+    одним запросом без пробы и Timemap; классификация тогда идёт по метрикам области,
+    а метрики главной страницы и сводка по хостам и разделам — в info["exact_host"]
+    и info["domain_scope"].
+    """
+    if session is None:
+        async with aiohttp.ClientSession() as own_session:
+            return await analyze_single_domain(domain, session=own_session, keep_timeline=keep_timeline,
+                                               profile=profile, availability=availability,
+                                               batch_availability=batch_availability, triage=triage,
+                                               scope=scope)
+    if scope not in CDX_SCOPES:
+        raise ValueError(f"Unknown CDX scope: {scope}")
+
+    domain_norm = normalize_domain(domain) or domain.strip().lower()
+    info: Dict = {"domain": domain_norm}
+    start = datetime.utcnow()
+
+    if availability is None:
+        if batch_availability:
+            availability = await get_batcher(session).lookup(domain_norm)
+        else:
+            availability = await lookup_availability(session, domain_norm)
+    fields, known = availability
+    info.update(fields)
+    if scope != "exact":
+        info["scope"] = scope
+    aggregator = None
+
+    if AVAIL_PREFILTER and scope == "exact" and known and not info["has_snapshot"]:
+        # Availability точно ответил «снимков нет» — CDX и Timemap пусты, не тратим на них запросы.
+        # Availability смотрит только на главную страницу, поэтому для области домена не применяется
+        records = None
+        info["triage"] = "unarchived"
+    elif scope != "exact":
+        # вся область одним постраничным запросом, страницы сворачиваются на лету
+        records = None
+        aggregator = await fetch_cdx_scope(session, domain_norm, scope)
+        info["triage"] = "scope"
+    elif triage and domain_norm not in LONG_LIVE_DOMAINS:
+        # Проба: если снимков меньше, чем нужно для Medium, проба и есть вся история
+        probe_limit = candidate_min_snapshots(profile or get_profile())
+        records = await probe_cdx(session, domain_norm, probe_limit)
+        if records is not None and len(records) < probe_limit:
+            info["triage"] = "screened"
+        else:
+            offset = len(records) if records else 0
+            records = (records or []) + await fetch_cdx_records(session, domain_norm, offset=offset)
+            info["triage"] = "full"
+    else:
+        records = await fetch_cdx_records(session, domain_norm)
+        info["triage"] = "full"
+
+    if info["triage"] == "full":
+        info.update(await fetch_timemap(session, domain_norm))
+    else:
+        # Timemap не запрашивался (unarchived/screened/scope): значения неизвестны, а не нулевые
+        info.update(dict.fromkeys(TIMEMAP_KEYS, None))
+    records = records or []
+    info["total_snapshots"] = len(records)
+
+    # Метрики снимков (векторно по таймлайну: секунды + префиксы дайджестов)
+    if aggregator is not None:
+        metrics, timeline = scope_metrics(aggregator, domain_norm)
+    else:
+        metrics, timeline = snapshot_metrics(records, domain_norm)
+    info.update(metrics)
+    if keep_timeline and timeline is not None:
+        # сырой таймлайн для сохранения в snapshot_timelines; вызывающий код убирает его из результата
+        info["_timeline"] = timeline
+
+    classify_domain(info, domain_norm, profile)
+    info["analysis_time_sec"] = round((datetime.utcnow() - start).total_seconds(), 2)
+    return info
+
+
+def analyze_domain_sync(domain: str, keep_timeline: bool = False) -> Dict:
+    """Синхронная обёртка для запуска асинхронного анализа."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(analyze_single_domain(domain, keep_timeline=keep_timeline))
+    finally:
+        loop.close()
+
+
+async def analyze_domains_batch(domains: List[str], session: Optional[aiohttp.ClientSession] = None,
+                                concurrency: int = BATCH_CONCURRENCY) -> List[Dict]:
+    """Пакетный анализ: Availability для всех доменов пакетными запросами,
+    затем не более concurrency анализов одновременно. Порядок результатов — как у domains.
+    """
+    if session is None:
+        async with aiohttp.ClientSession() as own_session:
+            return await analyze_domains_batch(domains, session=own_session, concurrency=concurrency)
+
+    normalized = [normalize_domain(d) or d.strip().lower() for d in domains]
+    availability = await fetch_availability_batch(session, normalized)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(raw: str, domain: str) -> Dict:
+        async with semaphore:
+            try:
+                r = await analyze_single_domain(domain, session=session, availability=availability.get(domain))
+                r["status"] = "completed"
+                return r
+            except Exception as e:
+                logger.error(f"Error analyzing {raw}: {e}")
+                return {
+                    "domain": raw,
+                    "status": "error",
+                    "error": str(e),
+                    "quality": "Low Quality",
+                    "is_good": False,
+                    "recommended": False,
+                    "quality_score": 0,
+                    "category": "Error"
+                }
+
+    return list(await asyncio.gather(*(one(raw, d) for raw, d in zip(domains, normalized))))
+
+
+def analyze_domains_batch_sync(domains: List[str]) -> List[Dict]:
+    """Синхронная обёртка для пакетного анализа доменов."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(analyze_domains_batch(domains))
+    finally:
+        loop.close()
@@ -0,0 +1,118 @@
+"""Пакетные запросы к Availability API.
+
+Availability принимает POST со списком адресов (поле url, адреса через перевод строки)
+и отвечает {"results": [{"url": ..., "archived_snapshots": {...}}, ...]}. Домены пакета
+группируются по AVAIL_BATCH_SIZE в один запрос, а ответы раскладываются обратно по
+доменам. Домены, для которых пакетный ответ ничего не вернул, запрашиваются по одному
+обычным GET, так что результат не хуже, чем без пакетирования.
+
+AvailabilityBatcher делает то же для одиночных анализов, идущих параллельно в одном
+event loop (асинхронный воркер): запросы копятся до AVAIL_BATCH_SIZE доменов или
+AVAIL_BATCH_DELAY секунд и уходят одним POST.
+"""
+import asyncio
+import logging
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from domain_ingest import normalize_domain
+
+from .config import AVAIL_API, AVAIL_BATCH_DELAY, AVAIL_BATCH_SIZE
+from .fetch import lookup_availability, safe_request
+from .parse import parse_availability
+
+logger = logging.getLogger(__name__)
+
+Availability = Tuple[Dict, bool]
+
+
+def _result_key(url) -> Optional[str]:
+    return normalize_domain(url) if isinstance(url, str) else None
+
+
+async def _post_chunk(session: aiohttp.ClientSession, chunk: List[str]) -> Dict[str, Dict]:
+    payload = await safe_request(session, "POST", AVAIL_API, data={"url": "\n".join(chunk)})
+    results = payload.get("results") if isinstance(payload, dict) else None
+    if not isinstance(results, list):
+        return {}
+    found: Dict[str, Dict] = {}
+    wanted = set(chunk)
+    for item in results:
+        if not isinstance(item, dict):
+            continue
+        key = _result_key(item.get("url"))
+        if key in wanted:
+            found[key] = parse_availability(item)
+    return found
+
+
+async def fetch_availability_batch(session: aiohttp.ClientSession, domains: Iterable[str],
+                                   batch_size: int = AVAIL_BATCH_SIZE) -> Dict[str, Availability]:
+    """{domain: (has_snapshot/availability_ts, known)} для всех доменов (уже нормализованных)."""
+    domains = list(dict.fromkeys(domains))
+    chunks = [domains[i:i + batch_size] for i in range(0, len(domains), batch_size)]
+    results: Dict[str, Availability] = {}
+    for found in await asyncio.gather(*(_post_chunk(session, chunk) for chunk in chunks)):
+        results.update((domain, (fields, True)) for domain, fields in found.items())
+
+    missing = [d for d in domains if d not in results]
+    if missing:
+        logger.info(f"Availability batch: {len(missing)}/{len(domains)} domains fall back to single lookups")
+        for domain, value in zip(missing, await asyncio.gather(*(lookup_availability(session, d)
+                                                                  for d in missing))):
+            results[domain] = value
+    return results
+
+
+class AvailabilityBatcher:
+    """Копит одиночные запросы Availability из параллельных корутин и отправляет их пакетами."""
+
+    def __init__(self, session: aiohttp.ClientSession, batch_size: int = AVAIL_BATCH_SIZE,
+                 delay: float = AVAIL_BATCH_DELAY):
+        self.session = session
+        self.batch_size = batch_size
+        self.delay = delay
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def lookup(self, domain: str) -> Availability:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(domain, []).append(future)
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            asyncio.ensure_future(self._resolve(pending))
+
+    async def _resolve(self, pending: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            results = await fetch_availability_batch(self.session, pending, self.batch_size)
+        except Exception as e:
+            logger.warning(f"Availability batch failed: {e}")
+            results = {}
+        for domain, futures in pending.items():
+            value = results.get(domain, (parse_availability(None), False))
+            for future in futures:
+                if not future.done():
+                    future.set_result(value)
+
+
+_batchers: "weakref.WeakKeyDictionary[aiohttp.ClientSession, AvailabilityBatcher]" = weakref.WeakKeyDictionary()
+
+
+def get_batcher(session: aiohttp.ClientSession) -> AvailabilityBatcher:
+    """Общий батчер для HTTP-сессии (сессия живёт в одном event loop)."""
+    batcher = _batchers.get(session)
+    if batcher is None:
+        batcher = _batchers[session] = AvailabilityBatcher(session)
+    return batcher
@@ -0,0 +1,112 @@
+"""Стадия classify: оценка и категория домена по метрикам (профили scoring_profiles)."""
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from long_live_registry import long_live_registry
+from scoring_profiles import ScoringProfile, compile_profile, get_profile
+
+# Реестр long-live доменов (поддерживает `in` и `len`, перечитывается на лету)
+LONG_LIVE_DOMAINS = long_live_registry
+
+
+def load_long_live_domains(file_path: Optional[str] = None) -> None:
+    """Принудительно перечитывает реестр long-live доменов.
+    С файлом — загружает long_live_domains.txt (по умолчанию ищется в папке backend и в корне проекта).
+    """
+    LONG_LIVE_DOMAINS.reload(file_path=file_path)
+
+
+def set_category(info: Dict, score: int, category: str) -> Dict:
+    info["quality_score"] = score
+    info["category"] = category
+    info["quality"] = category
+    info["is_good"] = category in ("Recommended", "Medium")
+    info["recommended"] = category == "Recommended"
+    return info
+
+
+def classify_by_wayback(info: Dict, profile: Optional[ScoringProfile] = None) -> Dict:
+    """Эвристическая классификация на основе метрик Wayback.
+    Пороги берутся из профиля оценки (по умолчанию — профиль по умолчанию из scoring_profiles.json).
+    """
+    profile = profile or get_profile()
+    columns = metrics_to_columns([info])
+    scores, categories = compile_profile(profile)(columns["total_snapshots"],
+                                                  columns["years_covered"],
+                                                  columns["avg_interval_days"])
+    set_category(info, int(scores[0]), str(categories[0]))
+    info["scoring_profile"] = profile.key
+    return info
+
+
+def classify_domain(info: Dict, domain: str, profile: Optional[ScoringProfile] = None) -> Dict:
+    """Классификация результата анализа с учётом long-live реестра:
+    без метрик — Recommended для long-live и Low Quality для остальных;
+    long-live домен всегда Recommended.
+    """
+    if any(info.get(k) for k in ("total_snapshots", "years_covered", "avg_interval_days")):
+        classify_by_wayback(info, profile)
+    else:
+        if domain in LONG_LIVE_DOMAINS:
+            set_category(info, 100, "Recommended")
+        else:
+            set_category(info, 0, "Low Quality")
+        info["scoring_profile"] = (profile or get_profile()).key
+
+    if domain in LONG_LIVE_DOMAINS:
+        set_category(info, 100, "Recommended")
+    return info
+
+
+@lru_cache(maxsize=64)
+def candidate_min_snapshots(profile: ScoringProfile) -> int:
+    """Наименьшее число снимков, при котором домен ещё может набрать medium_cutoff.
+    Верхняя оценка балла при s снимках: баллы за s снимков + баллы за s лет (лет не больше,
+    чем снимков) + баллы за интервал. Если Medium недостижим вообще — порог за всеми tiers.
+    """
+    evaluate = compile_profile(profile)
+    limit = max([t for t, _ in profile.snapshot_tiers + profile.year_tiers] + [1]) + 1
+    for s in range(1, limit + 1):
+        scores, _ = evaluate([s], [s], [0.0])
+        if int(scores[0]) >= profile.medium_cutoff:
+            return s
+    return limit
+
+
+def metrics_to_columns(rows: Iterable[Dict]) -> Dict[str, "np.ndarray"]:
+    """Собирает колоночное представление метрик (snapshots, years, avg interval) из списка словарей.
+    Пустые/некорректные значения приводятся к тем же значениям по умолчанию, что и в classify_by_wayback.
+    """
+    snaps, years, intervals = [], [], []
+    for info in rows:
+        info = info or {}
+        try:
+            snaps.append(int(info.get("total_snapshots") or 0))
+        except (TypeError, ValueError):
+            snaps.append(0)
+        try:
+            years.append(int(info.get("years_covered") or 0))
+        except (TypeError, ValueError):
+            years.append(0)
+        try:
+            value = info.get("avg_interval_days")
+            intervals.append(float(value) if value not in (None, "") else np.inf)
+        except (TypeError, ValueError):
+            intervals.append(np.inf)
+    return {
+        "total_snapshots": np.asarray(snaps, dtype=np.int64),
+        "years_covered": np.asarray(years, dtype=np.int64),
+        "avg_interval_days": np.asarray(intervals, dtype=np.float64),
+    }
+
+
+def classify_batch(total_snapshots, years_covered, avg_interval_days,
+                   profile: Optional[ScoringProfile] = None):
+    """Пакетная (векторная) версия classify_by_wayback.
+    Принимает три массива одинаковой длины и возвращает (scores, categories):
+    scores — int массив 0..100, categories — массив строк из CATEGORIES.
+    """
+    profile = profile or get_profile()
+    return compile_profile(profile)(total_snapshots, years_covered, avg_interval_days)
@@ -0,0 +1,38 @@
+"""Адреса API Wayback и параметры сетевых запросов движка."""
+import os
+
+CDX_API = "https://web.archive.org/cdx/search/cdx"
+AVAIL_API = "https://archive.org/wayback/available"
+TIMEMAP_URL = "http://web.archive.org/web/timemap/link/{url}"
+REQUEST_TIMEOUT = 30
+RETRY_DELAY = 2
+RETRY_COUNT = 3
+
+# CDX читается страницами по CDX_PAGE_LIMIT строк, не дальше CDX_MAX_OFFSET
+CDX_PAGE_LIMIT = 1000
+CDX_MAX_OFFSET = 50000
+
+# размер куска при потоковом чтении ответов (Timemap)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Availability: до AVAIL_BATCH_SIZE доменов в одном POST; одиночные запросы воркера
+# копятся не дольше AVAIL_BATCH_DELAY секунд
+AVAIL_BATCH_SIZE = int(os.environ.get("AVAIL_BATCH_SIZE", 100))
+AVAIL_BATCH_DELAY = float(os.environ.get("AVAIL_BATCH_DELAY", 0.05))
+# домен без снимков по данным Availability не запрашивается в CDX/Timemap.
+# Выключено по умолчанию: пустой ответ Availability не означает «никогда не архивировался»,
+# а проба CDX (TRIAGE_ENABLED) стоит всего один короткий запрос
+AVAIL_PREFILTER = os.environ.get("AVAIL_PREFILTER", "false").lower() == "true"
+# двухступенчатый разбор: полная история CDX и Timemap — только для доменов,
+# которые по короткой пробе CDX могут дотянуть до Medium
+TRIAGE_ENABLED = os.environ.get("TRIAGE_ENABLED", "true").lower() == "true"
+
+# область запроса CDX: exact — только главная страница домена; domain — один запрос
+# matchType=domain по всем хостам и страницам; prefix — все страницы хоста (matchType=prefix)
+CDX_SCOPES = ("exact", "domain", "prefix")
+CDX_SCOPE = os.environ.get("CDX_SCOPE", "exact").lower()
+# в режимах domain/prefix CDX сам схлопывает снимки одного URL за сутки и отдаёт только HTML
+CDX_SCOPE_COLLAPSE = os.environ.get("CDX_SCOPE_COLLAPSE", "timestamp:8")
+CDX_SCOPE_FILTER = os.environ.get("CDX_SCOPE_FILTER", "mimetype:text/html")
+CDX_SCOPE_PAGE_LIMIT = int(os.environ.get("CDX_SCOPE_PAGE_LIMIT", 5000))
+CDX_SCOPE_MAX_OFFSET = int(os.environ.get("CDX_SCOPE_MAX_OFFSET", 200000))
@@ -0,0 +1,205 @@
+"""Подсчёт различных версий содержимого (unique_versions) по дайджестам CDX.
+
+DistinctCounter принимает 64-битные хеши (префиксы SHA1-дайджестов из таймлайна)
+и пока различных значений не больше exact_limit, хранит их как есть — счёт точный.
+Дальше он переходит в HyperLogLog с 2**precision однобайтовыми регистрами:
+память постоянна (4 КиБ при precision=12), а два счётчика объединяются поэлементным
+максимумом регистров. Поэтому сериализованный в отчёт счётчик можно слить с новым
+при следующем обновлении, не храня сами дайджесты.
+
+Мощность оценивается улучшенным оценщиком Ertl (2017) по гистограмме регистров: он
+не переключается на linear counting и не имеет переходной зоны со смещением.
+Относительная стандартная ошибка — около 1.04 / sqrt(2**precision), для precision=12 —
+1.2–1.7% во всём диапазоне, смещение по замерам меньше 0.2%. В ~95% случаев оценка
+отличается от точного значения не больше чем на ~3.5%, отдельные оценки — до ~5.5%
+(200 выборок на мощность, от 600 до 10**6). Замеры памяти и времени —
+scripts/distinct_benchmark.py.
+"""
+import base64
+import os
+import zlib
+from typing import Iterable, Optional
+
+import numpy as np
+
+DISTINCT_HLL_PRECISION = int(os.environ.get("DISTINCT_HLL_PRECISION", 12))
+DISTINCT_EXACT_LIMIT = int(os.environ.get("DISTINCT_EXACT_LIMIT", 512))
+# exact — unique_versions считается точно; hll — через DistinctCounter с сохранением скетча в отчёт
+UNIQUE_VERSIONS_MODE = os.environ.get("UNIQUE_VERSIONS_MODE", "exact").lower()
+
+SKETCH_VERSION = 1
+ADD_CHUNK = 8192
+_M64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def mix64(values: np.ndarray) -> np.ndarray:
+    """Финализатор splitmix64: равномерно перемешивает биты (префиксы не-base32 дайджестов
+    и прочие неслучайные ключи)."""
+    with np.errstate(over="ignore"):
+        z = np.asarray(values, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return (z ^ (z >> np.uint64(31))) & _M64
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Векторный int.bit_length для uint64: половины по 32 бита точно представимы во float64."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    high_len = np.frexp(high)[1]
+    low_len = np.frexp(low)[1]
+    return np.where(high_len > 0, high_len + 32, low_len).astype(np.int64)
+
+
+def _sigma(x: float) -> float:
+    """σ(x) = x + Σ x^(2^k)·2^(k-1) — вклад пустых регистров (Ertl, 2017)."""
+    if x == 1.0:
+        return float("inf")
+    y, z = 1.0, x
+    while True:
+        x *= x
+        z_old, z = z, z + x * y
+        y += y
+        if z == z_old:
+            return z
+
+
+def _tau(x: float) -> float:
+    """τ(x) — вклад переполненных регистров (Ertl, 2017)."""
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = np.sqrt(x)
+        y *= 0.5
+        z_old, z = z, z - (1.0 - x) ** 2 * y
+        if z == z_old:
+            return z / 3
+
+
+class DistinctCounter:
+    def __init__(self, precision: int = DISTINCT_HLL_PRECISION, exact_limit: int = DISTINCT_EXACT_LIMIT):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be in [4, 18]")
+        self.precision = precision
+        self.exact_limit = exact_limit
+        self._exact: Optional[np.ndarray] = np.empty(0, dtype=np.uint64)
+        self._registers: Optional[np.ndarray] = None
+
+    @property
+    def is_exact(self) -> bool:
+        return self._registers is None
+
+    @property
+    def nbytes(self) -> int:
+        """Память, занимаемая состоянием счётчика."""
+        return int(self._exact.nbytes if self.is_exact else self._registers.nbytes)
+
+    def add_hashes(self, hashes: Iterable[int]) -> "DistinctCounter":
+        """Добавляет 64-битные ключи (0 — «нет дайджеста» — пропускается)."""
+        values = np.asarray(hashes if isinstance(hashes, np.ndarray) else list(hashes), dtype=np.uint64)
+        # порциями: временные массивы не растут с длиной истории
+        for start in range(0, len(values), ADD_CHUNK):
+            chunk = values[start:start + ADD_CHUNK]
+            chunk = mix64(chunk[chunk != 0])
+            if self.is_exact:
+                self._exact = np.union1d(self._exact, chunk)
+                if len(self._exact) > self.exact_limit:
+                    self._to_registers()
+            else:
+                self._update_registers(chunk)
+        return self
+
+    def _to_registers(self) -> None:
+        self._registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        self._update_registers(self._exact)
+        self._exact = None
+
+    def _update_registers(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        p = np.uint64(self.precision)
+        index = (values >> (np.uint64(64) - p)).astype(np.int64)
+        rest = values & ((np.uint64(1) << (np.uint64(64) - p)) - np.uint64(1))
+        # ранг — позиция первой единицы в оставшихся 64-p битах (64-p+1, если их нет)
+        rank = (64 - self.precision + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self._registers, index, rank)
+
+    def count(self) -> int:
+        if self.is_exact:
+            return int(len(self._exact))
+        # улучшенная оценка Ertl по гистограмме регистров: без порога linear counting
+        # и без эмпирических таблиц смещения, несмещённая во всём диапазоне мощностей
+        m = len(self._registers)
+        q = 64 - self.precision
+        histogram = np.bincount(self._registers, minlength=q + 2).astype(np.float64)
+        z = m * _tau(1.0 - histogram[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        if not z:
+            # все регистры переполнены: мощность больше различимой 64-битными хешами
+            return 1 << 64
+        return int(round(m * m / (2 * np.log(2) * z)))
+
+    def merge(self, other: "DistinctCounter") -> "DistinctCounter":
+        """Объединение множеств (in place). Счётчики должны иметь одинаковую precision."""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge counters with different precision")
+        if other.is_exact:
+            # ключи other уже перемешаны — добавляем их напрямую
+            if self.is_exact:
+                self._exact = np.union1d(self._exact, other._exact)
+                if len(self._exact) > self.exact_limit:
+                    self._to_registers()
+            else:
+                self._update_registers(other._exact)
+        else:
+            if self.is_exact:
+                self._to_registers()
+            np.maximum(self._registers, other._registers, out=self._registers)
+        return self
+
+    def to_sketch(self) -> str:
+        """Компактная строка для JSONB отчёта: 'v:p:e|h:base64(zlib(...))'."""
+        if self.is_exact:
+            kind, payload = "e", self._exact.astype("<u8").tobytes()
+        else:
+            kind, payload = "h", self._registers.tobytes()
+        data = base64.b64encode(zlib.compress(payload, 6)).decode("ascii")
+        return f"{SKETCH_VERSION}:{self.precision}:{kind}:{data}"
+
+    @classmethod
+    def from_sketch(cls, sketch: str, exact_limit: int = DISTINCT_EXACT_LIMIT) -> "DistinctCounter":
+        version, precision, kind, data = sketch.split(":", 3)
+        if int(version) != SKETCH_VERSION:
+            raise ValueError(f"unsupported sketch version {version}")
+        counter = cls(precision=int(precision), exact_limit=exact_limit)
+        payload = zlib.decompress(base64.b64decode(data))
+        if kind == "e":
+            counter._exact = np.frombuffer(payload, dtype="<u8").astype(np.uint64)
+            if len(counter._exact) > exact_limit:
+                counter._to_registers()
+        elif kind == "h":
+            registers = np.frombuffer(payload, dtype=np.uint8).copy()
+            if len(registers) != 1 << counter.precision:
+                raise ValueError("sketch register count does not match precision")
+            counter._exact, counter._registers = None, registers
+        else:
+            raise ValueError(f"unknown sketch kind {kind!r}")
+        return counter
+
+
+def merge_sketches(*sketches: Optional[str]) -> Optional[str]:
+    """Сливает сериализованные счётчики (None пропускаются)."""
+    counters = [DistinctCounter.from_sketch(s) for s in sketches if s]
+    if not counters:
+        return None
+    merged = counters[0]
+    for counter in counters[1:]:
+        merged.merge(counter)
+    return merged.to_sketch()
+
+
+def sketch_count(sketch: Optional[str]) -> Optional[int]:
+    return DistinctCounter.from_sketch(sketch).count() if sketch else None
@@ -0,0 +1,157 @@
+"""Стадия fetch: HTTP-запросы к Wayback (Availability, CDX, Timemap) с ретраями."""
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .config import (AVAIL_API, CDX_API, CDX_MAX_OFFSET, CDX_PAGE_LIMIT, CDX_SCOPE_COLLAPSE, CDX_SCOPE_FILTER,
+                     CDX_SCOPE_MAX_OFFSET, CDX_SCOPE_PAGE_LIMIT, REQUEST_TIMEOUT, RETRY_COUNT, RETRY_DELAY,
+                     STREAM_CHUNK_SIZE, TIMEMAP_URL)
+from .parse import TimemapCounter, parse_availability, parse_cdx_page
+from .scope import ScopeAggregator
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentRequestError(aiohttp.ClientError):
+    """Ошибка, которую повтор не исправит: safe_request пробрасывает её сразу, без ретраев."""
+
+
+async def safe_request(session: aiohttp.ClientSession, method: str, url: str, reader=None, **kwargs):
+    """Универсальный безопасный запрос с ретраями. Возвращает JSON-объект или текст или None.
+    reader — корутина reader(resp) для потокового чтения тела; тогда возвращается её результат.
+    """
+    for attempt in range(1, RETRY_COUNT + 1):
+        try:
+            async with session.request(method, url, timeout=REQUEST_TIMEOUT, **kwargs) as resp:
+                resp.raise_for_status()
+                if reader is not None:
+                    return await reader(resp)
+                content_type = resp.headers.get("Content-Type", "")
+                text_content = await resp.text()
+                if "application/json" in content_type or kwargs.get("params", {}).get("output") == "json":
+                    if not text_content.strip():
+                        logger.warning(f"[{attempt}/{RETRY_COUNT}] Empty JSON response from {url}")
+                        return None
+                    try:
+                        return json.loads(text_content)
+                    except json.JSONDecodeError:
+                        logger.warning(f"[{attempt}/{RETRY_COUNT}] JSON decode error for {url}")
+                        return None
+                return text_content
+        except PermanentRequestError:
+            raise
+        except aiohttp.ClientResponseError as e:
+            logger.warning(f"[{attempt}/{RETRY_COUNT}] HTTP error {getattr(e,'status',None)} for {url}: {e}")
+            if attempt == RETRY_COUNT:
+                return None
+            if getattr(e, "status", None) == 429:
+                await asyncio.sleep(RETRY_DELAY * attempt * 2)
+            else:
+                await asyncio.sleep(RETRY_DELAY * attempt)
+        except asyncio.TimeoutError:
+            logger.warning(f"[{attempt}/{RETRY_COUNT}] Timeout for {url}")
+            if attempt == RETRY_COUNT:
+                return None
+        except Exception as e:
+            logger.error(f"[{attempt}/{RETRY_COUNT}] Unexpected error for {url}: {e}")
+            if attempt == RETRY_COUNT:
+                return None
+        if attempt < RETRY_COUNT:
+            await asyncio.sleep(RETRY_DELAY * attempt)
+    return None
+
+
+async def lookup_availability(session: aiohttp.ClientSession, domain: str) -> Tuple[Dict, bool]:
+    """(has_snapshot/availability_ts, known): known=False — ответа API не получено."""
+    try:
+        payload = await safe_request(session, "GET", AVAIL_API, params={"url": domain})
+    except Exception as e:
+        logger.warning(f"Availability error for {domain}: {e}")
+        payload = None
+    return parse_availability(payload), isinstance(payload, dict)
+
+
+async def fetch_availability(session: aiohttp.ClientSession, domain: str) -> Dict:
+    return (await lookup_availability(session, domain))[0]
+
+
+def cdx_params(domain: str, limit: int, scope: str = "exact") -> Dict:
+    """Параметры CDX. scope=domain/prefix — вся область домена одним запросом:
+    снимки одного URL за сутки схлопываются (collapse), лишние типы отсекаются (filter).
+    """
+    params = {
+        "url": domain,
+        "matchType": scope,
+        "output": "json",
+        "fl": "timestamp,original,digest",
+        "limit": limit
+    }
+    if scope != "exact":
+        if CDX_SCOPE_COLLAPSE:
+            params["collapse"] = CDX_SCOPE_COLLAPSE
+        if CDX_SCOPE_FILTER:
+            params["filter"] = CDX_SCOPE_FILTER
+    return params
+
+
+async def probe_cdx(session: aiohttp.ClientSession, domain: str, limit: int) -> Optional[List[Dict]]:
+    """Первые limit записей CDX одним коротким запросом; None — ответа нет (неизвестно)."""
+    batch = await safe_request(session, "GET", CDX_API, params=cdx_params(domain, limit))
+    return parse_cdx_page(batch) if batch is not None else None
+
+
+async def iter_cdx_pages(session: aiohttp.ClientSession, params: Dict, offset: int = 0,
+                         max_offset: int = CDX_MAX_OFFSET):
+    """Страницы CDX (списки записей) по params["limit"] строк, начиная с offset."""
+    limit = params["limit"]
+    while True:
+        batch = await safe_request(session, "GET", CDX_API, params={**params, "offset": offset})
+        if not batch:
+            return
+        page = parse_cdx_page(batch)
+        if page is None:
+            return
+        yield page
+        if len(batch) < (limit + 1):  # header + items OR fewer items
+            return
+        offset += limit
+        if offset > max_offset:
+            return
+
+
+async def fetch_cdx_records(session: aiohttp.ClientSession, domain: str, offset: int = 0) -> List[Dict]:
+    """Все записи CDX домена (timestamp, original, digest), постранично, начиная с offset."""
+    records: List[Dict] = []
+    async for page in iter_cdx_pages(session, cdx_params(domain, CDX_PAGE_LIMIT), offset=offset):
+        records.extend(page)
+    return records
+
+
+async def fetch_cdx_scope(session: aiohttp.ClientSession, domain: str, scope: str) -> ScopeAggregator:
+    """Область домена (scope=domain/prefix) одним постраничным запросом CDX;
+    страницы сразу сворачиваются в ScopeAggregator и в памяти не копятся.
+    """
+    aggregator = ScopeAggregator(domain)
+    params = cdx_params(domain, CDX_SCOPE_PAGE_LIMIT, scope)
+    async for page in iter_cdx_pages(session, params, max_offset=CDX_SCOPE_MAX_OFFSET):
+        aggregator.feed(page)
+    return aggregator
+
+
+async def _read_timemap(resp) -> Dict:
+    counter = TimemapCounter()
+    async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+        counter.feed(chunk)
+    return counter.close()
+
+
+async def fetch_timemap(session: aiohttp.ClientSession, domain: str) -> Dict:
+    """timemap_count и первый/последний memento; тело Timemap читается потоком, не целиком."""
+    try:
+        result = await safe_request(session, "GET", TIMEMAP_URL.format(url=domain), reader=_read_timemap)
+    except Exception:
+        result = None
+    return result or TimemapCounter().close()
@@ -0,0 +1,68 @@
+"""Стадия metrics: метрики снимков по записям CDX (через компактный таймлайн).
+
+unique_versions считается по 64-битным префиксам дайджестов таймлайна, без множества
+строк-дайджестов; в режиме UNIQUE_VERSIONS_MODE=hll — через DistinctCounter,
+скетч которого сохраняется в отчёте (unique_versions_sketch) для слияния при обновлениях.
+
+Для области домена (CDX_SCOPE=domain/prefix) основные метрики считаются по суткам,
+в которые архивировалась хоть одна страница области, unique_versions — по всем
+её записям; метрики главной страницы (по суткам, см. ScopeAggregator.exact_host)
+и сводка области — в exact_host и domain_scope.
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from snapshot_timeline import build_timeline, timeline_metrics
+
+from .distinct import UNIQUE_VERSIONS_MODE, DistinctCounter
+from .scope import ScopeAggregator
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_METRIC_KEYS = ("first_snapshot", "last_snapshot", "avg_interval_days", "max_gap_days",
+                        "years_covered", "snapshots_per_year", "unique_versions")
+
+
+def _timeline_metrics(timeline: Tuple[np.ndarray, np.ndarray], versions: Optional[np.ndarray] = None) -> Dict:
+    """Метрики таймлайна; versions — префиксы дайджестов для unique_versions (по умолчанию — таймлайна)."""
+    versions = timeline[1] if versions is None else versions
+    metrics = timeline_metrics(*timeline)
+    if metrics["first_snapshot"] is None:
+        return metrics
+    if UNIQUE_VERSIONS_MODE == "hll":
+        counter = DistinctCounter().add_hashes(versions)
+        metrics["unique_versions"] = counter.count()
+        metrics["unique_versions_sketch"] = counter.to_sketch()
+    elif versions is not timeline[1]:
+        metrics["unique_versions"] = int(len(np.unique(versions[versions != 0])))
+    return metrics
+
+
+def snapshot_metrics(records: List[Dict], domain: str = "") -> Tuple[Dict, Optional[Tuple[np.ndarray, np.ndarray]]]:
+    """Метрики снимков и сырой таймлайн (секунды, префиксы дайджестов).
+    При ошибке разбора метрики — None, таймлайн — None.
+    """
+    try:
+        timeline = build_timeline(records)
+        return _timeline_metrics(timeline), timeline
+    except Exception as e:
+        logger.warning(f"Error processing metrics for {domain}: {e}")
+        return {k: None for k in SNAPSHOT_METRIC_KEYS}, None
+
+
+def scope_metrics(aggregator: ScopeAggregator, domain: str = "") -> Tuple[Dict, Optional[Tuple[np.ndarray, np.ndarray]]]:
+    """Метрики области домена и таймлайн по суткам (см. ScopeAggregator.site_timeline).
+    Помимо SNAPSHOT_METRIC_KEYS — total_snapshots (сутки со снимками), exact_host и domain_scope.
+    """
+    try:
+        timeline = aggregator.site_timeline()
+        metrics = _timeline_metrics(timeline, versions=aggregator.timeline()[1])
+        metrics["total_snapshots"] = int(len(timeline[0]))
+        metrics["exact_host"] = aggregator.exact_host()
+        metrics["domain_scope"] = aggregator.summary()
+        return metrics, timeline
+    except Exception as e:
+        logger.warning(f"Error processing scope metrics for {domain}: {e}")
+        return {k: None for k in SNAPSHOT_METRIC_KEYS}, None
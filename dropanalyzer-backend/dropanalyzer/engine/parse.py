@@ -0,0 +1,95 @@
+"""Стадия parse: разбор ответов Availability, CDX и Timemap в простые структуры Python."""
+import re
+from typing import Dict, List, Optional
+
+TIMEMAP_MAX_LINE = 64 * 1024
+TIMEMAP_KEYS = ("timemap_count", "timemap_first", "timemap_last")
+_MEMENTO_TS = re.compile(rb"/web/(\d{14})")
+
+
+def parse_availability(payload) -> Dict:
+    """has_snapshot/availability_ts из ответа Availability API (None/мусор — снимков нет)."""
+    if payload and isinstance(payload, dict):
+        closest = payload.get("archived_snapshots", {}).get("closest")
+        return {
+            "has_snapshot": bool(closest and closest.get("available")),
+            "availability_ts": closest.get("timestamp") if closest else None,
+        }
+    return {"has_snapshot": False, "availability_ts": None}
+
+
+def parse_cdx_page(batch) -> Optional[List[Dict]]:
+    """Строки страницы CDX (output=json) как словари.
+    CDX отдаёт список списков с заголовком в первой строке; поддерживается и список словарей.
+    None — если ответ не список (страниц дальше нет).
+    """
+    if not isinstance(batch, list):
+        return None
+    records = []
+    if len(batch) >= 2 and isinstance(batch[0], list):
+        cols = batch[0]
+        for row in batch[1:]:
+            if isinstance(row, list) and len(row) == len(cols):
+                records.append(dict(zip(cols, row)))
+    else:
+        for item in batch:
+            if isinstance(item, dict):
+                records.append(item)
+    return records
+
+
+def count_timemap_links(text) -> int:
+    """Число ссылок на снимки (web/) в link-format Timemap."""
+    return text.count("web/") if text and isinstance(text, str) else 0
+
+
+def _memento_iso(ts: Optional[bytes]) -> Optional[str]:
+    if not ts:
+        return None
+    t = ts.decode("ascii")
+    return f"{t[0:4]}-{t[4:6]}-{t[6:8]}T{t[8:10]}:{t[10:12]}:{t[12:14]}"
+
+
+class TimemapCounter:
+    """Потоковый разбор link-format Timemap: куски ответа подаются в feed() по мере загрузки.
+    Считает ссылки web/ (как count_timemap_links по всему телу) и находит первый/последний
+    memento по 14-значной метке в URL. В памяти держится только незавершённая строка.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.first: Optional[bytes] = None
+        self.last: Optional[bytes] = None
+        self._tail = b""
+
+    def _line(self, line: bytes) -> None:
+        self.count += line.count(b"web/")
+        if b"memento" in line:
+            m = _MEMENTO_TS.search(line)
+            if m:
+                ts = m.group(1)
+                if self.first is None or ts < self.first:
+                    self.first = ts
+                if self.last is None or ts > self.last:
+                    self.last = ts
+
+    def feed(self, chunk: bytes) -> None:
+        lines = (self._tail + chunk).split(b"\n")
+        self._tail = lines.pop()
+        for line in lines:
+            self._line(line)
+        if len(self._tail) > TIMEMAP_MAX_LINE:
+            # строка без переводов: считаем её целиком и оставляем 3 байта для web/ на стыке
+            # (web/ не перекрывается сам с собой, поэтому двойного счёта не будет)
+            self.count += self._tail.count(b"web/")
+            self._tail = self._tail[-3:]
+
+    def close(self) -> Dict:
+        if self._tail:
+            self._line(self._tail)
+            self._tail = b""
+        return {
+            "timemap_count": self.count,
+            "timemap_first": _memento_iso(self.first),
+            "timemap_last": _memento_iso(self.last),
+        }
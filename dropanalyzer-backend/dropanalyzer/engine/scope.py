@@ -0,0 +1,138 @@
+"""Область домена: агрегация ответа CDX matchType=domain/prefix за один проход.
+
+Страницы CDX сворачиваются сразу при чтении, сами записи не хранятся:
+  - по хостам — число снимков, первый и последний снимок;
+  - по разделам (первый сегмент пути) — число снимков;
+  - exact-host — записи главной страницы домена (сам домен и www.); ответ области
+    схлопнут до одной записи адреса в сутки, поэтому это сутки со снимками главной,
+    а не все её снимки, как в ответе matchType=exact;
+  - таймлайн области — секунды и префиксы дайджестов всех записей (16 байт на запись);
+  - уникальные URL — DistinctCounter по 64-битным хешам адресов.
+Различных хостов и разделов учитывается не больше SCOPE_MAX_KEYS, остальные
+попадают в общий ключ OTHER_KEY.
+"""
+import hashlib
+import os
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from snapshot_timeline import (SECONDS_PER_DAY, build_timeline, digest_prefix, parse_cdx_timestamps, timeline_metrics,
+                               valid_cdx_timestamp)
+
+from .distinct import DistinctCounter
+
+SCOPE_TOP_N = int(os.environ.get("SCOPE_TOP_N", 10))
+SCOPE_MAX_KEYS = int(os.environ.get("SCOPE_MAX_KEYS", 10000))
+OTHER_KEY = "(other)"
+SECTION_MAX_LEN = 100
+
+
+def _iso(ts: str) -> str:
+    return f"{ts[:4]}-{ts[4:6]}-{ts[6:8]}T{ts[8:10]}:{ts[10:12]}:{ts[12:14]}"
+
+
+def split_original(original: str) -> Tuple[str, str, str]:
+    """(хост, путь, query) адреса из поля original записи CDX."""
+    parts = urlsplit(original if "://" in original else "http://" + original)
+    return (parts.hostname or "").rstrip("."), parts.path or "/", parts.query
+
+
+def url_hash(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class ScopeAggregator:
+    def __init__(self, domain: str):
+        self.domain = domain
+        self._root_hosts = (domain, "www." + domain)
+        self.captures = 0
+        self.hosts: Dict[str, List] = {}
+        self.sections: Dict[str, int] = {}
+        self.exact_records: List[Dict] = []
+        self.urls = DistinctCounter()
+        self._seconds: List[np.ndarray] = []
+        self._digests: List[np.ndarray] = []
+        self._timeline = None
+
+    def _key(self, table: Dict, key: str) -> str:
+        return key if key in table or len(table) < SCOPE_MAX_KEYS else OTHER_KEY
+
+    def feed(self, records: List[Dict]) -> None:
+        """Сворачивает страницу записей CDX (timestamp, original, digest)."""
+        rows = [r for r in records if valid_cdx_timestamp(r.get("timestamp"))]
+        if not rows:
+            return
+        hashes = np.empty(len(rows), dtype=np.uint64)
+        for i, r in enumerate(rows):
+            ts, original = r["timestamp"], r.get("original") or self.domain
+            host, path, query = split_original(original)
+            hashes[i] = url_hash(original)
+
+            key = self._key(self.hosts, host)
+            stats = self.hosts.get(key)
+            if stats is None:
+                self.hosts[key] = [1, ts, ts]
+            else:
+                stats[0] += 1
+                stats[1] = min(stats[1], ts)
+                stats[2] = max(stats[2], ts)
+
+            segment = path.split("/", 2)[1] if path.count("/") else ""
+            section = self._key(self.sections, ("/" + segment)[:SECTION_MAX_LEN])
+            self.sections[section] = self.sections.get(section, 0) + 1
+
+            if host in self._root_hosts and path == "/" and not query:
+                self.exact_records.append({"timestamp": ts, "digest": r.get("digest")})
+
+        self.captures += len(rows)
+        self._timeline = None
+        self.urls.add_hashes(hashes)
+        self._seconds.append(parse_cdx_timestamps(r["timestamp"] for r in rows))
+        self._digests.append(np.fromiter((digest_prefix(r.get("digest")) for r in rows),
+                                         dtype=np.uint64, count=len(rows)))
+
+    def timeline(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Все записи области: секунды и префиксы дайджестов, по времени."""
+        if self._timeline is None:
+            if not self._seconds:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64)
+            seconds, digests = np.concatenate(self._seconds), np.concatenate(self._digests)
+            order = np.argsort(seconds, kind="stable")
+            self._timeline = seconds[order], digests[order]
+        return self._timeline
+
+    def site_timeline(self) -> Tuple[np.ndarray, np.ndarray]:
+        """По одной точке на сутки, в которые архивировалась хоть одна страница области."""
+        seconds, digests = self.timeline()
+        if not len(seconds):
+            return seconds, digests
+        days = seconds // SECONDS_PER_DAY
+        first = np.concatenate(([True], days[1:] != days[:-1]))
+        return seconds[first], digests[first]
+
+    def exact_host(self) -> Dict:
+        """Метрики главной страницы домена по записям области: capture_days — число суток
+        со снимками главной. Записи схлопнуты по CDX_SCOPE_COLLAPSE, поэтому ни счёт, ни
+        интервалы и версии не сравнимы с метриками запроса matchType=exact."""
+        seconds, digests = build_timeline(self.exact_records)
+        metrics = timeline_metrics(seconds, digests)
+        metrics.pop("snapshots_per_year", None)
+        return {"capture_days": int(len(np.unique(seconds // SECONDS_PER_DAY))), **metrics}
+
+    def summary(self) -> Dict:
+        """Сводка по области: объём, хосты и разделы с наибольшим числом снимков."""
+        seconds, digests = self.timeline()
+        top_hosts = sorted(self.hosts.items(), key=lambda kv: -kv[1][0])[:SCOPE_TOP_N]
+        top_sections = sorted(self.sections.items(), key=lambda kv: -kv[1])[:SCOPE_TOP_N]
+        return {
+            "captures": self.captures,
+            "capture_days": int(len(np.unique(seconds // SECONDS_PER_DAY))),
+            "unique_urls": self.urls.count(),
+            "unique_versions": int(len(np.unique(digests[digests != 0]))),
+            "hosts": len(self.hosts),
+            "top_hosts": [{"host": host, "captures": n, "first_snapshot": _iso(first), "last_snapshot": _iso(last)}
+                          for host, (n, first, last) in top_hosts],
+            "top_sections": [{"section": section, "captures": n} for section, n in top_sections],
+        }
@@ -0,0 +1,325 @@
+"""Запись и воспроизведение HTTP-обменов с Wayback для воспроизводимых прогонов.
+
+Движок ходит в сеть только через session.request(...) (см. engine.fetch.safe_request),
+поэтому вместо aiohttp.ClientSession в analyze_single_domain / run_batch можно передать:
+
+  RecordingSession(session, store) — выполняет настоящие запросы и дописывает каждый
+      обмен (запрос, статус, Content-Type, тело, задержки, ошибка/таймаут) в хранилище;
+  ReplaySession(store, latency_scale) — отвечает из хранилища, не выходя в сеть.
+      latency_scale=1 воспроизводит записанные задержки (время до заголовков и чтение
+      тела), 0 — отвечает мгновенно.
+
+Хранилище — gzip-файл JSONL (FixtureStore), одна строка на обмен; дозапись создаёт
+новый gzip-member, поэтому файл можно пополнять несколькими прогонами. Одинаковые
+запросы воспроизводятся в порядке записи (повторы после ошибки — тоже), последний
+ответ отдаётся и дальше. Запроса, которого нет в хранилище, ReplaySession не
+выдумывает: поднимается FixtureMissing (без ретраев и их задержек), а ключ один раз
+попадает в session.misses.
+
+Исключение — пакетный POST Availability: состав пакета зависит от того, какие анализы
+совпали по времени, поэтому при воспроизведении он почти никогда не совпадает с
+записанным. Такой POST собирается из записанных ответов по отдельным доменам (из
+пакетных POST и одиночных GET); домены без записи в ответ не попадают, и движок
+запрашивает их одиночным GET, как и при записи.
+"""
+import asyncio
+import base64
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from domain_ingest import normalize_domain
+
+from .engine.config import AVAIL_API
+from .engine.fetch import PermanentRequestError
+
+FIXTURE_VERSION = 1
+
+
+class FixtureMissing(PermanentRequestError):
+    """В хранилище нет ответа на запрос; safe_request не повторяет такие запросы."""
+
+
+def request_key(method: str, url: str, params=None, data=None) -> str:
+    """Ключ обмена: метод, адрес, отсортированные параметры и тело формы."""
+    key = f"{method.upper()} {url}"
+    if params:
+        key += "?" + urlencode(sorted((str(k), str(v)) for k, v in dict(params).items()))
+    if data:
+        body = urlencode(sorted(data.items())) if isinstance(data, dict) else str(data)
+        key += " " + body
+    return key
+
+
+class FixtureStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._exchanges: Dict[str, List[Dict]] = defaultdict(list)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self) -> "FixtureStore":
+        if os.path.exists(self.path):
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        exchange = json.loads(line)
+                        self._exchanges[exchange["key"]].append(exchange)
+        return self
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._exchanges.values())
+
+    def keys(self):
+        return self._exchanges.keys()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        return self._exchanges.get(key)
+
+    def append(self, exchange: Dict) -> None:
+        with self._lock:
+            if self._file is None:
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._file.write(json.dumps(exchange, ensure_ascii=False) + "\n")
+            self._exchanges[exchange["key"]].append(exchange)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _encode_body(body: bytes) -> Dict:
+    try:
+        return {"body": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(body).decode("ascii")}
+
+
+def _decode_body(exchange: Dict) -> bytes:
+    if "body_b64" in exchange:
+        return base64.b64decode(exchange["body_b64"])
+    return (exchange.get("body") or "").encode("utf-8")
+
+
+class _Content:
+    """Минимум aiohttp.StreamReader, который нужен движку: iter_chunked и построчная итерация."""
+
+    def __init__(self, body: bytes, read_delay: float):
+        self._body = body
+        self._read_delay = read_delay
+
+    async def _pace(self, size: int) -> None:
+        if self._read_delay and self._body:
+            await asyncio.sleep(self._read_delay * size / len(self._body))
+
+    async def read(self) -> bytes:
+        await self._pace(len(self._body))
+        return self._body
+
+    async def iter_chunked(self, n: int):
+        for start in range(0, len(self._body), n):
+            chunk = self._body[start:start + n]
+            await self._pace(len(chunk))
+            yield chunk
+
+    async def _lines(self):
+        for line in self._body.splitlines(keepends=True):
+            await self._pace(len(line))
+            yield line
+
+    def __aiter__(self):
+        return self._lines()
+
+
+class FixtureResponse:
+    """Ответ из хранилища с интерфейсом aiohttp.ClientResponse в объёме, нужном движку."""
+
+    def __init__(self, method: str, url: str, status: int, content_type: str, body: bytes,
+                 read_delay: float = 0.0):
+        self.method = method
+        self.url = URL(url)
+        self.status = status
+        self.reason = ""
+        self.headers = CIMultiDictProxy(CIMultiDict({"Content-Type": content_type} if content_type else {}))
+        self.content = _Content(body, read_delay)
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            info = aiohttp.RequestInfo(self.url, self.method, self.headers, self.url)
+            raise aiohttp.ClientResponseError(info, (), status=self.status, message=self.reason,
+                                              headers=self.headers)
+
+    async def read(self) -> bytes:
+        return await self.content.read()
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        return (await self.read()).decode(encoding, errors="replace")
+
+    async def json(self, **kwargs):
+        return json.loads(await self.text())
+
+    def release(self) -> None:
+        pass
+
+
+class _RequestContext:
+    def __init__(self, coro):
+        self._coro = coro
+        self._resp = None
+
+    async def __aenter__(self):
+        self._resp = await self._coro
+        return self._resp
+
+    async def __aexit__(self, *exc):
+        self._resp.release()
+        return False
+
+
+class RecordingSession:
+    """Прокси над aiohttp.ClientSession, записывающий каждый обмен в FixtureStore."""
+
+    def __init__(self, session: aiohttp.ClientSession, store: FixtureStore):
+        self.session = session
+        self.store = store
+        self.recorded = 0
+
+    @property
+    def closed(self) -> bool:
+        return self.session.closed
+
+    def request(self, method: str, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self._request(method, url, **kwargs))
+
+    async def _request(self, method: str, url: str, **kwargs) -> FixtureResponse:
+        exchange = {"v": FIXTURE_VERSION,
+                    "key": request_key(method, url, kwargs.get("params"), kwargs.get("data")),
+                    "recorded_at": int(time.time())}
+        started = time.monotonic()
+        try:
+            # тело читается целиком: в запись идёт весь ответ, движку он отдаётся из памяти
+            async with self.session.request(method, url, **kwargs) as resp:
+                ttfb = time.monotonic() - started
+                body = await resp.read()
+                exchange.update(status=resp.status, content_type=resp.headers.get("Content-Type", ""),
+                                **_encode_body(body))
+        except asyncio.TimeoutError:
+            exchange.update(error="timeout", ttfb_ms=round((time.monotonic() - started) * 1000, 1))
+            self._save(exchange)
+            raise
+        except aiohttp.ClientError as e:
+            exchange.update(error="client", message=str(e),
+                            ttfb_ms=round((time.monotonic() - started) * 1000, 1))
+            self._save(exchange)
+            raise
+        exchange.update(ttfb_ms=round(ttfb * 1000, 1),
+                        elapsed_ms=round((time.monotonic() - started) * 1000, 1))
+        self._save(exchange)
+        return FixtureResponse(method, url, exchange["status"], exchange["content_type"], body)
+
+    def _save(self, exchange: Dict) -> None:
+        self.store.append(exchange)
+        self.recorded += 1
+
+
+class ReplaySession:
+    """Воспроизводит обмены из FixtureStore вместо сети.
+    latency_scale — множитель записанных задержек (1 — как при записи, 0 — без задержек).
+    """
+
+    def __init__(self, store: FixtureStore, latency_scale: float = 0.0):
+        self.store = store
+        self.latency_scale = latency_scale
+        self.closed = False
+        self.replayed = 0
+        self.misses: List[str] = []
+        self._missed = set()
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._availability: Optional[Dict[str, Dict]] = None
+
+    def request(self, method: str, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self._request(method, url, **kwargs))
+
+    async def _request(self, method: str, url: str, **kwargs) -> FixtureResponse:
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("data"))
+        exchanges = self.store.get(key)
+        if not exchanges and method.upper() == "POST" and url == AVAIL_API:
+            return self._availability_batch(method, url, kwargs.get("data"))
+        if not exchanges:
+            if key not in self._missed:
+                self._missed.add(key)
+                self.misses.append(key)
+            raise FixtureMissing(f"no recorded response for {key}")
+        i = self._cursor[key]
+        self._cursor[key] = i + 1
+        exchange = exchanges[min(i, len(exchanges) - 1)]
+        self.replayed += 1
+
+        ttfb = exchange.get("ttfb_ms", 0) / 1000 * self.latency_scale
+        if ttfb:
+            await asyncio.sleep(ttfb)
+        if exchange.get("error") == "timeout":
+            raise asyncio.TimeoutError()
+        if exchange.get("error"):
+            raise aiohttp.ClientError(exchange.get("message", "recorded client error"))
+        read_delay = max(exchange.get("elapsed_ms", 0) - exchange.get("ttfb_ms", 0), 0) / 1000 * self.latency_scale
+        return FixtureResponse(method, url, exchange["status"], exchange.get("content_type", ""),
+                               _decode_body(exchange), read_delay=read_delay)
+
+    def _availability_index(self) -> Dict[str, Dict]:
+        """Записанные ответы Availability по доменам: {домен: элемент results}."""
+        if self._availability is None:
+            index: Dict[str, Dict] = {}
+            prefix_get, prefix_post = f"GET {AVAIL_API}?", f"POST {AVAIL_API} "
+            for key in self.store.keys():
+                if not key.startswith((prefix_get, prefix_post)):
+                    continue
+                for exchange in self.store.get(key):
+                    if exchange.get("error") or exchange.get("status") != 200:
+                        continue
+                    try:
+                        payload = json.loads(_decode_body(exchange))
+                    except ValueError:
+                        continue
+                    if not isinstance(payload, dict):
+                        continue
+                    if key.startswith(prefix_post):
+                        items = payload.get("results") if isinstance(payload.get("results"), list) else []
+                    else:
+                        items = [dict(payload, url=payload.get("url") or _query_param(key, "url"))]
+                    for item in items:
+                        if not isinstance(item, dict) or not isinstance(item.get("url"), str):
+                            continue
+                        domain = normalize_domain(item["url"])
+                        if domain:
+                            index[domain] = item
+            self._availability = index
+        return self._availability
+
+    def _availability_batch(self, method: str, url: str, data) -> FixtureResponse:
+        index = self._availability_index()
+        urls = (data or {}).get("url", "") if isinstance(data, dict) else ""
+        results = [index[d] for d in (normalize_domain(u) for u in urls.split("\n")) if d in index]
+        self.replayed += 1
+        body = json.dumps({"results": results}).encode("utf-8")
+        return FixtureResponse(method, url, 200, "application/json", body)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def _query_param(key: str, name: str) -> Optional[str]:
+    query = key.split("?", 1)[1].split(" ", 1)[0] if "?" in key else ""
+    values = parse_qs(query).get(name)
+    return values[0] if values else None
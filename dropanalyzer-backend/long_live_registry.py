@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+long_live_registry.py — Реестр long-live доменов для DropAnalyzer.
+
+Источник истины — таблица long_live_domains (если задан DATABASE_URL), иначе файл
+long_live_domains.txt. В процессе хранится только отсортированный массив 64-битных
+хэшей имён (8 байт на домен), поиск — бинарный (np.searchsorted). Совпадение по хэшу
+при работе с БД подтверждается точным запросом, поэтому коллизии не дают ложных срабатываний;
+если БД недоступна, совпадение не засчитывается.
+
+Кэш перечитывается без рестарта процессов: для БД — когда меняется счётчик версии
+в Redis (его увеличивает команда импорта), для файла — когда меняется mtime.
+Проверка выполняется не чаще, чем раз в LONG_LIVE_CHECK_INTERVAL секунд.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from domain_ingest import normalize_domain
+
+logger = logging.getLogger(__name__)
+
+LONG_LIVE_CHECK_INTERVAL = float(os.environ.get("LONG_LIVE_CHECK_INTERVAL", 5))
+LONG_LIVE_VERSION_KEY = "dropanalyzer:long_live:version"
+LONG_LIVE_TABLE = "long_live_domains"
+
+
+def normalize_long_live_name(name: str) -> str:
+    """Та же нормализация, что и для анализируемых доменов (регистр, схема, IDN)."""
+    return normalize_domain(name) or name.strip().lower()
+
+
+def domain_hash(name: str) -> int:
+    """64-битный хэш нормализованного имени домена."""
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def default_file_candidates(file_path: Optional[str] = None) -> List[str]:
+    """Пути поиска long_live_domains.txt: явный путь, папка backend, корень проекта."""
+    candidates = []
+    if file_path:
+        candidates.append(file_path)
+    candidates.append(os.path.join(os.path.dirname(__file__), "long_live_domains.txt"))
+    candidates.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "long_live_domains.txt"))
+    return candidates
+
+
+def database_url() -> Optional[str]:
+    return os.environ.get("DATABASE_URL") or os.environ.get("SQLALCHEMY_DATABASE_URI")
+
+
+def redis_url() -> str:
+    return os.environ.get("REDIS_URL") or os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
+
+
+class LongLiveRegistry:
+    """Компактный, перезагружаемый на лету набор long-live доменов (поддерживает `in` и `len`)."""
+
+    def __init__(self, file_path: Optional[str] = None, db_url: Optional[str] = None,
+                 check_interval: float = LONG_LIVE_CHECK_INTERVAL):
+        self.file_path = file_path
+        self.db_url = db_url
+        self.check_interval = check_interval
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._loaded = False
+        self._source: Optional[str] = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._engine = None
+        self._redis = None
+
+    # ----- источники -----
+    def _get_engine(self):
+        if self._engine is None:
+            from sqlalchemy import create_engine
+            self._engine = create_engine(self.db_url or database_url(), pool_pre_ping=True, pool_size=2)
+        return self._engine
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(redis_url(), socket_timeout=1)
+        return self._redis
+
+    def _use_db(self) -> bool:
+        return bool(self.db_url or (self.file_path is None and database_url()))
+
+    def _find_file(self) -> Optional[str]:
+        for p in default_file_candidates(self.file_path):
+            if os.path.exists(p):
+                return p
+        return None
+
+    def _iter_db_names(self) -> Iterator[str]:
+        from sqlalchemy import text
+        with self._get_engine().connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=50000).execute(
+                text(f"SELECT name FROM {LONG_LIVE_TABLE}")
+            )
+            for (name,) in result:
+                yield name
+
+    def _iter_file_names(self, path: str) -> Iterator[str]:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield normalize_long_live_name(line)
+
+    def _current_version(self):
+        """Версия источника: счётчик в Redis для БД, mtime для файла."""
+        if self._use_db():
+            try:
+                value = self._get_redis().get(LONG_LIVE_VERSION_KEY)
+                return int(value) if value is not None else 0
+            except Exception as e:
+                logger.warning(f"Cannot read long-live version from Redis: {e}")
+                return self._version
+        path = self._find_file()
+        return (path, os.path.getmtime(path)) if path else None
+
+    # ----- загрузка -----
+    def _build(self, names: Iterable[str]) -> np.ndarray:
+        hashes = np.fromiter((domain_hash(n) for n in names), dtype=np.uint64)
+        return np.unique(hashes)  # сортирует и убирает дубликаты
+
+    def reload(self, file_path: Optional[str] = None) -> None:
+        """Полностью перечитывает источник и атомарно подменяет массив хэшей."""
+        if file_path:
+            self.file_path = file_path
+        version = self._current_version()
+        try:
+            if self._use_db():
+                hashes, source = self._build(self._iter_db_names()), LONG_LIVE_TABLE
+            else:
+                path = self._find_file()
+                hashes = self._build(self._iter_file_names(path)) if path else np.empty(0, dtype=np.uint64)
+                source = path
+        except Exception as e:
+            logger.warning(f"Cannot load long-live domains: {e}")
+            if self._loaded:
+                return
+            hashes, source = np.empty(0, dtype=np.uint64), None
+
+        self._hashes = hashes
+        self._source = source
+        self._version = version
+        self._loaded = True
+        self._checked_at = time.monotonic()
+        logger.info(f"Loaded {len(hashes)} long-live domains from {source or 'nowhere'}")
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if not self._loaded:
+                self.reload()
+                return
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            if self._current_version() != self._version:
+                self.reload()
+
+    # ----- поиск -----
+    def _confirm(self, name: str) -> bool:
+        """Точная проверка в БД для совпадений по хэшу; при ошибке БД — False (fail closed)."""
+        from sqlalchemy import text
+        try:
+            with self._get_engine().connect() as conn:
+                row = conn.execute(text(f"SELECT 1 FROM {LONG_LIVE_TABLE} WHERE name = :name"),
+                                   {"name": name}).first()
+            return row is not None
+        except Exception as e:
+            # без точной проверки совпадение по хэшу может быть коллизией, а long-live
+            # даёт оценку 100 — при недоступной БД домен long-live не считается
+            logger.error(f"Long-live exact check failed for {name}, treating as not long-live: {e}")
+            return False
+
+    def __contains__(self, name) -> bool:
+        if not isinstance(name, str):
+            return False
+        self._maybe_reload()
+        hashes = self._hashes
+        if not len(hashes):
+            return False
+        name = normalize_long_live_name(name)
+        h = np.uint64(domain_hash(name))
+        idx = int(np.searchsorted(hashes, h))
+        if idx >= len(hashes) or hashes[idx] != h:
+            return False
+        return self._confirm(name) if self._source == LONG_LIVE_TABLE else True
+
+    def __len__(self) -> int:
+        self._maybe_reload()
+        return int(len(self._hashes))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._hashes.nbytes)
+
+
+def bump_long_live_version() -> Optional[int]:
+    """Увеличивает счётчик версии в Redis — все процессы перечитают реестр при следующей проверке."""
+    try:
+        import redis
+        return int(redis.Redis.from_url(redis_url(), socket_timeout=1).incr(LONG_LIVE_VERSION_KEY))
+    except Exception as e:
+        logger.warning(f"Cannot bump long-live version in Redis: {e}")
+        return None
+
+
+long_live_registry = LongLiveRegistry()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+scoring_profiles.py — Версионируемые профили оценки доменов для DropAnalyzer.
+
+Пороги эвристики classify_by_wayback вынесены в конфиг (JSON). Каждый профиль
+имеет имя и версию; ключ профиля "<name>@<version>" сохраняется в Report.
+Профиль компилируется один раз в векторную функцию оценки, поэтому несколько
+профилей можно прогнать по одним и тем же сохранённым метрикам за один проход.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCORING_PROFILES_FILE = os.environ.get(
+    "SCORING_PROFILES_FILE",
+    os.path.join(os.path.dirname(__file__), "scoring_profiles.json"),
+)
+CATEGORIES = ("Low Quality", "Medium", "Recommended")
+
+
+@dataclass(frozen=True)
+class ScoringProfile:
+    """Пороги и веса эвристики. Tiers — пары (порог, баллы), баллы берутся по наибольшему достигнутому порогу."""
+    name: str
+    version: int
+    snapshot_tiers: Tuple[Tuple[int, int], ...] = ((20, 30), (100, 60))
+    year_tiers: Tuple[Tuple[int, int], ...] = ((2, 15), (5, 30))
+    max_avg_interval_days: float = 365
+    interval_points: int = 10
+    medium_cutoff: int = 40
+    recommended_cutoff: int = 80
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ScoringProfile":
+        def tiers(raw):
+            return tuple(sorted((int(t), int(p)) for t, p in raw))
+
+        defaults = cls(name="", version=0)
+        return cls(
+            name=str(data["name"]),
+            version=int(data.get("version", 1)),
+            snapshot_tiers=tiers(data["snapshot_tiers"]) if "snapshot_tiers" in data else defaults.snapshot_tiers,
+            year_tiers=tiers(data["year_tiers"]) if "year_tiers" in data else defaults.year_tiers,
+            max_avg_interval_days=float(data.get("max_avg_interval_days", defaults.max_avg_interval_days)),
+            interval_points=int(data.get("interval_points", defaults.interval_points)),
+            medium_cutoff=int(data.get("medium_cutoff", defaults.medium_cutoff)),
+            recommended_cutoff=int(data.get("recommended_cutoff", defaults.recommended_cutoff)),
+        )
+
+
+# Встроенный профиль повторяет исторические пороги и используется, если конфиг не найден
+BUILTIN_PROFILE = ScoringProfile(name="baseline", version=1)
+
+# Все когда-либо загруженные версии: "<name>@<version>" -> профиль
+_versions: Dict[str, ScoringProfile] = {BUILTIN_PROFILE.key: BUILTIN_PROFILE}
+_profiles_cache: Dict = {"mtime": None, "path": None, "profiles": {}, "default": BUILTIN_PROFILE.name}
+
+
+def load_scoring_profiles(file_path: Optional[str] = None) -> Dict[str, ScoringProfile]:
+    """Загружает профили из JSON-конфига (перечитывает только при изменении mtime файла).
+    Возвращает словарь name -> ScoringProfile (последняя версия каждого имени)
+    и регистрирует все версии, чтобы старые отчёты можно было переоценить их профилем.
+    """
+    path = file_path or SCORING_PROFILES_FILE
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+
+    if _profiles_cache["path"] == path and _profiles_cache["mtime"] == mtime and _profiles_cache["profiles"]:
+        return _profiles_cache["profiles"]
+
+    profiles: Dict[str, ScoringProfile] = {BUILTIN_PROFILE.name: BUILTIN_PROFILE}
+    default_name = BUILTIN_PROFILE.name
+    if mtime is not None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for raw in data.get("profiles", []):
+                profile = ScoringProfile.from_dict(raw)
+                _versions[profile.key] = profile
+                current = profiles.get(profile.name)
+                if current is None or current is BUILTIN_PROFILE or profile.version >= current.version:
+                    profiles[profile.name] = profile
+            default_name = data.get("default", default_name)
+            logger.info(f"Loaded {len(profiles)} scoring profiles from {path}")
+        except Exception as e:
+            logger.warning(f"Cannot load scoring profiles from {path}: {e}")
+
+    if default_name not in profiles:
+        logger.warning(f"Default scoring profile '{default_name}' not found, using {BUILTIN_PROFILE.key}")
+        default_name = BUILTIN_PROFILE.name
+
+    _profiles_cache.update(path=path, mtime=mtime, profiles=profiles, default=default_name)
+    return profiles
+
+
+def get_profile(name: Optional[str] = None) -> ScoringProfile:
+    """Возвращает профиль по имени ("name") или ключу с версией ("name@3"); без имени — профиль по умолчанию."""
+    profiles = load_scoring_profiles()
+    if not name:
+        return profiles[_profiles_cache["default"]]
+    if "@" in name:
+        if name in _versions:
+            return _versions[name]
+        raise KeyError(f"Unknown scoring profile version: {name}")
+    if name in profiles:
+        return profiles[name]
+    raise KeyError(f"Unknown scoring profile: {name}")
+
+
+@lru_cache(maxsize=64)
+def compile_profile(profile: ScoringProfile):
+    """Компилирует профиль в векторную функцию evaluate(snapshots, years, avg_interval) -> (scores, categories).
+    Пороги превращаются в отсортированные массивы, а баллы ищутся через np.searchsorted,
+    поэтому стоимость оценки не зависит от числа порогов в Python-коде.
+    """
+    snap_thresholds = np.array([t for t, _ in profile.snapshot_tiers], dtype=np.int64)
+    snap_points = np.array([0] + [p for _, p in profile.snapshot_tiers], dtype=np.int64)
+    year_thresholds = np.array([t for t, _ in profile.year_tiers], dtype=np.int64)
+    year_points = np.array([0] + [p for _, p in profile.year_tiers], dtype=np.int64)
+    cutoffs = np.array([profile.medium_cutoff, profile.recommended_cutoff], dtype=np.int64)
+    labels = np.asarray(CATEGORIES, dtype=object)
+    max_interval = float(profile.max_avg_interval_days)
+    interval_points = int(profile.interval_points)
+
+    def evaluate(total_snapshots, years_covered, avg_interval_days):
+        snaps = np.asarray(total_snapshots, dtype=np.int64)
+        years = np.asarray(years_covered, dtype=np.int64)
+        interval = np.asarray(avg_interval_days, dtype=np.float64)
+
+        score = snap_points[np.searchsorted(snap_thresholds, snaps, side="right")]
+        score = score + year_points[np.searchsorted(year_thresholds, years, side="right")]
+        # NaN <= x == False, так что отсутствующий интервал баллов не даёт
+        score = score + np.where(interval <= max_interval, interval_points, 0)
+        score = np.clip(score, 0, 100)
+        return score, labels[np.searchsorted(cutoffs, score, side="right")]
+
+    return evaluate
+
+
+def evaluate_profiles(columns: Dict[str, np.ndarray],
+                      profiles: Iterable[ScoringProfile]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """A/B-оценка: прогоняет несколько профилей по одному колоночному набору метрик.
+    Возвращает profile.key -> (scores, categories).
+    """
+    snaps = columns["total_snapshots"]
+    years = columns["years_covered"]
+    interval = columns["avg_interval_days"]
+    return {p.key: compile_profile(p)(snaps, years, interval) for p in profiles}
@@ -7,7 +7,6 @@ from dotenv import load_dotenv
 from flask import Flask
 from sqlalchemy import create_engine
 from sqlalchemy.exc import OperationalError
-from passlib.hash import bcrypt
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -17,12 +16,23 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-ALEMBIC_INI = os.path.join(BASE_DIR, "alembic.ini")
+# alembic.ini лежит в корне репозитория (рядом с docker-compose.yml), script_location = alembic
+# разрешается относительно рабочего каталога — поэтому alembic запускается из BASE_DIR
+ALEMBIC_INI = next((p for p in (os.path.join(BASE_DIR, "alembic.ini"),
+                                os.path.join(os.path.dirname(BASE_DIR), "alembic.ini"))
+                    if os.path.exists(p)), os.path.join(BASE_DIR, "alembic.ini"))
+# схема, которую db.create_all() создавал до появления миграций, соответствует первой ревизии
+ALEMBIC_BASELINE = "0001_create_tables"
 
 # --- Импорты ---
 from src.extensions import db  # общий db
 from src.models.user import User
 from src.models.domain import Domain, Report
+from src.models.task_result import TaskResult  # noqa: F401 — таблица для create_all
+from src.auth import password_hasher
+from src.models.domain import LongLiveDomain
+from long_live_registry import bump_long_live_version, default_file_candidates
+from import_long_live import import_file
 
 # --- Конфигурация ---
 ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "Keyadmin")
@@ -48,16 +58,27 @@ def wait_for_db(uri, retries=DB_WAIT_RETRIES, delay=DB_WAIT_DELAY):
     return False
 
 
-def run_alembic():
-    """Запускаем миграции Alembic, если есть alembic.ini."""
+def run_alembic(uri):
+    """Применяет миграции Alembic; при ошибке инициализация прерывается.
+    База, созданная db.create_all() до появления миграций (таблицы есть, alembic_version нет),
+    сначала помечается базовой ревизией ALEMBIC_BASELINE, чтобы 0001 не создавала таблицы заново.
+    """
     if not os.path.exists(ALEMBIC_INI):
-        print(f"[db_init] alembic.ini не найден ({ALEMBIC_INI}). Пропускаем миграции.")
-        return
+        print(f"[db_init] alembic.ini не найден ({ALEMBIC_INI}).")
+        sys.exit(1)
+    from sqlalchemy import inspect
+    tables = set(inspect(create_engine(uri)).get_table_names())
+    command = ["alembic", "-c", ALEMBIC_INI]
     try:
-        subprocess.run(["alembic", "-c", ALEMBIC_INI, "upgrade", "head"], check=True)
+        if "domains" in tables and "alembic_version" not in tables:
+            print(f"[db_init] Схема без alembic_version — помечаем ревизией {ALEMBIC_BASELINE}.")
+            subprocess.run(command + ["stamp", ALEMBIC_BASELINE], check=True, cwd=BASE_DIR)
+        subprocess.run(command + ["upgrade", "head"], check=True, cwd=BASE_DIR)
         print("[db_init] Alembic миграции применены.")
     except subprocess.CalledProcessError as e:
+        # create_all не добавляет колонки в существующие таблицы — без миграций схема устареет
         print(f"[db_init] Alembic вернул ошибку: {e}")
+        sys.exit(1)
 
 
 def create_flask_app(uri):
@@ -78,7 +99,7 @@ def create_admin_and_seed(app):
         admin = User.query.filter_by(username=ADMIN_USERNAME).first()
         if not admin:
             print(f"[db_init] Создаём админа '{ADMIN_USERNAME}'...")
-            hashed = bcrypt.hash(ADMIN_PASSWORD)
+            hashed = password_hasher.hash(ADMIN_PASSWORD)
             admin = User(username=ADMIN_USERNAME, password=hashed)
             db.session.add(admin)
             db.session.commit()
@@ -102,6 +123,24 @@ def create_admin_and_seed(app):
             print("[db_init] Домены уже есть — пропускаем seed.")
 
 
+def seed_long_live(app, uri):
+    """Заполняет пустую таблицу long_live_domains из long_live_domains.txt.
+    При заданном DATABASE_URL реестр читает только таблицу, поэтому без этого список
+    из файла после обновления молча перестал бы действовать.
+    """
+    with app.app_context():
+        if LongLiveDomain.query.first():
+            print("[db_init] long_live_domains уже заполнена — пропускаем импорт.")
+            return
+    path = next((p for p in default_file_candidates() if os.path.exists(p)), None)
+    if not path:
+        print("[db_init] long_live_domains.txt не найден — реестр long-live пуст.")
+        return
+    total = import_file(uri, path)
+    bump_long_live_version()
+    print(f"[db_init] long_live_domains заполнена из {path}: {total} доменов.")
+
+
 def main():
     print("[db_init] Старт инициализации БД")
 
@@ -112,10 +151,11 @@ def main():
     if not wait_for_db(DATABASE_URL):
         sys.exit(1)
 
-    run_alembic()
+    run_alembic(DATABASE_URL)
 
     app = create_flask_app(DATABASE_URL)
     create_admin_and_seed(app)
+    seed_long_live(app, DATABASE_URL)
 
     print("[db_init] Инициализация завершена.")
 
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Сравнение способов подсчёта unique_versions на синтетических историях CDX.
+
+Для каждого размера истории генерируются base32-дайджесты (с повторами, как у реальных
+снимков неизменной страницы) и замеряются время, пиковая память (tracemalloc)
+и размер итогового состояния:
+  set    — множество строк-дайджестов (прежний способ);
+  unique — np.unique по 64-битным префиксам таймлайна (точный режим);
+  hll    — DistinctCounter (HyperLogLog после DISTINCT_EXACT_LIMIT различных значений).
+Для hll печатается относительная ошибка и размер сериализованного скетча;
+--trials оценивает разброс ошибки на независимых выборках.
+
+Пример:
+  python scripts/distinct_benchmark.py --rows 50000,200000 --output scripts/distinct_profile.txt
+"""
+import argparse
+import base64
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from dropanalyzer.engine.distinct import DISTINCT_HLL_PRECISION, DistinctCounter
+from snapshot_timeline import digest_prefix
+
+
+def make_digests(rows, distinct_ratio, seed):
+    rng = np.random.default_rng(seed)
+    pool = [base64.b32encode(rng.bytes(20)).decode("ascii") for _ in range(max(1, int(rows * distinct_ratio)))]
+    picks = rng.integers(0, len(pool), rows)
+    return [pool[i] for i in picks]
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    value = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, elapsed, peak
+
+
+def run_case(rows, distinct_ratio, seed):
+    digests = make_digests(rows, distinct_ratio, seed)
+    prefixes = np.fromiter((digest_prefix(d) for d in digests), dtype=np.uint64, count=len(digests))
+    seen, t_set, m_set = measure(lambda: {d for d in digests if d})
+    exact = len(seen)
+    uniq, t_unique, m_unique = measure(lambda: np.unique(prefixes[prefixes != 0]))
+    counter, t_hll, m_hll = measure(lambda: DistinctCounter().add_hashes(prefixes))
+    estimate = counter.count()
+    state_set = sys.getsizeof(seen) + sum(sys.getsizeof(d) for d in seen)
+    return {
+        "exact": exact, "estimate": estimate,
+        "error": (estimate - exact) / exact if exact else 0.0,
+        "sketch_bytes": len(counter.to_sketch()), "mode": "exact" if counter.is_exact else "hll",
+        "timings": {"set": (t_set, m_set, state_set), "unique": (t_unique, m_unique, uniq.nbytes),
+                    "hll": (t_hll, m_hll, counter.nbytes)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="unique_versions: exact set vs np.unique vs HyperLogLog")
+    parser.add_argument("--rows", default="1000,50000,200000", help="размеры историй через запятую")
+    parser.add_argument("--distinct", type=float, default=0.3, help="доля различных дайджестов")
+    parser.add_argument("--trials", type=int, default=10, help="выборок для оценки разброса ошибки hll")
+    parser.add_argument("--output", help="дополнительно записать отчёт в файл")
+    args = parser.parse_args()
+
+    # прогрев numpy, чтобы первый замер не включал ленивую инициализацию
+    DistinctCounter().add_hashes(np.arange(1, 1000, dtype=np.uint64)).count()
+    np.unique(np.arange(10, dtype=np.uint64))
+
+    lines = [f"# python {sys.version.split()[0]}, precision={DISTINCT_HLL_PRECISION}, "
+             f"distinct={args.distinct}, trials={args.trials}"]
+    for rows in (int(r) for r in args.rows.split(",")):
+        case = run_case(rows, args.distinct, seed=rows)
+        lines.append(f"[distinct] rows={rows} distinct={case['exact']} hll={case['estimate']} "
+                     f"({case['mode']}, error {case['error'] * 100:+.2f}%, sketch {case['sketch_bytes']} B)")
+        for name, (elapsed, peak, state) in case["timings"].items():
+            lines.append(f"    {name:<7}{elapsed * 1000:9.2f} ms  peak {peak / 1024:9.1f} KiB  "
+                         f"state {state / 1024:9.1f} KiB")
+        errors = [abs(run_case(rows, args.distinct, seed=rows + i)["error"]) for i in range(1, args.trials)]
+        if errors:
+            lines.append(f"    error over {len(errors)} trials: mean {statistics.mean(errors) * 100:.2f}%, "
+                         f"max {max(errors) * 100:.2f}%")
+        print("\n".join(lines[-5:] if errors else lines[-4:]))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"[distinct] Отчёт записан в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
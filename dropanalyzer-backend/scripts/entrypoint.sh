@@ -6,10 +6,31 @@ python /app/dropanalyzer-backend/scripts/db_init.py || { echo "❌ db_init faile
 
 if [ "$SERVICE_ROLE" = "web" ]; then
     echo "🌍 Запуск web-сервера..."
-    exec gunicorn --bind 0.0.0.0:5000 src.main:app --workers 3
+    # потоки (gthread): долгие потоковые ответы /batch/<id>/stream не занимают процесс целиком
+    exec gunicorn --bind 0.0.0.0:5000 "src.main:create_app()" --workers 3 --threads "${GUNICORN_THREADS:-8}"
 elif [ "$SERVICE_ROLE" = "worker" ]; then
-    echo "⚙ Запуск Celery worker..."
-    exec celery -A src.celery_app.celery worker --loglevel=info
+    # CELERY_QUEUES: "interactive" — выделенный воркер для одиночных запросов,
+    # "interactive,bulk" — общий воркер (interactive всегда выбирается первой)
+    CELERY_QUEUES="${CELERY_QUEUES:-interactive,bulk}"
+    # BULK_SHARD_NODE: узел из BULK_SHARDS, чью очередь bulk.shard.<node> слушает этот воркер
+    if [ -n "$BULK_SHARD_NODE" ]; then
+        CELERY_QUEUES="$CELERY_QUEUES,bulk.shard.$BULK_SHARD_NODE"
+    fi
+    echo "⚙ Запуск Celery worker (очереди: $CELERY_QUEUES)..."
+    if [ "$WORKER_MODE" = "async" ]; then
+        # один процесс: потоки задач отдают корутины общему event loop (см. src/aio_runtime.py).
+        # Потоков ASYNC_MAX_INFLIGHT, а соединений с БД — DB_POOL_SIZE + DB_MAX_OVERFLOW:
+        # запись отчётов ограничена семафором по размеру пула (src/tasks/analyze_tasks.py)
+        exec celery -A src.celery_app.celery worker --loglevel=info \
+            -Q "$CELERY_QUEUES" \
+            --pool threads --concurrency "${ASYNC_MAX_INFLIGHT:-200}"
+    fi
+    exec celery -A src.celery_app.celery worker --loglevel=info \
+        -Q "$CELERY_QUEUES" \
+        --concurrency "${CELERY_CONCURRENCY:-4}" -O fair
+elif [ "$SERVICE_ROLE" = "beat" ]; then
+    echo "⏱ Запуск Celery beat..."
+    exec celery -A src.celery_app.celery beat --loglevel=info
 else
     echo "❌ Unknown SERVICE_ROLE: $SERVICE_ROLE"
     exit 1
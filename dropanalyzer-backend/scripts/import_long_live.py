@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Массовый импорт long-live доменов в таблицу long_live_domains.
+
+Пример:
+    python scripts/import_long_live.py long_live_domains.txt
+    python scripts/import_long_live.py big_list.txt --replace
+
+Файл читается потоково и вставляется порциями (INSERT ... ON CONFLICT DO NOTHING).
+С --replace старый список удаляется в той же транзакции: читатели видят либо старый,
+либо новый список целиком. После импорта увеличивается версия реестра в Redis,
+и все web/worker процессы перечитывают его без рестарта.
+"""
+import argparse
+import os
+import sys
+import time
+from itertools import islice
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import insert
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from src.models.domain import LongLiveDomain
+from long_live_registry import bump_long_live_version, database_url, normalize_long_live_name
+
+CHUNK_SIZE = 10000
+
+
+def iter_names(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            name = normalize_long_live_name(line)
+            if name and not name.startswith("#"):
+                yield name
+
+
+def import_file(uri, path, replace=False, chunk_size=CHUNK_SIZE):
+    """Загружает домены из файла порциями; возвращает число прочитанных имён."""
+    table = LongLiveDomain.__table__
+    engine = create_engine(uri)
+    total = 0
+    names = iter_names(path)
+    with engine.begin() as conn:
+        if replace:
+            conn.execute(table.delete())
+        while True:
+            chunk = list(dict.fromkeys(islice(names, chunk_size)))
+            if not chunk:
+                break
+            conn.execute(insert(table).on_conflict_do_nothing(index_elements=["name"]),
+                         [{"name": n} for n in chunk])
+            total += len(chunk)
+            print(f"[import_long_live] {total} доменов обработано...")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт long-live доменов в БД")
+    parser.add_argument("file", help="Файл со списком доменов (по одному в строке)")
+    parser.add_argument("--replace", action="store_true", help="Заменить текущий список целиком")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    uri = database_url()
+    if not uri:
+        print("[import_long_live] DATABASE_URL не задан!")
+        sys.exit(1)
+
+    started = time.monotonic()
+    total = import_file(uri, args.file, replace=args.replace, chunk_size=args.chunk_size)
+    version = bump_long_live_version()
+    print(f"[import_long_live] Импортировано {total} доменов за {time.monotonic() - started:.1f} сек., "
+          f"версия реестра: {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Потоковая загрузка списков доменов (drop lists) в таблицу domains.
+
+Пример:
+    python scripts/ingest_domains.py drops-2026-10-19.txt.gz
+    zcat list.gz | python scripts/ingest_domains.py -
+
+Домены нормализуются (схема/путь/порт отбрасываются, IDN -> punycode),
+невалидные строки пропускаются, дубликаты отсекаются. Загрузка идёт
+порциями через COPY, поэтому многомиллионные списки не держатся в памяти.
+"""
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from domain_ingest import INGEST_CHUNK_SIZE, ingest_lines, iter_lines
+from long_live_registry import database_url, long_live_registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Загрузка списка доменов в БД")
+    parser.add_argument("file", help="Файл со списком доменов (.txt или .gz), '-' — stdin")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    uri = database_url()
+    if not uri:
+        print("[ingest_domains] DATABASE_URL не задан!")
+        sys.exit(1)
+
+    started = time.monotonic()
+
+    def progress(stats):
+        elapsed = time.monotonic() - started
+        rate = stats["read"] / elapsed if elapsed else 0
+        print(f"[ingest_domains] прочитано {stats['read']}, новых {stats['inserted']}, "
+              f"невалидных {stats['invalid']} ({rate:.0f} строк/сек)")
+
+    engine = create_engine(uri)
+    if args.file == "-":
+        stats = ingest_lines(engine, iter_lines(sys.stdin.buffer), chunk_size=args.chunk_size,
+                             long_live=long_live_registry, progress=progress)
+    else:
+        with open(args.file, "rb") as f:
+            stats = ingest_lines(engine, iter_lines(f), chunk_size=args.chunk_size,
+                                 long_live=long_live_registry, progress=progress)
+    print(f"[ingest_domains] Готово за {time.monotonic() - started:.1f} сек.: {stats}")
+
+
+if __name__ == "__main__":
+    main()
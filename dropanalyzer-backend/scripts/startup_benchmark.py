@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Замер холодного старта web-приложения и Celery-воркера.
+
+Каждая цель запускается в новом интерпретаторе несколько раз; печатается минимальное
+и медианное время до готовности (импорт + создание приложения). С --importtime
+дополнительно снимается профиль `python -X importtime` и выводятся самые дорогие
+модули по суммарному времени импорта.
+
+Пример:
+  python scripts/startup_benchmark.py --runs 7 --importtime --output scripts/startup_profile.txt
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+TARGETS = {
+    # src.main:app — как его загружает gunicorn (и до, и после появления фабрики)
+    "web": "import src.main as m; getattr(m, 'app')",
+    "worker": "from src.celery_app import celery; celery.loader.import_default_modules()",
+    "analyzer": "import dropanalyzer.engine",
+}
+
+
+def child_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (BASE_DIR, os.path.dirname(BASE_DIR), env.get("PYTHONPATH")) if p)
+    env.setdefault("SECRET_KEY", "startup-benchmark")
+    env.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:////tmp/dropanalyzer-startup-benchmark.db")
+    return env
+
+
+def time_target(code, runs):
+    env = child_env()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def import_profile(code, top):
+    """Топ модулей по суммарному времени импорта (мкс) из вывода -X importtime."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BASE_DIR, env=child_env(),
+                          check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative), name[1:].rstrip()))
+    # без отступа — модули, которые импортирует сама цель; с одним уровнем отступа — их прямые импорты
+    total = sum(r[0] for r in rows if not r[1].startswith(" "))
+    nested = sorted((r for r in rows if r[1].startswith("  ") and not r[1].startswith("    ")), reverse=True)
+    return nested[:top], total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup-time benchmark for web and worker processes")
+    parser.add_argument("--runs", type=int, default=5, help="запусков на цель")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="цели через запятую: " + ", ".join(TARGETS))
+    parser.add_argument("--importtime", action="store_true", help="снять профиль -X importtime")
+    parser.add_argument("--top", type=int, default=15, help="сколько модулей показывать в профиле")
+    parser.add_argument("--output", help="дополнительно записать отчёт в файл")
+    args = parser.parse_args()
+
+    lines = [f"# python {sys.version.split()[0]}, runs={args.runs}"]
+    for name in args.targets.split(","):
+        code = TARGETS[name.strip()]
+        timings = time_target(code, args.runs)
+        lines.append(f"[startup] {name}: min={min(timings) * 1000:.0f} ms "
+                     f"median={statistics.median(timings) * 1000:.0f} ms")
+        print(lines[-1])
+        if args.importtime:
+            modules, total = import_profile(code, args.top)
+            lines.append(f"[importtime] {name}: top-level imports total {total / 1000:.0f} ms")
+            lines.extend(f"    {us / 1000:8.1f} ms  {module.strip()}" for us, module in modules)
+            print("\n".join(lines[-len(modules) - 1:]))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"[startup] Отчёт записан в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+snapshot_timeline.py — Компактное хранение сырых таймлайнов снимков Wayback для DropAnalyzer.
+
+Таймлайн домена — это отсортированные моменты снимков (int64, секунды UNIX)
+и 64-битные префиксы SHA1-дайджестов содержимого (uint64). Оба массива хранятся
+в таблице snapshot_timelines как bytea из упакованных little-endian чисел —
+16 байт на снимок вместо ~60 байт JSON-строки CDX.
+
+По сохранённым таймлайнам метрики пересчитываются локально, без обращения
+к archive.org: timeline_metrics — для одного домена (совпадает с метриками
+analyze_single_domain), corpus_metrics — векторно сразу для порции доменов.
+"""
+
+import base64
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+SECONDS_PER_YEAR = 365.25 * SECONDS_PER_DAY
+
+
+def valid_cdx_timestamp(t) -> bool:
+    """Метка CDX вида 'YYYYmmddHHMMSS' с допустимыми месяцем (1–12), днём (1–31) и временем."""
+    return (isinstance(t, str) and len(t) == 14 and t.isdigit()
+            and 1 <= int(t[4:6]) <= 12 and 1 <= int(t[6:8]) <= 31
+            and int(t[8:10]) < 24 and int(t[10:12]) < 60 and int(t[12:14]) < 60)
+
+
+def parse_cdx_timestamps(timestamps: Iterable[str]) -> np.ndarray:
+    """Векторно переводит CDX-метки 'YYYYmmddHHMMSS' в секунды UNIX (int64).
+    Некорректные метки (см. valid_cdx_timestamp) отбрасываются, как и в analyze_single_domain.
+    """
+    values = np.fromiter((int(t) for t in timestamps if valid_cdx_timestamp(t)), dtype=np.int64)
+    if not len(values):
+        return values
+    year, rest = np.divmod(values, 10 ** 10)
+    month, rest = np.divmod(rest, 10 ** 8)
+    day, rest = np.divmod(rest, 10 ** 6)
+    hour, rest = np.divmod(rest, 10 ** 4)
+    minute, second = np.divmod(rest, 100)
+    months = (year - 1970) * 12 + (month - 1)
+    days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + (day - 1)
+    return days * SECONDS_PER_DAY + hour * 3600 + minute * 60 + second
+
+
+def digest_prefix(digest: Optional[str]) -> int:
+    """Первые 8 байт SHA1-дайджеста CDX (base32) как uint64; 0 — если дайджест некорректен."""
+    if not digest:
+        return 0
+    try:
+        return int.from_bytes(base64.b32decode(digest)[:8], "little")
+    except Exception:
+        return int.from_bytes(digest.encode("utf-8")[:8].ljust(8, b"\0"), "little")
+
+
+def build_timeline(records: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Строит таймлайн из записей CDX (timestamp, digest), отсортированный по времени."""
+    rows = [r for r in records if valid_cdx_timestamp(r.get("timestamp"))]
+    timestamps = parse_cdx_timestamps(r["timestamp"] for r in rows)
+    digests = np.fromiter((digest_prefix(r.get("digest")) for r in rows), dtype=np.uint64, count=len(rows))
+    order = np.argsort(timestamps, kind="stable")
+    return timestamps[order], digests[order]
+
+
+def pack_timeline(timestamps: np.ndarray, digests: np.ndarray) -> Tuple[bytes, bytes]:
+    return (np.asarray(timestamps, dtype="<i8").tobytes(),
+            np.asarray(digests, dtype="<u8").tobytes())
+
+
+def unpack_timeline(timestamps: bytes, digests: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    return (np.frombuffer(timestamps or b"", dtype="<i8").astype(np.int64),
+            np.frombuffer(digests or b"", dtype="<u8").astype(np.uint64))
+
+
+def _iso(seconds: int) -> str:
+    return str(np.datetime64(int(seconds), "s"))
+
+
+def timeline_metrics(timestamps: np.ndarray, digests: np.ndarray) -> Dict:
+    """Метрики снимков по таймлайну; совпадают с метриками analyze_single_domain."""
+    keys = ("first_snapshot", "last_snapshot", "avg_interval_days", "max_gap_days",
+            "years_covered", "snapshots_per_year", "unique_versions")
+    if not len(timestamps):
+        return {k: None for k in keys}
+    ts = np.sort(timestamps)
+    gaps = np.diff(ts) // SECONDS_PER_DAY
+    years = ts.astype("datetime64[s]").astype("datetime64[Y]").astype(np.int64) + 1970
+    year_values, year_counts = np.unique(years, return_counts=True)
+    return {
+        "first_snapshot": _iso(ts[0]),
+        "last_snapshot": _iso(ts[-1]),
+        "avg_interval_days": round(float(gaps.mean()), 2) if len(gaps) else 0,
+        "max_gap_days": int(gaps.max()) if len(gaps) else 0,
+        "years_covered": int(len(year_values)),
+        "snapshots_per_year": {int(y): int(c) for y, c in zip(year_values, year_counts)},
+        "unique_versions": int(len(np.unique(digests[digests != 0]))),
+    }
+
+
+def corpus_metrics(timelines: List[np.ndarray], now: Optional[int] = None,
+                   recent_years: int = 3) -> Dict[str, np.ndarray]:
+    """Векторный расчёт метрик сразу для порции доменов.
+    timelines — список отсортированных массивов секунд; все массивы склеиваются в один,
+    а агрегаты по доменам считаются сегментными операциями (np.*.reduceat).
+    Возвращает колонки одинаковой длины: total_snapshots, first_ts, last_ts, max_gap_days,
+    p90_gap_days, snapshots_last_n_years.
+    """
+    n = len(timelines)
+    counts = np.fromiter((len(t) for t in timelines), dtype=np.int64, count=n)
+    result = {
+        "total_snapshots": counts,
+        "first_ts": np.zeros(n, dtype=np.int64),
+        "last_ts": np.zeros(n, dtype=np.int64),
+        "max_gap_days": np.zeros(n, dtype=np.int64),
+        "p90_gap_days": np.zeros(n, dtype=np.float64),
+        "snapshots_last_n_years": np.zeros(n, dtype=np.int64),
+    }
+    nonempty = counts > 0
+    if not nonempty.any():
+        return result
+
+    flat = np.concatenate([t for t in timelines if len(t)])
+    seg_counts = counts[nonempty]
+    starts = np.concatenate(([0], np.cumsum(seg_counts)[:-1]))
+    ends = starts + seg_counts - 1
+    now = int(now if now is not None else np.datetime64("now", "s").astype(np.int64))
+    cutoff = now - int(recent_years * SECONDS_PER_YEAR)
+
+    result["first_ts"][nonempty] = flat[starts]
+    result["last_ts"][nonempty] = flat[ends]
+    result["snapshots_last_n_years"][nonempty] = np.add.reduceat((flat >= cutoff).astype(np.int64), starts)
+
+    # разрывы внутри доменов: обнуляем разрыв на стыке соседних доменов
+    gaps = np.diff(flat, prepend=flat[0]) // SECONDS_PER_DAY
+    gaps[starts] = 0
+    result["max_gap_days"][nonempty] = np.maximum.reduceat(gaps, starts)
+
+    # перцентиль разрывов — по доменам, но на уже нарезанных срезах без копирования
+    p90 = [np.percentile(gaps[s + 1:e + 1], 90) if e > s else 0.0 for s, e in zip(starts, ends)]
+    result["p90_gap_days"][nonempty] = p90
+    return result
@@ -0,0 +1,118 @@
+"""Постоянный event loop для асинхронного режима Celery-воркера (WORKER_MODE=async).
+
+В обычном (prefork) режиме каждая задача создаёт свой event loop и свою HTTP-сессию
+и блокирует процесс на сетевом I/O одного домена. В асинхронном режиме воркер
+запускается с пулом потоков (--pool threads), а все потоки отдают корутины одному
+event loop, работающему в фоновом потоке процесса. Loop держит общую aiohttp-сессию
+(пул соединений к archive.org) и ограничивает число одновременно выполняемых анализов
+семафором ASYNC_MAX_INFLIGHT. Поток задачи лишь ждёт future, поэтому один процесс
+обслуживает сотни анализов одновременно. Пока RSS процесса выше BATCH_RSS_HIGH_MB,
+потоки задач не отдают в loop новые корутины (см. dropanalyzer.backpressure).
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Optional
+
+import aiohttp
+
+from dropanalyzer.backpressure import MemoryGuard
+
+logger = logging.getLogger(__name__)
+
+WORKER_MODE = os.environ.get('WORKER_MODE', 'prefork')
+ASYNC_MAX_INFLIGHT = int(os.environ.get('ASYNC_MAX_INFLIGHT', 200))
+ASYNC_HTTP_LIMIT = int(os.environ.get('ASYNC_HTTP_LIMIT', 100))
+ASYNC_TASK_TIMEOUT = float(os.environ.get('ASYNC_TASK_TIMEOUT', 900))
+
+
+class AsyncRuntime:
+    """Один event loop на процесс + общая HTTP-сессия + ограничение числа корутин в работе."""
+
+    def __init__(self, max_inflight: int = ASYNC_MAX_INFLIGHT, http_limit: int = ASYNC_HTTP_LIMIT):
+        self.max_inflight = max_inflight
+        self.http_limit = http_limit
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.memory_guard = MemoryGuard()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._semaphore = asyncio.Semaphore(self.max_inflight)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name='aio-runtime', daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+            logger.info(f"Async runtime started: max_inflight={self.max_inflight}, http_limit={self.http_limit}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # вызывается только из потока loop, поэтому без блокировок
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.http_limit, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def _guarded(self, coro_fn, args, kwargs):
+        async with self._semaphore:
+            return await coro_fn(*args, session=self._get_session(), **kwargs)
+
+    def run(self, coro_fn, *args, timeout: Optional[float] = ASYNC_TASK_TIMEOUT, **kwargs):
+        """Выполняет coro_fn(*args, session=<общая сессия>, **kwargs) в общем loop и ждёт результат."""
+        self.start()
+        self.memory_guard.wait_sync()
+        future = asyncio.run_coroutine_threadsafe(self._guarded(coro_fn, args, kwargs), self._loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            loop = self._loop
+            if loop is None:
+                return
+
+            async def shutdown():
+                if self._session is not None and not self._session.closed:
+                    await self._session.close()
+
+            try:
+                asyncio.run_coroutine_threadsafe(shutdown(), loop).result(10)
+            except Exception as e:
+                logger.warning(f"Async runtime shutdown error: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(10)
+            self._loop = None
+            self._session = None
+
+
+_runtime: Optional[AsyncRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> AsyncRuntime:
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = AsyncRuntime()
+    return _runtime
+
+
+def is_async_mode() -> bool:
+    return WORKER_MODE == 'async'
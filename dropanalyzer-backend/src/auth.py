@@ -0,0 +1,144 @@
+"""Проверка JWT и пароля для API.
+
+Проверенные токены кэшируются в процессе (LRU по HMAC-SHA256 токена на секрете): при
+частом опросе API один и тот же токен приходит сотни раз, и повторная проверка подписи
+не нужна. Запись живёт не дольше exp токена и не дольше AUTH_TOKEN_CACHE_TTL, поэтому
+истёкший токен отвергается так же, как без кэша; после смены SECRET_KEY прежние записи
+не находятся, и старые токены сразу отвергаются.
+
+Логин ограничен по частоте (Redis, окно LOGIN_WINDOW_SEC на пару IP+логин), чтобы
+bcrypt нельзя было использовать для перебора или нагрузки на CPU. Попытка засчитывается
+до проверки пароля, а успешный вход сбрасывает счётчик — лимит исчерпывают только
+неудачные попытки. Стоимость bcrypt задаётся BCRYPT_ROUNDS; хэши с другой стоимостью
+и legacy-пароли в открытом виде перехэшируются при успешном входе.
+"""
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import jwt
+from passlib.hash import bcrypt
+
+logger = logging.getLogger(__name__)
+
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = float(os.environ.get('AUTH_TOKEN_CACHE_TTL', 300))
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+LOGIN_MAX_ATTEMPTS = int(os.environ.get('LOGIN_MAX_ATTEMPTS', 10))
+LOGIN_WINDOW_SEC = int(os.environ.get('LOGIN_WINDOW_SEC', 300))
+
+password_hasher = bcrypt.using(rounds=BCRYPT_ROUNDS)
+_dummy_hash = None
+
+
+def _get_dummy_hash() -> str:
+    # для отсутствующего пользователя пароль проверяется против фиктивного хэша — время ответа
+    # то же, что и для существующего; хэш считается при первом обращении, а не при импорте
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = password_hasher.hash('dropanalyzer-dummy-password')
+    return _dummy_hash
+
+
+class TokenCache:
+    """Потокобезопасный LRU проверенных JWT с вытеснением по сроку действия."""
+
+    def __init__(self, max_size: int = AUTH_TOKEN_CACHE_SIZE, ttl: float = AUTH_TOKEN_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str, secret: str) -> bytes:
+        return hmac.new(secret.encode('utf-8'), token.encode('utf-8'), hashlib.sha256).digest()
+
+    def get(self, token: str, secret: str) -> Optional[dict]:
+        key = self.key(token, secret)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            payload, expires_at = item
+            if expires_at <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return payload
+
+    def put(self, token: str, secret: str, payload: dict) -> None:
+        expires_at = time.time() + self.ttl
+        if isinstance(payload.get('exp'), (int, float)):
+            expires_at = min(expires_at, payload['exp'])
+        key = self.key(token, secret)
+        with self._lock:
+            self._items[key] = (payload, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+token_cache = TokenCache()
+
+
+def decode_token(token: str, secret: str) -> dict:
+    """Payload проверенного токена (из кэша или после jwt.decode). Исключения — как у jwt.decode."""
+    payload = token_cache.get(token, secret)
+    if payload is None:
+        payload = jwt.decode(token, secret, algorithms=['HS256'])
+        token_cache.put(token, secret, payload)
+    return payload
+
+
+def _login_attempts_key(username: str, ip: Optional[str]) -> str:
+    return f'login:attempts:{ip or "-"}:{username}'
+
+
+def login_rate_limited(redis_client, username: str, ip: Optional[str]) -> bool:
+    """Засчитывает попытку входа; True — если лимит попыток в окне исчерпан.
+    Попытка засчитывается до проверки пароля (параллельный перебор тоже упирается в лимит);
+    после успешного входа счётчик сбрасывается (reset_login_attempts).
+    При недоступном Redis вход не блокируется.
+    """
+    key = _login_attempts_key(username, ip)
+    try:
+        attempts = redis_client.incr(key)
+        if attempts == 1:
+            redis_client.expire(key, LOGIN_WINDOW_SEC)
+    except Exception as e:
+        logger.warning(f"Login rate limit check failed: {e}")
+        return False
+    return int(attempts) > LOGIN_MAX_ATTEMPTS
+
+
+def reset_login_attempts(redis_client, username: str, ip: Optional[str]) -> None:
+    """Сбрасывает счётчик попыток после успешного входа."""
+    try:
+        redis_client.delete(_login_attempts_key(username, ip))
+    except Exception as e:
+        logger.warning(f"Login attempts reset failed: {e}")
+
+
+def verify_password(raw: str, stored: Optional[str]):
+    """Проверяет пароль. Возвращает (ok, new_hash): new_hash не None, если хранимое значение
+    нужно заменить (legacy plaintext или bcrypt с другой стоимостью)."""
+    if stored is None:
+        password_hasher.verify(raw, _get_dummy_hash())
+        return False, None
+    if bcrypt.identify(stored):
+        if not bcrypt.verify(raw, stored):
+            return False, None
+        return True, password_hasher.hash(raw) if password_hasher.needs_update(stored) else None
+    # legacy: пароль хранится открытым текстом
+    if hmac.compare_digest(raw.encode('utf-8'), stored.encode('utf-8')):
+        return True, password_hasher.hash(raw)
+    return False, None
@@ -0,0 +1,96 @@
+"""События выполнения пакетных заданий для потоковой выдачи клиенту.
+
+Воркер по завершении каждого домена пакета (analyze_bulk_domain_task) дописывает
+событие со сводкой результата (оценка, категория, качество, ключевые метрики)
+в Redis-список batch:<id>:events и публикует его в канал с тем же именем.
+Номер события (seq) — длина списка после RPUSH, поэтому он монотонный и общий
+для всех воркеров.
+
+Поток для клиента (stream_batch_events) сначала подписывается на канал, затем отдаёт
+уже накопленные события из списка (начиная с after), а дальше — новые из pub/sub,
+отбрасывая дубликаты по seq. Переподключившийся клиент передаёт последний полученный
+seq и продолжает без потерь. Поток завершается, когда событий столько же, сколько
+доменов в пакете, или по таймауту.
+"""
+import json
+import os
+import time
+from typing import Iterator, Optional
+
+from src.fair_share import BATCH_META_TTL, batch_key, get_redis
+
+BATCH_STREAM_MAX_SEC = float(os.environ.get('BATCH_STREAM_MAX_SEC', 300))
+BATCH_STREAM_HEARTBEAT_SEC = float(os.environ.get('BATCH_STREAM_HEARTBEAT_SEC', 15))
+
+
+def events_key(batch_id: str) -> str:
+    return f'batch:{batch_id}:events'
+
+
+def publish_batch_event(batch_id: Optional[str], domain: str, result: Optional[dict] = None,
+                        error: Optional[str] = None) -> Optional[int]:
+    """Сохраняет и публикует событие о завершении домена пакета. Возвращает seq."""
+    if not batch_id:
+        return None
+    event = {'domain': domain, 'status': 'error' if error else 'ok'}
+    if result:
+        # сводка analyze_and_store: оценка, категория, качество и ключевые метрики —
+        # клиенту не нужно запрашивать /report/<domain> по каждой строке
+        event.update({k: v for k, v in result.items() if k not in ('status', 'domain', 'batch_id')})
+    if error:
+        event['error'] = error
+    r = get_redis()
+    key = events_key(batch_id)
+    seq = r.rpush(key, json.dumps(event))
+    event['seq'] = seq
+    pipe = r.pipeline()
+    pipe.expire(key, BATCH_META_TTL)
+    pipe.hincrby(batch_key(batch_id), 'done', 1)
+    pipe.expire(batch_key(batch_id), BATCH_META_TTL)
+    pipe.publish(key, json.dumps(event))
+    pipe.execute()
+    return seq
+
+
+def batch_info(batch_id: str) -> Optional[dict]:
+    meta = get_redis().hgetall(batch_key(batch_id))
+    if not meta:
+        return None
+    return {'batch_id': batch_id, 'user': meta.get('user'), 'total': int(meta.get('total', 0)),
+            'done': int(meta.get('done', 0)), 'status': meta.get('status', 'queued')}
+
+
+def stream_batch_events(batch_id: str, total: int, after: int = 0,
+                        max_seconds: float = BATCH_STREAM_MAX_SEC,
+                        heartbeat: float = BATCH_STREAM_HEARTBEAT_SEC) -> Iterator[Optional[dict]]:
+    """Генератор событий пакета начиная с seq > after.
+    None отдаётся как heartbeat, когда новых событий не было heartbeat секунд.
+    """
+    r = get_redis()
+    key = events_key(batch_id)
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(key)
+    try:
+        # подписка уже есть — всё, что появится после LRANGE, придёт через канал
+        last = after
+        for raw in r.lrange(key, after, -1):
+            last += 1
+            yield dict(json.loads(raw), seq=last)
+        deadline = time.monotonic() + max_seconds
+        while last < total and time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=heartbeat)
+            if message is None:
+                yield None
+                continue
+            event = json.loads(message['data'])
+            if event['seq'] <= last:
+                continue
+            if event['seq'] > last + 1:
+                # пропуск (например, переполнение буфера подписчика) — добираем из списка
+                for raw in r.lrange(key, last, event['seq'] - 2):
+                    last += 1
+                    yield dict(json.loads(raw), seq=last)
+            last = event['seq']
+            yield event
+    finally:
+        pubsub.close()
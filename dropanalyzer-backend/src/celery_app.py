@@ -1,5 +1,15 @@
-
 from celery import Celery
-import os
-celery = Celery('dropanalyzer', broker=os.environ.get('CELERY_BROKER_URL','redis://localhost:6379/0'))
-celery.conf.result_backend = os.environ.get('CELERY_RESULT_BACKEND','redis://localhost:6379/0')
+
+from src.result_codec import register_zjson
+
+# сериализатор результатов должен быть зарегистрирован до чтения настроек
+register_zjson()
+
+# базовый класс задач: крупные результаты уходят в БД (src/result_store.py)
+celery = Celery('dropanalyzer', task_cls='src.result_store:OffloadResultTask',
+                include=['src.tasks.analyze_tasks', 'src.tasks.rescore_tasks', 'src.tasks.timeline_tasks',
+                         'src.tasks.retention_tasks', 'src.tasks.refresh_tasks'])
+celery.config_from_object('src.celery_config')
+
+# имена очередей нужны коду, который отправляет задачи в обход task_routes
+from src.celery_config import BULK_QUEUE, INTERACTIVE_QUEUE  # noqa: E402,F401
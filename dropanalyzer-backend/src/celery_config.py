@@ -0,0 +1,97 @@
+"""Настройки Celery (celery.config_from_object('src.celery_config')).
+
+Результаты задач хранятся в Redis ограниченно: сериализатор zjson сжимает их zlib
+(src/result_codec.py), ключи живут CELERY_RESULT_EXPIRES секунд, задачи «выстрелил
+и забыл» результатов не пишут (ignore_result), а результаты крупнее
+RESULT_INLINE_MAX_BYTES переносятся в БД (src/result_store.py). Так объём Redis
+не растёт вместе с числом заданий.
+"""
+import os
+
+from celery.schedules import crontab
+from kombu import Queue
+
+from src.result_codec import ZJSON
+from src.result_store import RESULT_EXPIRES
+from src.shard_ring import BULK_SHARDS, shard_queue
+
+broker_url = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+result_backend = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+
+# ------ Сообщения и результаты ------
+task_serializer = 'json'
+result_serializer = ZJSON
+accept_content = ['json']
+# json — результаты, записанные до включения zjson
+result_accept_content = ['json', ZJSON]
+result_expires = RESULT_EXPIRES
+
+# ------ Очереди ------
+# interactive — одиночные запросы из UI/API, bulk — пакетные задания и обслуживание.
+# Воркер, слушающий обе очереди, всегда сначала выбирает interactive (queue_order_strategy=priority).
+INTERACTIVE_QUEUE = 'interactive'
+BULK_QUEUE = 'bulk'
+
+task_queues = (
+    Queue(INTERACTIVE_QUEUE, routing_key=INTERACTIVE_QUEUE),
+    Queue(BULK_QUEUE, routing_key=BULK_QUEUE),
+    # при шардировании пакетные анализы доменов идут в очередь узла-владельца (см. src/shard_ring.py)
+    *(Queue(shard_queue(node), routing_key=shard_queue(node)) for node in BULK_SHARDS),
+)
+task_default_queue = INTERACTIVE_QUEUE
+task_routes = {
+    'src.tasks.analyze_tasks.analyze_domain_task': {'queue': INTERACTIVE_QUEUE},
+    'src.tasks.analyze_tasks.analyze_bulk_domain_task': {'queue': BULK_QUEUE},
+    'src.tasks.analyze_tasks.dispatch_fair_share_task': {'queue': INTERACTIVE_QUEUE},
+    'src.tasks.rescore_tasks.*': {'queue': BULK_QUEUE},
+    'src.tasks.timeline_tasks.*': {'queue': BULK_QUEUE},
+    'src.tasks.retention_tasks.*': {'queue': BULK_QUEUE},
+    'src.tasks.refresh_tasks.plan_refresh_task': {'queue': INTERACTIVE_QUEUE},
+}
+# Для Redis приоритет 0 — наивысший; задачи внутри очереди упорядочиваются по ступеням приоритета
+broker_transport_options = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(10)),
+}
+task_default_priority = 5
+
+# ------ Воркер ------
+# Анализ домена — долгая I/O-задача: не забираем задачи впрок, подтверждаем после выполнения
+worker_prefetch_multiplier = int(os.environ.get('CELERY_PREFETCH_MULTIPLIER', 1))
+task_acks_late = True
+task_reject_on_worker_lost = True
+# prefork: дочерний процесс, перешагнувший порог RSS (КиБ), заменяется после текущей задачи
+worker_max_memory_per_child = int(os.environ['CELERY_MAX_MEMORY_PER_CHILD_KB']) \
+    if os.environ.get('CELERY_MAX_MEMORY_PER_CHILD_KB') else None
+
+# ------ Периодические задачи ------
+beat_schedule = {
+    # диспетчер справедливой очереди пакетных заданий (см. src/fair_share.py)
+    'dispatch-fair-share': {
+        'task': 'src.tasks.analyze_tasks.dispatch_fair_share_task',
+        'schedule': float(os.environ.get('FAIR_SHARE_DISPATCH_INTERVAL', 2.0)),
+        'options': {'expires': 10, 'priority': 0},
+    },
+    # плановый повторный анализ просроченных доменов (см. src/refresh_planner.py)
+    'plan-refresh': {
+        'task': 'src.tasks.refresh_tasks.plan_refresh_task',
+        'schedule': float(os.environ.get('REFRESH_PLAN_INTERVAL', 60.0)),
+        'options': {'expires': 30, 'priority': 0},
+    },
+    # партиции reports создаются заранее, чистка по политике хранения — ночью
+    'ensure-report-partitions': {
+        'task': 'src.tasks.retention_tasks.ensure_report_partitions_task',
+        'schedule': crontab(minute=0, hour=2),
+    },
+    'compact-reports': {
+        'task': 'src.tasks.retention_tasks.compact_reports_task',
+        'schedule': crontab(minute=30, hour=2),
+        'options': {'priority': 9},
+    },
+    # просроченные крупные результаты задач (см. src/result_store.py)
+    'purge-task-results': {
+        'task': 'src.tasks.retention_tasks.purge_task_results_task',
+        'schedule': crontab(minute=15),
+        'options': {'priority': 9},
+    },
+}
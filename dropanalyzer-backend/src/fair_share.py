@@ -0,0 +1,154 @@
+"""Справедливое (fair-share) распределение пакетных заданий между пользователями.
+
+Пакет не отправляется в Celery целиком: домены складываются в Redis-очередь
+пользователя, а диспетчер (dispatch_fair_share_task, запускается beat'ом и сразу
+после постановки пакета) по кругу забирает по FAIR_SHARE_QUANTUM доменов у каждого
+пользователя, пока в очереди bulk не окажется BULK_MAX_INFLIGHT задач.
+Так 50k-доменный пакет одного пользователя не блокирует пакеты остальных,
+а очередь bulk остаётся короткой.
+"""
+import os
+import time
+import uuid
+from typing import Callable, Iterable
+
+import redis
+
+FAIR_SHARE_QUANTUM = int(os.environ.get('FAIR_SHARE_QUANTUM', 10))
+BULK_MAX_INFLIGHT = int(os.environ.get('BULK_MAX_INFLIGHT', 200))
+BATCH_META_TTL = 7 * 24 * 3600
+
+USERS_KEY = 'fairshare:users'
+INFLIGHT_KEY = 'fairshare:inflight'
+LOCK_KEY = 'fairshare:lock'
+CURSOR_KEY = 'fairshare:cursor'
+INFLIGHT_TTL = 3600  # страховка от «утечки» счётчика, если воркер умер не отчитавшись
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        url = os.environ.get('REDIS_URL') or os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+        _client = redis.Redis.from_url(url, decode_responses=True)
+    return _client
+
+
+def user_queue_key(user: str) -> str:
+    return f'fairshare:queue:{user}'
+
+
+def batch_key(batch_id: str) -> str:
+    return f'batch:{batch_id}'
+
+
+class BatchEnqueueError(Exception):
+    """Постановка пакета прервалась (обрыв или ошибка чтения входа).
+    Уже поставленные домены остаются в очереди; пакет помечен status=aborted."""
+
+    def __init__(self, batch_id: str, queued: int, cause: Exception):
+        super().__init__(str(cause))
+        self.batch_id = batch_id
+        self.queued = queued
+
+
+def enqueue_batch(user: str, domains: Iterable[str], chunk_size: int = 1000) -> dict:
+    """Ставит пакет доменов в очередь пользователя. Возвращает {'batch_id', 'queued'}.
+    Метаданные пакета пишутся до первой порции (status=receiving, total растёт с каждой
+    порцией): диспетчер может начать анализ раньше, чем вход дочитан, и события этих
+    доменов должны попадать в существующий пакет. При ошибке чтения входа пакет
+    помечается status=aborted и поднимается BatchEnqueueError.
+    """
+    r = get_redis()
+    batch_id = uuid.uuid4().hex
+    key = batch_key(batch_id)
+    queue_key = user_queue_key(user)
+    pipe = r.pipeline()
+    pipe.hset(key, mapping={'user': user, 'total': 0, 'status': 'receiving', 'created_at': int(time.time())})
+    pipe.expire(key, BATCH_META_TTL)
+    pipe.execute()
+
+    total = 0
+
+    def push(chunk):
+        pipe = r.pipeline()
+        pipe.rpush(queue_key, *chunk)
+        pipe.hincrby(key, 'total', len(chunk))
+        pipe.sadd(USERS_KEY, user)
+        pipe.execute()
+
+    chunk = []
+    try:
+        for domain in domains:
+            chunk.append(f'{batch_id}\t{domain}')
+            if len(chunk) >= chunk_size:
+                push(chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            push(chunk)
+            total += len(chunk)
+    except Exception as e:
+        r.hset(key, 'status', 'aborted')
+        raise BatchEnqueueError(batch_id, total, e) from e
+
+    if not total:
+        r.delete(key)
+    else:
+        r.hset(key, 'status', 'queued')
+    return {'batch_id': batch_id, 'queued': total}
+
+
+def dispatch_fair_share(send: Callable[[str, str], None], max_inflight: int = BULK_MAX_INFLIGHT,
+                        quantum: int = FAIR_SHARE_QUANTUM) -> int:
+    """Раздаёт домены из очередей пользователей по кругу, пока есть свободная ёмкость.
+    send(domain, batch_id) — отправка одной задачи в очередь bulk. Возвращает число отправленных.
+    """
+    r = get_redis()
+    # один диспетчер одновременно
+    if not r.set(LOCK_KEY, '1', nx=True, ex=30):
+        return 0
+    try:
+        capacity = max_inflight - int(r.get(INFLIGHT_KEY) or 0)
+        dispatched = 0
+        users = sorted(r.smembers(USERS_KEY))
+        if users:
+            # каждый цикл начинаем со следующего пользователя, чтобы никто не был всегда первым
+            shift = int(r.incr(CURSOR_KEY)) % len(users)
+            users = users[shift:] + users[:shift]
+        while capacity > 0 and users:
+            active = []
+            for user in users:
+                items = r.lpop(user_queue_key(user), min(quantum, capacity)) or []
+                if not items:
+                    r.srem(USERS_KEY, user)
+                    # пакет мог прийти между LPOP и SREM
+                    if r.llen(user_queue_key(user)):
+                        r.sadd(USERS_KEY, user)
+                    continue
+                r.incrby(INFLIGHT_KEY, len(items))
+                r.expire(INFLIGHT_KEY, INFLIGHT_TTL)
+                for item in items:
+                    batch_id, domain = item.split('\t', 1)
+                    send(domain, batch_id)
+                capacity -= len(items)
+                dispatched += len(items)
+                active.append(user)
+                if capacity <= 0:
+                    break
+            users = active
+        return dispatched
+    finally:
+        r.delete(LOCK_KEY)
+
+
+def task_finished() -> None:
+    """Вызывается по завершении bulk-задачи: освобождает место в окне BULK_MAX_INFLIGHT."""
+    r = get_redis()
+    if r.decr(INFLIGHT_KEY) < 0:
+        r.set(INFLIGHT_KEY, 0)
+
+
+def pending_count(user: str) -> int:
+    return int(get_redis().llen(user_queue_key(user)))
@@ -8,18 +8,81 @@ class Domain(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), unique=True, nullable=False, index=True)
     long_live = db.Column(db.Boolean, default=False, nullable=False)
+    # когда домен пора анализировать повторно (см. src/refresh_planner.py); NULL — как можно скорее
+    next_refresh_at = db.Column(db.DateTime, nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     def __repr__(self):
         return f"<Domain {self.name}>"
 
+class LongLiveDomain(db.Model):
+    """Реестр long-live доменов (источник для long_live_registry)."""
+    __tablename__ = 'long_live_domains'
+    name = db.Column(db.String(255), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<LongLiveDomain {self.name}>"
+
 class Report(db.Model):
+    # В PostgreSQL таблица партиционирована по месяцам created_at (миграция 0006, первичный ключ
+    # (id, created_at)); id по-прежнему уникален, поэтому ORM адресует строки только по нему.
     __tablename__ = 'reports'
+    # Часто фильтруемые метрики хранятся типизированными колонками, в JSONB — только «длинный хвост»
+    HOT_METRICS = ('total_snapshots', 'years_covered', 'first_snapshot', 'last_snapshot',
+                   'avg_interval_days', 'has_snapshot')
+
     id = db.Column(db.Integer, primary_key=True)
     domain_id = db.Column(db.Integer, db.ForeignKey('domains.id', ondelete='CASCADE'), nullable=False, index=True)
     metrics = db.Column(JSONB, nullable=True)
     quality_score = db.Column(db.Integer, nullable=False, default=0)
     category = db.Column(db.String(50), nullable=True)
+    scoring_profile = db.Column(db.String(64), nullable=True, index=True)
+    total_snapshots = db.Column(db.Integer, nullable=True)
+    years_covered = db.Column(db.Integer, nullable=True)
+    first_snapshot = db.Column(db.DateTime, nullable=True)
+    last_snapshot = db.Column(db.DateTime, nullable=True)
+    avg_interval_days = db.Column(db.Float, nullable=True)
+    has_snapshot = db.Column(db.Boolean, nullable=True)
+    # последний отчёт домена; частичные индексы WHERE is_latest обслуживают списки и дашборд
+    is_latest = db.Column(db.Boolean, nullable=False, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     domain = db.relationship('Domain', backref=db.backref('reports', lazy='dynamic'))
+
+    __table_args__ = (
+        db.Index('ix_reports_latest_score', 'quality_score', postgresql_where=db.text('is_latest')),
+        db.Index('ix_reports_latest_total_snapshots', 'total_snapshots', postgresql_where=db.text('is_latest')),
+        db.Index('ix_reports_latest_years_covered', 'years_covered', postgresql_where=db.text('is_latest')),
+        db.Index('ix_reports_latest_last_snapshot', 'last_snapshot', postgresql_where=db.text('is_latest')),
+        db.Index('ix_reports_domain_latest', 'domain_id', postgresql_where=db.text('is_latest')),
+    )
+
+    @classmethod
+    def split_metrics(cls, metrics):
+        """Делит словарь метрик на kwargs типизированных колонок и остаток для JSONB."""
+        metrics = dict(metrics or {})
+        columns = {k: metrics.pop(k, None) for k in cls.HOT_METRICS}
+        for k in ('first_snapshot', 'last_snapshot'):
+            if isinstance(columns[k], str):
+                columns[k] = datetime.fromisoformat(columns[k])
+        return columns, metrics
+
+    def full_metrics(self):
+        """Полный словарь метрик (типизированные колонки + JSONB), как его отдаёт API.
+        Служебный скетч unique_versions_sketch (см. dropanalyzer.engine.distinct) не отдаётся."""
+        metrics = dict(self.metrics or {})
+        metrics.pop('unique_versions_sketch', None)
+        for k in self.HOT_METRICS:
+            value = getattr(self, k)
+            metrics[k] = value.isoformat() if isinstance(value, datetime) else value
+        return metrics
+
+class SnapshotTimeline(db.Model):
+    """Сырой таймлайн снимков домена: упакованные int64 (секунды) и uint64 (префиксы дайджестов)."""
+    __tablename__ = 'snapshot_timelines'
+    domain_id = db.Column(db.Integer, db.ForeignKey('domains.id', ondelete='CASCADE'), primary_key=True)
+    timestamps = db.Column(db.LargeBinary, nullable=False)
+    digests = db.Column(db.LargeBinary, nullable=False)
+    snapshot_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
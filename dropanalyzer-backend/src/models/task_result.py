@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.extensions import db
+
+
+class TaskResult(db.Model):
+    """Крупный результат задачи Celery: в Redis остаётся только ссылка на эту строку
+    (см. src/result_store.py)."""
+    __tablename__ = 'task_results'
+    id = db.Column(db.String(36), primary_key=True)
+    task_id = db.Column(db.String(155), nullable=False, index=True)
+    task_name = db.Column(db.String(255), nullable=True)
+    payload = db.Column(JSONB, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<TaskResult {self.id} task={self.task_id}>"
@@ -0,0 +1,116 @@
+"""Планировщик повторного анализа доменов.
+
+После каждого анализа домену назначается next_refresh_at. Интервал зависит от того,
+насколько вероятно, что история домена изменилась и это изменит результат:
+- частые снимки (малый avg_interval_days) — история «живая», проверяем чаще;
+- последний снимок давно — история заморожена, новые данные маловероятны;
+- оценка в пределах REFRESH_NEAR_CUTOFF баллов от порога категории профиля (medium_cutoff,
+  recommended_cutoff) — пересчёт может сменить категорию, интервал сокращается тем
+  сильнее, чем ближе оценка к порогу (до REFRESH_NEAR_FACTOR у самого порога);
+- ошибка анализа — повтор через REFRESH_ERROR_DAYS.
+
+Периодическая задача plan_refresh_task выбирает просроченные домены (самые просроченные
+первыми) в пределах бюджета REFRESH_RATE_PER_HOUR и ставит их в fair-share очередь
+служебного пользователя, поэтому плановые анализы делят очередь bulk с пакетами пользователей.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    # scoring_profiles тянет numpy; модуль импортируется при старте воркера, профиль — по требованию
+    from scoring_profiles import ScoringProfile
+
+REFRESH_MIN_DAYS = float(os.environ.get('REFRESH_MIN_DAYS', 3))
+REFRESH_MAX_DAYS = float(os.environ.get('REFRESH_MAX_DAYS', 180))
+REFRESH_ERROR_DAYS = float(os.environ.get('REFRESH_ERROR_DAYS', 1))
+# ждём, пока накопится примерно столько новых снимков
+REFRESH_SNAPSHOTS_AHEAD = float(os.environ.get('REFRESH_SNAPSHOTS_AHEAD', 5))
+REFRESH_FROZEN_DAYS = float(os.environ.get('REFRESH_FROZEN_DAYS', 365))
+REFRESH_RATE_PER_HOUR = int(os.environ.get('REFRESH_RATE_PER_HOUR', 600))
+REFRESH_PLAN_INTERVAL = float(os.environ.get('REFRESH_PLAN_INTERVAL', 60))
+# домен, отданный в очередь, не выбирается повторно, пока анализ не назначит новое время
+REFRESH_LEASE_HOURS = float(os.environ.get('REFRESH_LEASE_HOURS', 6))
+REFRESH_USER = 'refresh-planner'
+REFRESH_NEAR_CUTOFF = float(os.environ.get('REFRESH_NEAR_CUTOFF', 10))
+REFRESH_NEAR_FACTOR = float(os.environ.get('REFRESH_NEAR_FACTOR', 0.5))
+
+CATEGORY_FACTORS = {
+    'Recommended': 1.0,
+    'Low Quality': 1.5,
+}
+
+LAST_PLAN_KEY = 'refresh:last_plan'
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def cutoff_factor(score, profile: Optional['ScoringProfile'] = None) -> float:
+    """Множитель интервала по расстоянию оценки до ближайшего порога категории профиля:
+    REFRESH_NEAR_FACTOR у самого порога, линейно до 1.0 на расстоянии REFRESH_NEAR_CUTOFF."""
+    if not isinstance(score, (int, float)) or REFRESH_NEAR_CUTOFF <= 0:
+        return 1.0
+    if profile is None:
+        from scoring_profiles import get_profile
+        profile = get_profile()
+    distance = min(abs(score - profile.medium_cutoff), abs(score - profile.recommended_cutoff))
+    if distance >= REFRESH_NEAR_CUTOFF:
+        return 1.0
+    return REFRESH_NEAR_FACTOR + (1.0 - REFRESH_NEAR_FACTOR) * distance / REFRESH_NEAR_CUTOFF
+
+
+def refresh_interval_days(metrics: dict, category: Optional[str], now: Optional[datetime] = None,
+                          profile: Optional['ScoringProfile'] = None) -> float:
+    """Интервал до следующего анализа домена (в днях) по метрикам последнего отчёта.
+    profile — профиль, которым оценён отчёт (его пороги категорий); по умолчанию — профиль по умолчанию."""
+    now = now or datetime.utcnow()
+    if category == 'Error':
+        return REFRESH_ERROR_DAYS
+
+    last_snapshot = _parse_datetime(metrics.get('last_snapshot'))
+    avg_interval = metrics.get('avg_interval_days')
+    if not metrics.get('total_snapshots') or last_snapshot is None:
+        return REFRESH_MAX_DAYS
+    if (now - last_snapshot).days > REFRESH_FROZEN_DAYS:
+        return REFRESH_MAX_DAYS
+
+    try:
+        days = float(avg_interval) * REFRESH_SNAPSHOTS_AHEAD if avg_interval else REFRESH_MAX_DAYS
+    except (TypeError, ValueError):
+        days = REFRESH_MAX_DAYS
+    days *= CATEGORY_FACTORS.get(category, 1.0) * cutoff_factor(metrics.get('quality_score'), profile)
+    return min(max(days, REFRESH_MIN_DAYS), REFRESH_MAX_DAYS)
+
+
+def next_refresh_at(metrics: dict, category: Optional[str], now: Optional[datetime] = None,
+                    profile_name: Optional[str] = None) -> datetime:
+    from scoring_profiles import get_profile
+
+    now = now or datetime.utcnow()
+    try:
+        profile = get_profile(profile_name)
+    except KeyError:
+        profile = None
+    return now + timedelta(days=refresh_interval_days(metrics, category, now, profile))
+
+
+def refresh_budget(r, rate_per_hour: int = REFRESH_RATE_PER_HOUR,
+                   interval: float = REFRESH_PLAN_INTERVAL) -> int:
+    """Сколько доменов можно поставить сейчас: rate_per_hour, распределённый по времени с прошлого запуска.
+    Пропуск запусков не накапливает бюджет больше, чем на 10 интервалов.
+    """
+    now = time.time()
+    previous = r.getset(LAST_PLAN_KEY, now)
+    elapsed = now - float(previous) if previous else interval
+    elapsed = min(max(elapsed, 0.0), interval * 10)
+    return int(rate_per_hour * elapsed / 3600)
@@ -0,0 +1,37 @@
+"""Сериализатор результатов Celery "zjson": JSON kombu, сжатый zlib.
+
+Бэкенд результатов Celery сам результаты не сжимает (result_compression к нему
+не применяется), поэтому сжатие сделано сериализатором. Результаты меньше
+RESULT_COMPRESS_MIN_BYTES хранятся обычным JSON — zlib там ничего не экономит.
+Декодер различает форматы по первому байту (zlib-поток начинается с 0x78, JSON —
+никогда с «x»), поэтому результаты, записанные до включения zjson, читаются как прежде.
+"""
+import os
+import zlib
+
+from kombu.serialization import register
+from kombu.utils.json import dumps as json_dumps, loads as json_loads
+
+ZJSON = 'zjson'
+ZJSON_CONTENT_TYPE = 'application/x-zjson'
+RESULT_COMPRESS_MIN_BYTES = int(os.environ.get('RESULT_COMPRESS_MIN_BYTES', 512))
+RESULT_COMPRESS_LEVEL = 6
+
+
+def zjson_dumps(value) -> bytes:
+    raw = json_dumps(value).encode('utf-8')
+    if len(raw) < RESULT_COMPRESS_MIN_BYTES:
+        return raw
+    return zlib.compress(raw, RESULT_COMPRESS_LEVEL)
+
+
+def zjson_loads(payload):
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    if payload[:1] == b'\x78':
+        payload = zlib.decompress(payload)
+    return json_loads(payload.decode('utf-8'))
+
+
+def register_zjson() -> None:
+    register(ZJSON, zjson_dumps, zjson_loads, content_type=ZJSON_CONTENT_TYPE, content_encoding='binary')
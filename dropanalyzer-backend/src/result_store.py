@@ -0,0 +1,87 @@
+"""Крупные результаты задач Celery хранятся в БД, а не в Redis.
+
+Базовый класс задач OffloadResultTask (task_cls приложения) проверяет размер
+результата: если JSON больше RESULT_INLINE_MAX_BYTES, результат записывается
+в таблицу task_results, а в бэкенд Celery уходит ссылка
+{'result_ref': <id>, 'result_size': <байт>, ...краткая сводка}. Строки живут
+столько же, сколько результаты в Redis (CELERY_RESULT_EXPIRES), и удаляются
+задачей purge_task_results_task. API подставляет полный результат по ссылке
+(resolve_result), краткие статусы обходятся без БД.
+"""
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from celery import Task
+from kombu.utils.json import dumps as json_dumps
+
+from src.task_status import summarize_result
+
+logger = logging.getLogger(__name__)
+
+RESULT_INLINE_MAX_BYTES = int(os.environ.get('RESULT_INLINE_MAX_BYTES', 16 * 1024))
+RESULT_EXPIRES = int(os.environ.get('CELERY_RESULT_EXPIRES', 6 * 3600))
+
+
+def offload_result(task_id: str, task_name: Optional[str], result: Any) -> Any:
+    """Возвращает result как есть или, если он слишком большой, ссылку на строку task_results."""
+    if not isinstance(result, (dict, list)):
+        return result
+    raw = json_dumps(result)
+    if len(raw) <= RESULT_INLINE_MAX_BYTES:
+        return result
+
+    from src.extensions import db
+    from src.models.task_result import TaskResult
+    from src.tasks.analyze_tasks import create_task_app
+
+    now = datetime.utcnow()
+    row_id = uuid.uuid4().hex
+    with create_task_app().app_context():
+        db.session.add(TaskResult(id=row_id, task_id=task_id, task_name=task_name, payload=result,
+                                  size=len(raw), created_at=now,
+                                  expires_at=now + timedelta(seconds=RESULT_EXPIRES)))
+        db.session.commit()
+    reference = {'result_ref': row_id, 'result_size': len(raw)}
+    if isinstance(result, dict):
+        reference.update(summarize_result(result))
+    return reference
+
+
+def resolve_result(result: Any) -> Any:
+    """Полный результат по ссылке result_ref (нужен app context); прочие значения — как есть."""
+    if not isinstance(result, dict) or 'result_ref' not in result:
+        return result
+    from src.extensions import db
+    from src.models.task_result import TaskResult
+    row = db.session.get(TaskResult, result['result_ref'])
+    if row is None:
+        # срок хранения истёк раньше, чем ключ в Redis
+        return dict(result, result_expired=True)
+    return row.payload
+
+
+def purge_expired_results() -> int:
+    """Удаляет просроченные строки task_results (должна вызываться внутри app context)."""
+    from src.extensions import db
+    from src.models.task_result import TaskResult
+    deleted = TaskResult.query.filter(TaskResult.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+    db.session.commit()
+    return int(deleted or 0)
+
+
+class OffloadResultTask(Task):
+    """Базовая задача приложения: крупный результат уходит в task_results."""
+
+    def __call__(self, *args, **kwargs):
+        result = super().__call__(*args, **kwargs)
+        if self.ignore_result or self.request.called_directly:
+            return result
+        try:
+            return offload_result(self.request.id, self.name, result)
+        except Exception as e:
+            # результат важнее экономии Redis: при сбое БД он сохраняется как обычно
+            logger.warning(f"Result offload failed for {self.name}[{self.request.id}]: {e}")
+            return result
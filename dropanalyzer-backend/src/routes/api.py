@@ -0,0 +1,378 @@
+# dropanalyzer-backend/src/routes/api.py
+"""API v1. Тяжёлые модули (анализатор, numpy, aiohttp, Celery с задачами) импортируются
+внутри обработчиков при первом обращении, а не при старте процесса."""
+import os
+import json
+import datetime
+import jwt
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, request, jsonify, g, stream_with_context
+
+from src.extensions import db
+from src.auth import decode_token, login_rate_limited, reset_login_attempts, verify_password
+from src.task_status import BULK_STATUS_MAX, bulk_task_status
+from src.fair_share import BatchEnqueueError
+from domain_ingest import normalize_domain
+
+api_bp = Blueprint('api', __name__)
+
+# ------ Аутентификация / декоратор токена ------
+def token_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token_header = request.headers.get('Authorization')
+        if not token_header:
+            return jsonify({'message': 'Token is missing!'}), 401
+        token = token_header
+        if token.startswith('Bearer '):
+            token = token[7:]
+        try:
+            # проверенные токены кэшируются (src/auth.py)
+            payload = decode_token(token, current_app.config['SECRET_KEY'])
+        except Exception:
+            return jsonify({'message': 'Token is invalid!'}), 401
+        g.current_user = payload.get('user')
+        return f(*args, **kwargs)
+    return decorated
+
+# ------ Login endpoint ------
+@api_bp.route('/login', methods=['POST'])
+def login():
+    data = request.get_json() or {}
+    username = data.get('username')
+    password = data.get('password')
+    if not username or not password:
+        return jsonify({'error': 'username and password required'}), 400
+
+    from src.fair_share import get_redis
+    if login_rate_limited(get_redis(), username, request.remote_addr):
+        return jsonify({'message': 'Too many login attempts, try again later'}), 429
+
+    from src.models.user import User
+
+    user = User.query.filter_by(username=username).first()
+    ok, new_hash = verify_password(password, user.password if user else None)
+    if ok and new_hash:
+        user.password = new_hash
+        db.session.commit()
+    if ok:
+        reset_login_attempts(get_redis(), username, request.remote_addr)
+        token = jwt.encode({
+            'user': username,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
+        }, current_app.config['SECRET_KEY'], algorithm='HS256')
+        # pyjwt может возвращать bytes на старых версиях
+        if isinstance(token, bytes):
+            token = token.decode('utf-8')
+        return jsonify({'access_token': token})
+    return jsonify({'message': 'Invalid credentials'}), 401
+
+# ------ Dashboard / reports for long-live domains ------
+@api_bp.route('/dashboard', methods=['GET'])
+@token_required
+def dashboard():
+    from sqlalchemy import func
+    from src.models.domain import Report
+    from long_live_registry import long_live_registry
+    # одна агрегация по последним отчётам (частичные индексы WHERE is_latest)
+    recent = datetime.datetime.utcnow() - datetime.timedelta(days=365)
+    stats = db.session.query(
+        func.count(Report.id),
+        func.count(Report.id).filter(Report.has_snapshot.is_(True)),
+        func.count(Report.id).filter(Report.category.in_(('Recommended', 'Medium'))),
+        func.count(Report.id).filter(Report.category == 'Recommended'),
+        func.count(Report.id).filter(Report.last_snapshot >= recent),
+    ).filter(Report.is_latest.is_(True)).one()
+    return jsonify({
+        'total_domains': stats[0],
+        'domains_with_snapshots': stats[1],
+        'good_domains': stats[2],
+        'recommended_domains': stats[3],
+        'recently_active': stats[4],
+        'long_live_domains': len(long_live_registry)
+    })
+
+@api_bp.route('/reports', methods=['GET'])
+@token_required
+def reports():
+    from src.models.domain import Domain, Report
+    # последние отчёты доменов с фильтрами по типизированным колонкам, постранично
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    offset = request.args.get('offset', 0, type=int)
+    query = (db.session.query(Report, Domain.name)
+             .join(Domain, Domain.id == Report.domain_id)
+             .filter(Report.is_latest.is_(True)))
+    min_snapshots = request.args.get('min_snapshots', type=int)
+    if min_snapshots is not None:
+        query = query.filter(Report.total_snapshots >= min_snapshots)
+    min_years = request.args.get('min_years', type=int)
+    if min_years is not None:
+        query = query.filter(Report.years_covered >= min_years)
+    category = request.args.get('category')
+    if category:
+        query = query.filter(Report.category == category)
+    rows = query.order_by(Report.quality_score.desc(), Report.id.desc()).limit(limit).offset(offset).all()
+
+    reports_data = []
+    for r, name in rows:
+        reports_data.append({
+            'domain': name,
+            'quality_score': r.quality_score,
+            'category': r.category,
+            'total_snapshots': r.total_snapshots,
+            'years_covered': r.years_covered,
+            'has_snapshots': bool(r.has_snapshot),
+            'is_good': r.category in ('Recommended', 'Medium'),
+            'recommended': r.category == 'Recommended',
+            'last_snapshot': r.last_snapshot.isoformat() if r.last_snapshot else None,
+            'last_analyzed': r.created_at.isoformat()
+        })
+    return jsonify({'data': reports_data, 'limit': limit, 'offset': offset})
+
+# ------ Analyze single domain (enqueue) ------
+@api_bp.route('/analyze_domain', methods=['POST'])
+@token_required
+def analyze_domain():
+    data = request.get_json() or {}
+    domain = data.get('domain')
+    if not domain:
+        return jsonify({'error': 'Domain is required'}), 400
+    domain = normalize_domain(domain)
+    if not domain:
+        return jsonify({'error': 'Invalid domain name'}), 400
+    try:
+        from src.tasks.analyze_tasks import analyze_domain_task
+        task = analyze_domain_task.apply_async(args=(domain,), priority=0)
+        return jsonify({'task_id': task.id, 'status': 'queued'}), 202
+    except Exception as e:
+        return jsonify({
+            'domain': domain,
+            'error': str(e),
+            'quality_score': 0,
+            'category': 'Error',
+            'total_snapshots': 0,
+            'years_covered': 0,
+            'has_snapshots': False,
+            'is_good': False,
+            'recommended': False,
+            'message': f'Error analyzing domain: {str(e)}'
+        }), 500
+
+# ------ Batch analyze ------
+# Небольшие пакеты анализируются синхронно; большие (или mode=queue) уходят в очередь bulk
+# через fair-share диспетчер, чтобы не задерживать одиночные запросы и пакеты других пользователей.
+BATCH_SYNC_LIMIT = int(os.environ.get('BATCH_SYNC_LIMIT', 20))
+# JSON-тело разбирается целиком; длинные списки присылаются текстом (по домену в строке)
+# и ставятся в очередь потоково, не читая тело в память
+BATCH_MAX_JSON_BYTES = int(os.environ.get('BATCH_MAX_JSON_BYTES', 1024 * 1024))
+BATCH_STREAM_MIMETYPES = ('text/plain', 'application/x-ndjson')
+
+@api_bp.route('/batch_analyze', methods=['POST'])
+@token_required
+def batch_analyze():
+    if request.mimetype in BATCH_STREAM_MIMETYPES:
+        return batch_enqueue_stream()
+    if (request.content_length or 0) > BATCH_MAX_JSON_BYTES:
+        return jsonify({'error': f'JSON body exceeds {BATCH_MAX_JSON_BYTES} bytes; '
+                                 f'send the list as text/plain, one domain per line'}), 413
+    data = request.get_json() or {}
+    domains = data.get('domains', [])
+    if not domains:
+        return jsonify({'error': 'Domains list is required'}), 400
+    if data.get('mode') == 'queue' or len(domains) > BATCH_SYNC_LIMIT:
+        try:
+            from src.fair_share import enqueue_batch
+            from src.tasks.analyze_tasks import dispatch_fair_share_task
+            normalized = (normalize_domain(d) for d in domains if isinstance(d, str))
+            batch = enqueue_batch(g.current_user or 'anonymous', (d for d in normalized if d))
+            dispatch_fair_share_task.apply_async(priority=0)
+            return jsonify({**batch, 'status': 'queued'}), 202
+        except BatchEnqueueError as e:
+            return batch_aborted(e)
+        except Exception as e:
+            return jsonify({'error': f'Batch enqueue failed: {str(e)}'}), 500
+    try:
+        from dropanalyzer.engine import analyze_domains_batch_sync
+        results = analyze_domains_batch_sync(domains)
+        return jsonify({'data': results})
+    except Exception as e:
+        return jsonify({'error': f'Batch analysis failed: {str(e)}'}), 500
+
+def batch_enqueue_stream():
+    """Пакет из тела text/plain (или NDJSON со строками-доменами): тело читается построчно
+    и ставится в очередь пользователя порциями, всегда через fair-share."""
+    try:
+        from domain_ingest import iter_lines
+        from src.fair_share import enqueue_batch
+        from src.tasks.analyze_tasks import dispatch_fair_share_task
+
+        def domains():
+            for line in iter_lines(request.stream):
+                line = line.strip()
+                if line.startswith('"'):
+                    # NDJSON: каждая строка — JSON-строка с доменом
+                    try:
+                        line = json.loads(line)
+                    except ValueError:
+                        continue
+                name = normalize_domain(line) if isinstance(line, str) else None
+                if name:
+                    yield name
+
+        batch = enqueue_batch(g.current_user or 'anonymous', domains())
+        if not batch['queued']:
+            return jsonify({'error': 'Domains list is required'}), 400
+        dispatch_fair_share_task.apply_async(priority=0)
+        return jsonify({**batch, 'status': 'queued'}), 202
+    except BatchEnqueueError as e:
+        return batch_aborted(e)
+    except Exception as e:
+        return jsonify({'error': f'Batch enqueue failed: {str(e)}'}), 500
+
+def batch_aborted(e):
+    """Вход оборвался после части порций: уже поставленные домены будут проанализированы,
+    клиент получает batch_id, чтобы следить за ними через /batch/<id>/stream."""
+    from src.tasks.analyze_tasks import dispatch_fair_share_task
+    if e.queued:
+        dispatch_fair_share_task.apply_async(priority=0)
+    return jsonify({'error': f'Batch enqueue failed: {str(e)}', 'batch_id': e.batch_id,
+                    'queued': e.queued, 'status': 'aborted'}), 500
+
+# ------ Batch progress stream ------
+@api_bp.route('/batch/<batch_id>/stream', methods=['GET'])
+@token_required
+def batch_stream(batch_id):
+    """Потоковая выдача результатов пакета по мере готовности: SSE (по умолчанию)
+    или NDJSON (?format=ndjson). Продолжение после обрыва — Last-Event-ID или ?after=<seq>."""
+    from src.batch_events import batch_info, stream_batch_events
+    info = batch_info(batch_id)
+    if info is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    if info['user'] != (g.current_user or 'anonymous'):
+        return jsonify({'error': 'Batch not found'}), 404
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after', 0))
+    except ValueError:
+        return jsonify({'error': 'after must be an integer'}), 400
+    ndjson = request.args.get('format') == 'ndjson'
+
+    def generate():
+        if ndjson:
+            yield json.dumps({'batch_id': batch_id, 'total': info['total'], 'done': info['done']}) + '\n'
+        else:
+            yield f"event: batch\ndata: {json.dumps(info)}\n\n"
+        for event in stream_batch_events(batch_id, info['total'], after=after):
+            if event is None:
+                # heartbeat не даёт прокси закрыть «молчащее» соединение
+                yield '\n' if ndjson else ': ping\n\n'
+            elif ndjson:
+                yield json.dumps(event) + '\n'
+            else:
+                yield f"id: {event['seq']}\ndata: {json.dumps(event)}\n\n"
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    mimetype = 'application/x-ndjson' if ndjson else 'text/event-stream'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
+
+# ------ Bulk domain list upload (streaming) ------
+@api_bp.route('/domains/upload', methods=['POST'])
+@token_required
+def upload_domains():
+    """Принимает файл со списком доменов (по одному в строке, можно .gz) и загружает его
+    в таблицу domains порциями, не читая файл в память целиком."""
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'file is required (multipart/form-data)'}), 400
+    try:
+        from domain_ingest import ingest_lines, iter_lines
+        from long_live_registry import long_live_registry
+        stats = ingest_lines(db.engine, iter_lines(upload.stream), long_live=long_live_registry)
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': f'Domain upload failed: {str(e)}'}), 500
+
+# ------ Task status and report endpoints ------
+@api_bp.route('/task_status/<task_id>', methods=['GET'])
+@token_required
+def task_status(task_id):
+    try:
+        from celery.result import AsyncResult
+        from src.celery_app import celery as celery_app
+        res = AsyncResult(task_id, app=celery_app)
+        payload = {'task_id': task_id, 'state': res.state}
+        if res.ready():
+            try:
+                from src.result_store import resolve_result
+                payload['result'] = resolve_result(res.result)
+            except Exception:
+                payload['result'] = str(res.result)
+        return jsonify(payload)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/task_status', methods=['POST'])
+@token_required
+def task_status_bulk():
+    """Статусы многих задач за один запрос: {"task_ids": [...], "include_result": false}.
+    По умолчанию для готовых задач возвращается краткая сводка результата."""
+    data = request.get_json() or {}
+    task_ids = data.get('task_ids')
+    if not isinstance(task_ids, list) or not all(isinstance(t, str) for t in task_ids):
+        return jsonify({'error': 'task_ids must be a list of strings'}), 400
+    if len(task_ids) > BULK_STATUS_MAX:
+        return jsonify({'error': f'At most {BULK_STATUS_MAX} task ids per request'}), 400
+    try:
+        from src.celery_app import celery as celery_app
+        statuses = bulk_task_status(celery_app, task_ids, include_result=bool(data.get('include_result')))
+        return jsonify({'data': statuses})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/report/<domain>', methods=['GET'])
+@token_required
+def get_latest_report(domain):
+    try:
+        from src.models.domain import Domain, Report
+        domain = normalize_domain(domain) or domain.strip().lower()
+        d = Domain.query.filter_by(name=domain).first()
+        if not d:
+            return jsonify({'error': 'Domain not found'}), 404
+        r = Report.query.filter_by(domain_id=d.id, is_latest=True).first()
+        if not r:
+            return jsonify({'error': 'No report found for domain'}), 404
+        quality_score, category, scoring_profile = r.quality_score, r.category, r.scoring_profile
+        metrics = r.full_metrics()
+
+        # Оценка по другому профилю считается из сохранённых метрик, без повторного анализа
+        profile_name = request.args.get('profile')
+        if profile_name:
+            from dropanalyzer.engine import metrics_to_columns
+            from scoring_profiles import compile_profile, get_profile
+            try:
+                profile = get_profile(profile_name)
+            except KeyError as e:
+                return jsonify({'error': str(e)}), 400
+            if d.long_live:
+                quality_score, category = 100, 'Recommended'
+            else:
+                columns = metrics_to_columns([metrics])
+                scores, categories = compile_profile(profile)(columns['total_snapshots'],
+                                                              columns['years_covered'],
+                                                              columns['avg_interval_days'])
+                quality_score, category = int(scores[0]), str(categories[0])
+            scoring_profile = profile.key
+
+        return jsonify({
+            'domain': d.name,
+            'long_live': d.long_live,
+            'report': {
+                'quality_score': quality_score,
+                'category': category,
+                'scoring_profile': scoring_profile,
+                'metrics': metrics,
+                'created_at': r.created_at.isoformat()
+            }
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,73 @@
+"""Шардирование пакетных заданий по узлам воркеров (consistent hashing).
+
+Нормализованный домен хешируется на кольцо, на котором у каждого узла из BULK_SHARDS
+по BULK_SHARD_VNODES виртуальных точек; узел, чья точка первая по часовой стрелке,
+владеет доменом. Задача пакетного анализа уходит в очередь этого узла bulk.shard.<node>,
+поэтому один и тот же домен всегда разбирает один узел: его локальные кеши остаются
+горячими, а повторные запросы схлопываются внутри процесса (src/single_flight.py)
+без глобальных блокировок. При добавлении узла к нему переезжает лишь ~1/N ключей.
+
+Список узлов задаётся одинаково для диспетчера и воркеров; пустой BULK_SHARDS —
+шардирование выключено, всё идёт в общую очередь bulk.
+"""
+import bisect
+import hashlib
+import os
+from typing import Dict, Iterable, List, Optional
+
+from domain_ingest import normalize_domain
+
+BULK_SHARDS = [s.strip() for s in os.environ.get('BULK_SHARDS', '').split(',') if s.strip()]
+BULK_SHARD_VNODES = int(os.environ.get('BULK_SHARD_VNODES', 128))
+SHARD_QUEUE_PREFIX = 'bulk.shard.'
+
+
+def _hash(value: str) -> int:
+    # стабильный между процессами и версиями Python (в отличие от hash())
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shard_queue(node: str) -> str:
+    return f'{SHARD_QUEUE_PREFIX}{node}'
+
+
+class HashRing:
+    """Кольцо consistent hashing с виртуальными узлами."""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = BULK_SHARD_VNODES):
+        self.vnodes = vnodes
+        self.nodes: List[str] = sorted(set(nodes))
+        points = sorted((_hash(f'{node}#{i}'), node) for node in self.nodes for i in range(vnodes))
+        self._keys = [p[0] for p in points]
+        self._owners = [p[1] for p in points]
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        i = bisect.bisect_right(self._keys, _hash(key))
+        return self._owners[i % len(self._owners)]
+
+    def ownership(self) -> Dict[str, float]:
+        """Доля кольца (а значит, и ключей) каждого узла."""
+        share = dict.fromkeys(self.nodes, 0)
+        space = 1 << 64
+        for i, (point, node) in enumerate(zip(self._keys, self._owners)):
+            prev = self._keys[i - 1] if i else self._keys[-1] - space
+            share[node] += point - prev
+        return {node: round(size / space, 4) for node, size in share.items()}
+
+
+_ring: Optional[HashRing] = None
+
+
+def get_ring() -> HashRing:
+    global _ring
+    if _ring is None:
+        _ring = HashRing(BULK_SHARDS)
+    return _ring
+
+
+def queue_for_domain(domain: str, default: str) -> str:
+    """Очередь пакетной задачи для домена: bulk.shard.<node> или default без шардирования."""
+    node = get_ring().node_for(normalize_domain(domain) or domain.strip().lower())
+    return shard_queue(node) if node else default
@@ -0,0 +1,50 @@
+"""Схлопывание одинаковых одновременных вызовов внутри процесса (single-flight).
+
+Если анализ домена уже идёт в этом процессе (потоки асинхронного воркера), следующий
+вызов с тем же ключом не запускает его заново, а ждёт и получает тот же результат
+(или то же исключение). Благодаря шардированию (src/shard_ring.py) все задачи
+одного домена попадают на один узел, так что межпроцессные блокировки не нужны.
+"""
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._calls)
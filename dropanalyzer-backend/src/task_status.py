@@ -0,0 +1,52 @@
+"""Пакетное получение статусов задач Celery одним обращением к Redis.
+
+AsyncResult на каждую задачу — это отдельный round-trip в Redis; для сотен задач
+ключи celery-task-meta-<id> читаются одним MGET, а результаты декодируются тем же
+бэкендом, что использует сам Celery (сериализатор и восстановление исключений).
+"""
+from typing import Iterable, List
+
+BULK_STATUS_MAX = 1000
+
+# поля результата analyze_*_task, которые попадают в краткую сводку
+# (result_ref/result_size — ссылка на результат, вынесенный в БД)
+SUMMARY_FIELDS = ('status', 'domain', 'score', 'batch_id', 'result_ref', 'result_size')
+
+
+def summarize_result(result):
+    if isinstance(result, dict):
+        return {k: result[k] for k in SUMMARY_FIELDS if k in result}
+    return result
+
+
+def bulk_task_status(celery_app, task_ids: Iterable[str], include_result: bool = False) -> List[dict]:
+    """Статусы задач в порядке task_ids. Неизвестные (ещё не выполненные) задачи — PENDING.
+    С include_result результаты, вынесенные в БД (src/result_store.py), подставляются по ссылке.
+    """
+    task_ids = list(task_ids)
+    if include_result:
+        from src.result_store import resolve_result as resolve
+    backend = celery_app.backend
+    if hasattr(backend, 'client') and hasattr(backend, 'get_key_for_task'):
+        keys = [backend.get_key_for_task(task_id) for task_id in task_ids]
+        values = backend.client.mget(keys) if keys else []
+        metas = [backend.decode_result(raw) if raw is not None else None for raw in values]
+    else:
+        # бэкенд не key-value (например, БД) — читаем по одной задаче
+        metas = [backend.get_task_meta(task_id) for task_id in task_ids]
+
+    statuses = []
+    for task_id, meta in zip(task_ids, metas):
+        if meta is None:
+            statuses.append({'task_id': task_id, 'state': 'PENDING'})
+            continue
+        item = {'task_id': task_id, 'state': meta['status']}
+        result = meta.get('result')
+        if isinstance(result, BaseException):
+            item['error'] = f'{type(result).__name__}: {result}'
+        elif meta['status'] == 'SUCCESS':
+            item['result'] = resolve(result) if include_result else summarize_result(result)
+        elif include_result and result is not None:
+            item['result'] = result  # например, meta прогресса у STARTED/RETRY
+        statuses.append(item)
+    return statuses
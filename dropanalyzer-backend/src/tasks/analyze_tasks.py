@@ -1,52 +1,213 @@
 import os
 import json
-from src.celery_app import celery
-from src.models.domain import db, Domain, Report
-from domain_analyzer import analyze_domain_sync
+import threading
+from datetime import datetime
+from celery.signals import worker_shutdown
+from src.celery_app import BULK_QUEUE, celery
+from src import fair_share
+from src.batch_events import publish_batch_event
+from src.shard_ring import queue_for_domain
+from src.single_flight import SingleFlight
+from src.models.domain import db, Domain, Report, SnapshotTimeline
+from domain_ingest import normalize_domain
 from sqlalchemy.exc import IntegrityError
 from flask import Flask
 
+# Анализатор (aiohttp, numpy), snapshot_timeline и планировщик (scoring_profiles) импортируются
+# в задачах, которые их используют: импорт модулей задач при старте воркера остаётся лёгким.
+
+_task_app = None
+_task_app_lock = threading.Lock()
+# одновременные анализы одного домена в процессе выполняются один раз
+_inflight = SingleFlight()
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+# В асинхронном режиме потоков задач ASYNC_MAX_INFLIGHT (по умолчанию 200), а соединений
+# в пуле процесса — DB_POOL_SIZE + DB_MAX_OVERFLOW. Запись отчёта ограничена семафором
+# по размеру пула: лишние потоки ждут здесь, а не истекают по pool_timeout QueuePool
+# (что превращалось бы в ретраи задач). Анализ (сеть) семафором не ограничен.
+_db_slots = threading.BoundedSemaphore(DB_POOL_SIZE + DB_MAX_OVERFLOW)
+
+
+def create_task_app():
+    """Возвращает минимальное Flask-приложение для SQLAlchemy внутри задач.
+    Приложение (и его пул соединений к БД) создаётся один раз на процесс и переиспользуется
+    всеми задачами и потоками воркера.
+    """
+    global _task_app
+    if _task_app is not None:
+        return _task_app
+    with _task_app_lock:
+        if _task_app is None:
+            app = Flask(__name__)
+            app.config['SQLALCHEMY_DATABASE_URI'] = (
+                os.environ.get('DATABASE_URL')
+                or os.environ.get('SQLALCHEMY_DATABASE_URI')
+                or 'sqlite:///data/app.db'
+            )
+            app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+            if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+                app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+                    'pool_size': DB_POOL_SIZE,
+                    'max_overflow': DB_MAX_OVERFLOW,
+                    'pool_pre_ping': True,
+                }
+            db.init_app(app)
+            _task_app = app
+    return _task_app
+
+
+def run_analysis(domain_name, keep_timeline=False):
+    """Анализ домена: в асинхронном режиме — в общем event loop процесса, иначе — синхронно.
+    В общем loop запросы Availability параллельных анализов объединяются в пакетные POST.
+    """
+    from src.aio_runtime import get_runtime, is_async_mode
+    from dropanalyzer.engine import analyze_domain_sync, analyze_single_domain
+
+    if is_async_mode():
+        return get_runtime().run(analyze_single_domain, domain_name, keep_timeline=keep_timeline,
+                                 batch_availability=True)
+    return analyze_domain_sync(domain_name, keep_timeline=keep_timeline)
+
+
+def store_timeline(domain_id, timeline):
+    """Сохраняет (перезаписывает) сырой таймлайн снимков домена."""
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from snapshot_timeline import pack_timeline
+
+    timestamps, digests = pack_timeline(*timeline)
+    values = {'domain_id': domain_id, 'timestamps': timestamps, 'digests': digests,
+              'snapshot_count': int(len(timeline[0])), 'updated_at': datetime.utcnow()}
+    stmt = pg_insert(SnapshotTimeline.__table__).values(**values)
+    stmt = stmt.on_conflict_do_update(index_elements=['domain_id'],
+                                      set_={k: v for k, v in values.items() if k != 'domain_id'})
+    db.session.execute(stmt)
+
+
+def merge_versions_sketch(domain_id, metrics):
+    """Сливает скетч unique_versions с скетчем прошлого отчёта домена: версии, которые
+    архив уже не отдаёт, продолжают учитываться. Несовместимый прошлый скетч игнорируется."""
+    from dropanalyzer.engine import merge_sketches, sketch_count
+
+    previous = (db.session.query(Report.metrics['unique_versions_sketch'].astext)
+                .filter_by(domain_id=domain_id, is_latest=True).scalar())
+    if not previous:
+        return
+    try:
+        merged = merge_sketches(previous, metrics['unique_versions_sketch'])
+    except ValueError:
+        return
+    metrics['unique_versions_sketch'] = merged
+    metrics['unique_versions'] = sketch_count(merged)
+
+
+@worker_shutdown.connect
+def _close_async_runtime(**kwargs):
+    from src.aio_runtime import get_runtime, is_async_mode
+
+    if is_async_mode():
+        get_runtime().close()
+
+
+def analyze_and_store(domain_name):
+    """Анализирует домен и сохраняет отчёт в БД. Возвращает краткую сводку:
+    оценку, категорию, качество, recommended и ключевые метрики (Report.HOT_METRICS).
+    Если этот домен уже анализируется в процессе, ждёт и возвращает ту же сводку.
+    """
+    return _inflight.do(domain_name, lambda: _analyze_and_store(domain_name))
+
+
+def _analyze_and_store(domain_name):
+    from dropanalyzer.engine import LONG_LIVE_DOMAINS
+    from src.refresh_planner import next_refresh_at
+
+    result = run_analysis(domain_name, keep_timeline=True)
+    timeline = result.pop('_timeline', None)
+
+    # Отбираем сериализуемые метрики
+    metrics = {
+        k: v
+        for k, v in result.items()
+        if k not in ('category', 'quality', 'recommended', 'is_good', 'analysis_time_sec', 'scoring_profile')
+    }
+
+    app = create_task_app()
+    long_live = domain_name in LONG_LIVE_DOMAINS
+
+    with _db_slots, app.app_context():
+        d = Domain.query.filter_by(name=domain_name).first()
+        if not d:
+            d = Domain(name=domain_name, long_live=long_live)
+            db.session.add(d)
+            db.session.commit()
+        # блокируем строку домена: «последний отчёт» переключается атомарно даже при параллельных анализах
+        d = Domain.query.filter_by(id=d.id).with_for_update().first()
+        if d.long_live != long_live:
+            d.long_live = long_live
+        d.next_refresh_at = next_refresh_at(metrics, result.get('category'),
+                                            profile_name=result.get('scoring_profile'))
+        if metrics.get('unique_versions_sketch'):
+            merge_versions_sketch(d.id, metrics)
+        Report.query.filter_by(domain_id=d.id, is_latest=True).update({'is_latest': False})
+
+        columns, metrics = Report.split_metrics(metrics)
+        r = Report(
+            domain_id=d.id,
+            metrics=metrics,
+            quality_score=int(result.get('quality_score', 0)),
+            category=result.get('category'),
+            scoring_profile=result.get('scoring_profile'),
+            is_latest=True,
+            **columns
+        )
+        db.session.add(r)
+        if timeline is not None:
+            store_timeline(d.id, timeline)
+        db.session.commit()
+
+    summary = {'status': 'ok', 'domain': domain_name, 'score': result.get('quality_score'),
+               'category': result.get('category'), 'quality': result.get('quality'),
+               'recommended': result.get('recommended')}
+    # те же метрики, что в типизированных колонках отчёта (даты — ISO-строками, как в result)
+    summary.update({k: result.get(k) for k in Report.HOT_METRICS})
+    return summary
+
+
 @celery.task(bind=True, acks_late=True)
 def analyze_domain_task(self, domain_name):
-    """Background task: analyze a domain and store report in DB."""
+    """Background task: analyze a domain and store report in DB (очередь interactive)."""
+    domain_name = normalize_domain(domain_name) or domain_name.strip().lower()
     try:
-        # Выполняем синхронный анализ
-        result = analyze_domain_sync(domain_name)
-
-        # Отбираем сериализуемые метрики
-        metrics = {
-            k: v
-            for k, v in result.items()
-            if k not in ('category', 'quality', 'recommended', 'is_good', 'analysis_time_sec')
-        }
-
-        # Создаём временное Flask-приложение, чтобы инициализировать SQLAlchemy
-        app = Flask(__name__)
-        app.config['SQLALCHEMY_DATABASE_URI'] = (
-            os.environ.get('DATABASE_URL')
-            or os.environ.get('SQLALCHEMY_DATABASE_URI')
-            or 'sqlite:///data/app.db'
-        )
-        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-        db.init_app(app)
-
-        with app.app_context():
-            d = Domain.query.filter_by(name=domain_name).first()
-            if not d:
-                d = Domain(name=domain_name, long_live=(domain_name in set()))
-                db.session.add(d)
-                db.session.commit()
-
-            r = Report(
-                domain_id=d.id,
-                metrics=metrics,
-                quality_score=int(result.get('quality_score', 0)),
-                category=result.get('category')
-            )
-            db.session.add(r)
-            db.session.commit()
+        return analyze_and_store(domain_name)
+    except Exception as e:
+        raise self.retry(exc=e, countdown=30, max_retries=3)
 
-        return {'status': 'ok', 'domain': domain_name, 'score': result.get('quality_score')}
 
+@celery.task(bind=True, acks_late=True, max_retries=3, ignore_result=True)
+def analyze_bulk_domain_task(self, domain_name, batch_id=None):
+    """Background task: анализ домена из пакетного задания (очередь bulk, fair-share).
+    Результат в бэкенд Celery не пишется: клиенты получают его из событий пакета (src/batch_events.py)."""
+    domain_name = normalize_domain(domain_name) or domain_name.strip().lower()
+    try:
+        result = analyze_and_store(domain_name)
     except Exception as e:
-        raise self.retry(exc=e, countdown=30, max_retries=3)
\ No newline at end of file
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=30)
+        fair_share.task_finished()
+        publish_batch_event(batch_id, domain_name, error=str(e))
+        raise
+    fair_share.task_finished()
+    publish_batch_event(batch_id, domain_name, result=result)
+    return dict(result, batch_id=batch_id)
+
+
+@celery.task(bind=True, ignore_result=True)
+def dispatch_fair_share_task(self):
+    """Periodic task: переносит домены из очередей пользователей в очередь bulk по кругу.
+    При заданном BULK_SHARDS каждый домен уходит в очередь своего узла (bulk.shard.<node>).
+    """
+    return fair_share.dispatch_fair_share(
+        lambda domain, batch_id: analyze_bulk_domain_task.apply_async(
+            args=(domain, batch_id), queue=queue_for_domain(domain, BULK_QUEUE))
+    )
@@ -0,0 +1,58 @@
+import logging
+from datetime import datetime, timedelta
+
+from src.celery_app import celery
+from src import fair_share
+from src.models.domain import db, Domain
+from src.refresh_planner import (REFRESH_LEASE_HOURS, REFRESH_USER, refresh_budget)
+from src.tasks.analyze_tasks import create_task_app, dispatch_fair_share_task
+
+logger = logging.getLogger(__name__)
+
+
+def plan_refresh(budget: int) -> dict:
+    """Ставит в очередь до budget просроченных доменов (самые просроченные — первыми).
+    Выбранным доменам next_refresh_at сдвигается на срок аренды, чтобы следующий запуск
+    не выбрал их повторно; успешный анализ назначит настоящее время следующей проверки.
+    Должна вызываться внутри app context.
+    """
+    # не копим очередь: если прошлые плановые домены ещё не разобраны, ждём
+    budget -= fair_share.pending_count(REFRESH_USER)
+    if budget <= 0:
+        return {'queued': 0, 'budget': 0}
+
+    now = datetime.utcnow()
+    rows = (
+        db.session.query(Domain.id, Domain.name)
+        .filter((Domain.next_refresh_at.is_(None)) | (Domain.next_refresh_at <= now))
+        .order_by(Domain.next_refresh_at.asc().nullsfirst(), Domain.id)
+        .limit(budget)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not rows:
+        db.session.rollback()
+        return {'queued': 0, 'budget': budget}
+
+    db.session.query(Domain).filter(Domain.id.in_([r[0] for r in rows])).update(
+        {'next_refresh_at': now + timedelta(hours=REFRESH_LEASE_HOURS)}, synchronize_session=False
+    )
+    db.session.commit()
+
+    batch = fair_share.enqueue_batch(REFRESH_USER, (r[1] for r in rows))
+    logger.info(f"Refresh planner queued {batch['queued']} domains (budget {budget})")
+    return {'queued': batch['queued'], 'budget': budget, 'batch_id': batch['batch_id']}
+
+
+@celery.task(bind=True, ignore_result=True)
+def plan_refresh_task(self):
+    """Periodic task: ставит просроченные домены на повторный анализ в пределах бюджета запросов."""
+    budget = refresh_budget(fair_share.get_redis())
+    if budget <= 0:
+        return {'queued': 0, 'budget': 0}
+    app = create_task_app()
+    with app.app_context():
+        result = plan_refresh(budget)
+    if result['queued']:
+        dispatch_fair_share_task.apply_async(priority=0)
+    return result
@@ -0,0 +1,135 @@
+import logging
+from collections import Counter
+from typing import Iterable, Optional
+
+from src.celery_app import celery
+from src.models.domain import db, Domain, Report
+from src.tasks.analyze_tasks import create_task_app
+
+# numpy, анализатор и scoring_profiles импортируются в функциях: см. src/tasks/analyze_tasks.py
+
+logger = logging.getLogger(__name__)
+
+RESCORE_CHUNK_SIZE = 5000
+
+
+def iter_report_chunks(chunk_size: int = RESCORE_CHUNK_SIZE):
+    """Итерирует сохранённые отчёты порциями (keyset по id).
+    Читаются только три типизированные колонки метрик, нужные для оценки.
+    Возвращает (rows, columns, long_live): строки, колоночные метрики и маску long-live доменов.
+    """
+    import numpy as np
+    from dropanalyzer.engine import metrics_to_columns, LONG_LIVE_DOMAINS
+
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(Report.id, Report.quality_score, Report.category,
+                             Report.total_snapshots, Report.years_covered, Report.avg_interval_days,
+                             Domain.name, Domain.long_live, Report.scoring_profile)
+            .join(Domain, Domain.id == Report.domain_id)
+            .filter(Report.id > last_id)
+            .order_by(Report.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+
+        columns = metrics_to_columns(
+            {"total_snapshots": r[3], "years_covered": r[4], "avg_interval_days": r[5]} for r in rows
+        )
+        # long-live домены всегда Recommended (как в analyze_single_domain)
+        long_live = np.fromiter((bool(r[7]) or r[6].lower() in LONG_LIVE_DOMAINS for r in rows),
+                                dtype=bool, count=len(rows))
+        yield rows, columns, long_live
+
+
+def rescore_reports(chunk_size: int = RESCORE_CHUNK_SIZE, profile_name: Optional[str] = None) -> dict:
+    """Пересчитывает quality_score/category для всех сохранённых отчётов без обращения к сети.
+    Каждая порция классифицируется векторно, изменившиеся строки обновляются одним bulk-update.
+    Должна вызываться внутри app context.
+    """
+    import numpy as np
+    from scoring_profiles import compile_profile, get_profile
+
+    profile = get_profile(profile_name)
+    evaluate = compile_profile(profile)
+
+    scanned = updated = 0
+    for rows, columns, long_live in iter_report_chunks(chunk_size):
+        scanned += len(rows)
+        scores, categories = evaluate(columns["total_snapshots"],
+                                      columns["years_covered"],
+                                      columns["avg_interval_days"])
+        scores = np.where(long_live, 100, scores)
+        categories = np.where(long_live, "Recommended", categories)
+
+        changes = [
+            {"id": r[0], "quality_score": int(score), "category": str(category),
+             "scoring_profile": profile.key}
+            for r, score, category in zip(rows, scores, categories)
+            if r[1] != score or r[2] != category or r[8] != profile.key
+        ]
+        if changes:
+            db.session.bulk_update_mappings(Report, changes)
+            db.session.commit()
+            updated += len(changes)
+        else:
+            db.session.rollback()
+
+    logger.info(f"Rescored reports with {profile.key}: scanned={scanned}, updated={updated}")
+    return {'profile': profile.key, 'scanned': scanned, 'updated': updated}
+
+
+def compare_profiles(profile_names: Iterable[str], chunk_size: int = RESCORE_CHUNK_SIZE) -> dict:
+    """A/B-сравнение профилей на сохранённых метриках за один проход по таблице reports.
+    Для каждого профиля возвращает распределение категорий, средний балл
+    и число отчётов, чья категория отличается от сохранённой.
+    """
+    import numpy as np
+    from scoring_profiles import evaluate_profiles, get_profile
+
+    profiles = [get_profile(name) for name in profile_names]
+    stats = {p.key: {'categories': Counter(), 'score_sum': 0, 'changed': 0} for p in profiles}
+
+    total = 0
+    for rows, columns, long_live in iter_report_chunks(chunk_size):
+        total += len(rows)
+        stored = np.asarray([r[2] for r in rows], dtype=object)
+        for key, (scores, categories) in evaluate_profiles(columns, profiles).items():
+            scores = np.where(long_live, 100, scores)
+            categories = np.where(long_live, "Recommended", categories)
+            names, counts = np.unique(categories.astype(str), return_counts=True)
+            stats[key]['categories'].update(dict(zip(names.tolist(), counts.tolist())))
+            stats[key]['score_sum'] += int(scores.sum())
+            stats[key]['changed'] += int((categories != stored).sum())
+
+    return {
+        'reports': total,
+        'profiles': {
+            key: {
+                'categories': dict(s['categories']),
+                'avg_score': round(s['score_sum'] / total, 2) if total else 0,
+                'changed': s['changed'],
+            }
+            for key, s in stats.items()
+        },
+    }
+
+
+@celery.task(bind=True)
+def rescore_reports_task(self, chunk_size: int = RESCORE_CHUNK_SIZE, profile_name: Optional[str] = None):
+    """Background task: пересчёт категорий/оценок всех отчётов по выбранному профилю."""
+    app = create_task_app()
+    with app.app_context():
+        return rescore_reports(chunk_size=chunk_size, profile_name=profile_name)
+
+
+@celery.task(bind=True)
+def compare_profiles_task(self, profile_names, chunk_size: int = RESCORE_CHUNK_SIZE):
+    """Background task: A/B-сравнение нескольких профилей оценки на сохранённых метриках."""
+    app = create_task_app()
+    with app.app_context():
+        return compare_profiles(profile_names, chunk_size=chunk_size)
@@ -0,0 +1,127 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from src.celery_app import celery
+from src.models.domain import db, Domain
+from src.result_store import purge_expired_results
+from src.tasks.analyze_tasks import create_task_app
+
+logger = logging.getLogger(__name__)
+
+# Политика хранения: последние REPORT_KEEP_LATEST отчётов домена хранятся всегда,
+# из более старых остаётся по одному (последнему) отчёту за месяц в пределах
+# REPORT_HISTORY_MONTHS месяцев, остальное удаляется.
+REPORT_KEEP_LATEST = int(os.environ.get('REPORT_KEEP_LATEST', 3))
+REPORT_HISTORY_MONTHS = int(os.environ.get('REPORT_HISTORY_MONTHS', 24))
+REPORT_PARTITIONS_AHEAD = int(os.environ.get('REPORT_PARTITIONS_AHEAD', 3))
+COMPACTION_DOMAIN_BATCH = int(os.environ.get('COMPACTION_DOMAIN_BATCH', 500))
+COMPACTION_PAUSE_SEC = float(os.environ.get('COMPACTION_PAUSE_SEC', 0.05))
+
+# Один диапазон доменов — одна короткая транзакция: удаляются только строки этих доменов,
+# поэтому блокировки держатся миллисекунды, а не на всю таблицу.
+COMPACT_SQL = text("""
+    WITH ranked AS (
+        SELECT id, created_at,
+               row_number() OVER (PARTITION BY domain_id ORDER BY created_at DESC, id DESC) AS rn,
+               row_number() OVER (PARTITION BY domain_id, date_trunc('month', created_at)
+                                  ORDER BY created_at DESC, id DESC) AS month_rn
+        FROM reports
+        WHERE domain_id > :lo AND domain_id <= :hi
+    )
+    DELETE FROM reports r
+    USING ranked
+    WHERE r.id = ranked.id AND r.created_at = ranked.created_at
+      AND r.domain_id > :lo AND r.domain_id <= :hi
+      AND ranked.rn > :keep_latest
+      AND (ranked.month_rn > 1 OR ranked.created_at < :history_cutoff)
+""")
+
+
+def ensure_report_partitions(months_ahead: int = REPORT_PARTITIONS_AHEAD) -> int:
+    """Создаёт месячные партиции reports на months_ahead месяцев вперёд. Возвращает число новых."""
+    if db.engine.dialect.name != 'postgresql':
+        return 0
+    # функцию и партиционированную reports создаёт миграция 0006; на схеме без неё
+    # (например, созданной db.create_all) создавать нечего
+    ready = db.session.execute(text(
+        "SELECT to_regprocedure('ensure_report_partitions(date, integer)') IS NOT NULL"
+        " AND EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('reports'))"
+    )).scalar()
+    if not ready:
+        db.session.rollback()
+        logger.info("reports is not partitioned (migration 0006 not applied), skipping partition maintenance")
+        return 0
+    created = db.session.execute(
+        text("SELECT ensure_report_partitions(now()::date, :ahead)"), {'ahead': months_ahead}
+    ).scalar()
+    db.session.commit()
+    if created:
+        logger.info(f"Created {created} report partitions")
+    return int(created or 0)
+
+
+def compact_reports(keep_latest: int = REPORT_KEEP_LATEST, history_months: int = REPORT_HISTORY_MONTHS,
+                    domain_batch: int = COMPACTION_DOMAIN_BATCH, pause: float = COMPACTION_PAUSE_SEC) -> dict:
+    """Удаляет лишние отчёты по политике хранения, порциями по domain_batch доменов.
+    Последний отчёт (is_latest) никогда не удаляется, т.к. keep_latest >= 1.
+    Должна вызываться внутри app context.
+    """
+    keep_latest = max(1, keep_latest)
+    history_cutoff = datetime.utcnow() - timedelta(days=30 * history_months)
+
+    last_id = 0
+    batches = deleted = 0
+    while True:
+        ids = [row[0] for row in
+               db.session.query(Domain.id).filter(Domain.id > last_id)
+               .order_by(Domain.id).limit(domain_batch).all()]
+        if not ids:
+            break
+        result = db.session.execute(COMPACT_SQL, {
+            'lo': last_id, 'hi': ids[-1],
+            'keep_latest': keep_latest, 'history_cutoff': history_cutoff,
+        })
+        db.session.commit()
+        deleted += result.rowcount or 0
+        batches += 1
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+
+    logger.info(f"Compacted reports: batches={batches}, deleted={deleted}")
+    return {'batches': batches, 'deleted': deleted,
+            'keep_latest': keep_latest, 'history_months': history_months}
+
+
+@celery.task(bind=True, ignore_result=True)
+def ensure_report_partitions_task(self, months_ahead: int = REPORT_PARTITIONS_AHEAD):
+    """Background task: заранее создаёт партиции reports на ближайшие месяцы."""
+    app = create_task_app()
+    with app.app_context():
+        return ensure_report_partitions(months_ahead=months_ahead)
+
+
+@celery.task(bind=True)
+def compact_reports_task(self, keep_latest: int = REPORT_KEEP_LATEST,
+                         history_months: int = REPORT_HISTORY_MONTHS,
+                         domain_batch: int = COMPACTION_DOMAIN_BATCH):
+    """Background task: чистка старых отчётов по политике хранения."""
+    app = create_task_app()
+    with app.app_context():
+        return compact_reports(keep_latest=keep_latest, history_months=history_months,
+                               domain_batch=domain_batch)
+
+
+@celery.task(bind=True, ignore_result=True)
+def purge_task_results_task(self):
+    """Periodic task: удаляет просроченные крупные результаты задач из task_results."""
+    app = create_task_app()
+    with app.app_context():
+        deleted = purge_expired_results()
+    if deleted:
+        logger.info(f"Purged expired task results: {deleted}")
+    return deleted
@@ -0,0 +1,80 @@
+import json
+import logging
+
+from sqlalchemy import text
+
+from src.celery_app import celery
+from src.models.domain import db, Report, SnapshotTimeline
+from src.tasks.analyze_tasks import create_task_app
+
+# snapshot_timeline (numpy) импортируется в функциях: см. src/tasks/analyze_tasks.py
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_CHUNK_SIZE = 2000
+
+
+def iter_timeline_chunks(chunk_size: int = TIMELINE_CHUNK_SIZE):
+    """Итерирует сохранённые таймлайны порциями (keyset по domain_id).
+    Возвращает (domain_ids, timestamps_list, digests_list).
+    """
+    from snapshot_timeline import unpack_timeline
+
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(SnapshotTimeline.domain_id, SnapshotTimeline.timestamps, SnapshotTimeline.digests)
+            .filter(SnapshotTimeline.domain_id > last_id)
+            .order_by(SnapshotTimeline.domain_id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        unpacked = [unpack_timeline(r[1], r[2]) for r in rows]
+        yield [r[0] for r in rows], [u[0] for u in unpacked], [u[1] for u in unpacked]
+
+
+def backfill_timeline_metrics(chunk_size: int = TIMELINE_CHUNK_SIZE, recent_years: int = 3) -> dict:
+    """Досчитывает новые метрики по сохранённым таймлайнам (без запросов к archive.org)
+    и дописывает их в metrics последнего отчёта каждого домена.
+    """
+    from snapshot_timeline import corpus_metrics
+
+    recent_key = f'snapshots_last_{recent_years}y'
+    update = text("UPDATE reports SET metrics = coalesce(metrics, '{}'::jsonb) || CAST(:patch AS jsonb) "
+                  "WHERE id = :id")
+    domains = updated = 0
+    for domain_ids, timelines, _digests in iter_timeline_chunks(chunk_size):
+        domains += len(domain_ids)
+        columns = corpus_metrics(timelines, recent_years=recent_years)
+        latest = dict(
+            db.session.query(Report.domain_id, Report.id)
+            .filter(Report.domain_id.in_(domain_ids), Report.is_latest.is_(True))
+            .all()
+        )
+        params = []
+        for i, domain_id in enumerate(domain_ids):
+            if domain_id not in latest:
+                continue
+            patch = {
+                recent_key: int(columns['snapshots_last_n_years'][i]),
+                'p90_gap_days': round(float(columns['p90_gap_days'][i]), 2),
+            }
+            params.append({'id': latest[domain_id], 'patch': json.dumps(patch)})
+        if params:
+            db.session.execute(update, params)
+        db.session.commit()
+        updated += len(params)
+
+    logger.info(f"Timeline metrics backfilled: domains={domains}, reports updated={updated}")
+    return {'domains': domains, 'reports_updated': updated}
+
+
+@celery.task(bind=True)
+def backfill_timeline_metrics_task(self, chunk_size: int = TIMELINE_CHUNK_SIZE, recent_years: int = 3):
+    """Background task: пересчёт метрик по сохранённым таймлайнам снимков."""
+    app = create_task_app()
+    with app.app_context():
+        return backfill_timeline_metrics(chunk_size=chunk_size, recent_years=recent_years)
@@ -6,7 +6,7 @@ python /app/dropanalyzer-backend/scripts/db_init.py || { echo "❌ db_init faile
 
 if [ "$SERVICE_ROLE" = "web" ]; then
     echo "🌍 Запуск web-сервера..."
-    exec gunicorn --bind 0.0.0.0:5000 src.main:app --workers 3
+    exec gunicorn --bind 0.0.0.0:5000 "src.main:create_app()" --workers 3
 elif [ "$SERVICE_ROLE" = "worker" ]; then
     echo "⚙ Запуск Celery worker..."
     exec celery -A src.celery_app.celery worker --loglevel=info